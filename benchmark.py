@@ -0,0 +1,84 @@
+#----------------------------------------------------------------------------------------------------------------------------------------
+# LIBRARIES
+import argparse
+import json
+import os
+from benchmarks import BENCHMARKS,DEFAULT_CONFIG,run_benchmarks,compare_results
+#----------------------------------------------------------------------------------------------------------------------------------------
+# GLOBAL (DEFAULT) PARAMETERS AND SETTINGS
+
+RESULTS_DIR      = 'benchmarks/results/'
+N_THREADS        = 1
+
+
+
+if __name__ == "__main__":
+
+    #----------------------------------------------------------------------------------------------------------------------------------------
+    # PARSE ARGUMENTS
+    parser = argparse.ArgumentParser(
+        description = "Python script to run the offline benchmark suite (parsing, name matching, training, encoding, similarity search)"
+        )
+
+    # Paths
+    parser.add_argument("-RD","--ResultsDir",
+                        type    = str,
+                        default = RESULTS_DIR,
+                        help    = "Directory of the JSON results (one file per run)"
+                       )
+    parser.add_argument("-C","--Compare",
+                        type    = str,
+                        default = None,
+                        help    = "Path to a previous JSON result to compare with"
+                       )
+
+    # Settings
+    parser.add_argument("-B","--Benchmarks",
+                        type    = str,
+                        nargs   = '+',
+                        default = None,
+                        choices = list(BENCHMARKS),
+                        help    = "Benchmarks to run (default: all)"
+                       )
+    parser.add_argument("-NP","--NumPlayers",
+                        type    = int,
+                        default = DEFAULT_CONFIG['n_players'],
+                        help    = "Number of players of the synthetic player matrix"
+                       )
+    parser.add_argument("-E","--Epochs",
+                        type    = int,
+                        default = DEFAULT_CONFIG['epochs'],
+                        help    = "Number of timed training epochs"
+                       )
+    parser.add_argument("-NR","--NumRuns",
+                        type    = int,
+                        default = DEFAULT_CONFIG['n_runs'],
+                        help    = "Number of timed runs for the latency benchmarks"
+                       )
+    parser.add_argument("-NT","--NumThreads",
+                        type    = int,
+                        default = N_THREADS,
+                        help    = "Number of torch threads"
+                       )
+
+    args = parser.parse_args()
+
+    #----------------------------------------------------------------------------------------------------------------------------------------
+    # BENCHMARKS
+
+    config = {'n_players' : args.NumPlayers, 'epochs' : args.Epochs, 'n_runs' : args.NumRuns}
+    report = run_benchmarks(args.Benchmarks, config, n_threads=args.NumThreads)
+
+    os.makedirs(args.ResultsDir, exist_ok=True)
+    commit = report['environment']['commit'] or 'nocommit'
+    path = os.path.join(args.ResultsDir, f"{report['timestamp'].replace(':','')}_{commit}.json")
+    with open(path,'w') as f:
+        json.dump(report,f,indent=2)
+    print(f"Results --> {path}")
+
+    if args.Compare is not None:
+        with open(args.Compare) as f:
+            baseline = json.load(f)
+        print(compare_results(report, baseline).to_string(index=False))
+
+    #----------------------------------------------------------------------------------------------------------------------------------------
@@ -0,0 +1 @@
+from .suite import BENCHMARKS,DEFAULT_CONFIG,run_benchmarks,compare_results,synthetic_players
\ No newline at end of file
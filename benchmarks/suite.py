@@ -0,0 +1,300 @@
+#------------------------------------------------------------------------------------------------------------------
+# Libraries
+
+import itertools
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import torch
+
+#------------------------------------------------------------------------------------------------------------------
+# Global variables
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+# Size of the synthetic data and number of timed runs
+DEFAULT_CONFIG = {
+    'n_players'  : 2000,
+    'n_features' : 97,
+    'latent_dim' : 16,
+    'epochs'     : 20,
+    'batch_size' : 512,
+    'n_runs'     : 200,
+    'seed'       : 1610,
+}
+
+LEAGUES   = ['Serie A', 'Premier League', 'La Liga', 'Bundesliga', 'Ligue 1', 'Eredivisie', 'Ligue 2', 'Serie B']
+POSITIONS = ['Centre-Forward', 'Left Winger', 'Right Winger', 'Attacking Midfield', 'Central Midfield',
+             'Defensive Midfield', 'Left-Back', 'Right-Back', 'Centre-Back']
+SYLLABLES = ['ma', 'ri', 'lo', 'ne', 'to', 'ka', 'el', 'an', 'si', 'vo', 'ra', 'de', 'li', 'mu', 'sa', 'ko', 'be', 'zi']
+
+#------------------------------------------------------------------------------------------------------------------
+# Helpers
+
+def _timings(fn, n_runs, n_warmup=5):
+    '''
+    Wall-clock timings (ms) of n_runs calls of fn, after n_warmup untimed calls.
+    '''
+    for _ in range(n_warmup):
+        fn()
+    timings = []
+    for _ in range(n_runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1e3)
+    return timings
+
+def _latency(timings, n_items=1):
+    '''
+    p50/p99/mean latency (ms) and throughput (items/sec) of a list of timings.
+    '''
+    timings = np.asarray(timings)
+    return {
+        'p50_ms'       : float(np.percentile(timings, 50)),
+        'p99_ms'       : float(np.percentile(timings, 99)),
+        'mean_ms'      : float(timings.mean()),
+        'items_per_sec': float(n_items * 1e3 / timings.mean()),
+    }
+
+def _random_names(rng, n):
+    return np.array([
+        ' '.join(''.join(rng.choice(SYLLABLES, size=rng.integers(2, 4))).capitalize() for _ in range(2))
+        for _ in range(n)
+    ])
+
+def synthetic_players(n_players, n_features=97, seed=1610):
+    '''
+    Synthetic training dataset: the metadata columns of the real one plus n_features - 1 random features
+    (Age is one of the features, as in the real dataset).
+    '''
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({
+        'Player'      : _random_names(rng, n_players),
+        'Nation'      : rng.choice(['it ITA', 'eng ENG', 'es ESP', 'fr FRA', 'de GER', 'pt POR'], n_players),
+        'Pos_fbref'   : rng.choice(['FW', 'MF', 'DF', 'FW,MF', 'DF,MF'], n_players),
+        'Pos_tm'      : rng.choice(POSITIONS, n_players),
+        'Squad'       : [f'Club {i}' for i in rng.integers(0, max(1, n_players // 25), n_players)],
+        'League'      : rng.choice(LEAGUES, n_players),
+        'Age'         : rng.integers(17, 38, n_players).astype(float),
+        'Born'        : rng.integers(1986, 2007, n_players).astype(float),
+        '90s'         : rng.uniform(5, 38, n_players).round(1),
+        'MarketValue' : [f'€{value:.2f}m' if value >= 1 else f'€{int(value * 1000)}k' for value in rng.lognormal(0.5, 1.2, n_players)],
+    })
+    features = pd.DataFrame(rng.lognormal(0, 1, (n_players, n_features - 1)).astype(np.float32),
+                            columns=[f'Feature_{i}' for i in range(n_features - 1)])
+    return pd.concat([data, features], axis=1)
+
+def _synthetic_matrix(config):
+    torch.manual_seed(config['seed'])
+    return torch.randn(config['n_players'], config['n_features'])
+
+#------------------------------------------------------------------------------------------------------------------
+# Benchmarks
+#
+# Every benchmark takes the config and returns a dict of metrics.
+
+def bench_tm_parse(config):
+    '''
+    Transfermarkt profile parsing (single-pass lxml parser and legacy regex fallback) on the saved fixtures.
+    '''
+    from scraping.Scrapers.tm_parser import parse_player_bio
+    results = {}
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        if not name.startswith('tm_profile'):
+            continue
+        with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+            page = f.read()
+        results[os.path.splitext(name)[0]] = _latency(_timings(lambda: parse_player_bio(page, 0), config['n_runs']))
+    return results
+
+def bench_name_matching(config):
+    '''
+    FBref --> Transfermarkt name matching on synthetic names (Transfermarkt names are perturbed copies).
+    '''
+    from processing import match_players
+    rng   = np.random.default_rng(config['seed'])
+    fbref = synthetic_players(config['n_players'], 2, config['seed'])[['Player', 'League', 'Born']]
+    names = fbref['Player'].to_numpy().astype(object)
+    # Perturb a third of the names (one character replaced), add as many unrelated players
+    perturbed = names.copy()
+    for i in rng.choice(len(names), len(names) // 3, replace=False):
+        position = rng.integers(0, len(names[i]))
+        perturbed[i] = names[i][:position] + 'x' + names[i][position + 1:]
+    tm = pd.concat([
+        pd.DataFrame({'Player' : perturbed, 'League' : fbref['League'], 'BirthYear' : fbref['Born'].astype(int)}),
+        pd.DataFrame({'Player' : _random_names(rng, len(names)), 'League' : rng.choice(LEAGUES, len(names)),
+                      'BirthYear' : rng.integers(1986, 2007, len(names))}),
+    ], ignore_index=True)
+
+    matches = None
+    def run():
+        nonlocal matches
+        matches = match_players(fbref, tm)
+    results = _latency(_timings(run, n_runs=5, n_warmup=1), n_items=len(fbref))
+    results['match_rate'] = float((matches['status'] == 'matched').mean())
+    return results
+
+def bench_training_epoch(config):
+    '''
+    Training epoch (train + test evaluation) of every engine on a synthetic matrix
+    (the distributed engine runs in a group of one process, i.e. it measures the all-reduce overhead).
+    '''
+    from models import VAE, kaiming_weights_init
+    from engine import ENGINES, build_optimizer, setup_distributed, cleanup_distributed
+    from engine.data import train_test_split
+    X = _synthetic_matrix(config)
+    X_train, X_test = train_test_split(X)
+    results = {}
+    for name, Trainer in ENGINES.items():
+        if name == 'distributed':
+            setup_distributed()
+        torch.manual_seed(config['seed'])
+        vae = VAE(config['n_features'], 64, 32, config['latent_dim'])
+        vae.apply(kaiming_weights_init)
+        trainer = Trainer(vae, build_optimizer(vae, 1e-3), X_train, X_test, config['batch_size'], 'cpu')
+        beta = torch.tensor(1.0)
+        results[name] = _latency(_timings(lambda: trainer.epoch(beta), config['epochs'], n_warmup=2), n_items=len(X_train))
+    cleanup_distributed()
+    return results
+
+def bench_encode(config):
+    '''
+    Encoding latency for 1 and 1000 rows: eager VAE.encode, eager vae(X) (as in the notebook) and the traced encoder.
+    '''
+    from models import VAE, ModelBundle, InferenceEncoder, export_encoder
+    X = _synthetic_matrix(config).numpy()
+    vae = VAE(config['n_features'], 64, 32, config['latent_dim']).eval()
+    bundle = ModelBundle(vae, [f'Feature_{i}' for i in range(config['n_features'])],
+                         torch.zeros(config['n_features']), torch.ones(config['n_features']))
+    with tempfile.TemporaryDirectory() as directory:
+        encoder = InferenceEncoder(export_encoder(bundle, os.path.join(directory, 'encoder.pt')))
+
+    results = {}
+    for batch_size in (1, 1000):
+        batch  = X[np.arange(batch_size) % len(X)]
+        tensor = torch.as_tensor(batch)
+        with torch.no_grad():
+            results[f'forward_{batch_size}'] = _latency(_timings(lambda: vae(tensor)[1], config['n_runs']), batch_size)
+            results[f'encode_{batch_size}']  = _latency(_timings(lambda: vae.encode(tensor), config['n_runs']), batch_size)
+        results[f'traced_{batch_size}'] = _latency(_timings(lambda: encoder.encode_batch(batch), config['n_runs']), batch_size)
+    return results
+
+def bench_similarity(config):
+    '''
+    Top-5 similar players: full cdist matrix + argsort (as in experiments.ipynb) against the kNN indexes.
+    '''
+    from scipy.spatial.distance import cdist
+    from scouting import EmbeddingStore, ExactIndex, IVFIndex, FilteredIndex
+    rng = np.random.default_rng(config['seed'])
+    embeddings = rng.normal(size=(config['n_players'], config['latent_dim'])).astype(np.float32)
+    queries = rng.integers(0, config['n_players'], config['n_runs'])
+    query_iter = itertools.cycle(queries)
+    results = {}
+
+    start = time.perf_counter()
+    euclidean_mat = cdist(embeddings, embeddings, 'euclidean')
+    results['cdist_matrix_build'] = {'seconds' : time.perf_counter() - start, 'bytes' : int(euclidean_mat.nbytes)}
+    results['cdist_argsort'] = _latency(_timings(lambda: euclidean_mat[next(query_iter), :].argsort()[:6], config['n_runs']))
+
+    exact = ExactIndex(embeddings)
+    results['exact_single'] = _latency(_timings(lambda: exact.neighbors(next(query_iter), 5), config['n_runs']))
+    results['exact_batch']  = _latency(_timings(lambda: exact.neighbors(queries, 5), 5, n_warmup=1), len(queries))
+
+    start = time.perf_counter()
+    ivf = IVFIndex(embeddings)
+    results['ivf_build'] = {'seconds' : time.perf_counter() - start}
+    results['ivf_single'] = _latency(_timings(lambda: ivf.neighbors(next(query_iter), 5), config['n_runs']))
+    exact_ids = exact.neighbors(queries, 5)[1]
+    ivf_ids   = ivf.neighbors(queries, 5)[1]
+    results['ivf_recall_at_5'] = float(np.mean([len(set(a) & set(b)) / 5 for a, b in zip(exact_ids, ivf_ids)]))
+
+    with tempfile.TemporaryDirectory() as directory:
+        data  = synthetic_players(config['n_players'], 2, config['seed'])
+        store = EmbeddingStore.write(directory, embeddings, embeddings, data)
+        index = FilteredIndex(store)
+        filters = {'League' : ['Ligue 2', 'Eredivisie'], 'Age' : (None, 23), 'MarketValue' : (None, 5e6)}
+        results['filtered_single'] = _latency(_timings(lambda: index.similar(next(query_iter), 5, **filters), config['n_runs']))
+        results['filtered_candidates'] = int(len(index.candidates(**filters)))
+        del store, index
+    return results
+
+BENCHMARKS = {
+    'tm_parse'       : bench_tm_parse,
+    'name_matching'  : bench_name_matching,
+    'training_epoch' : bench_training_epoch,
+    'encode'         : bench_encode,
+    'similarity'     : bench_similarity,
+}
+
+#------------------------------------------------------------------------------------------------------------------
+# Runner
+
+def _run_isolated(name, config, n_threads):
+    '''
+    Runs one benchmark (in its own process) and adds its peak memory: peak RSS of the process and
+    the part of it above the RSS after the imports (tracemalloc is not used, it would slow down the timings).
+    '''
+    torch.set_num_threads(n_threads)
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+    start = time.perf_counter()
+    results = BENCHMARKS[name](config)
+    results['seconds']          = time.perf_counter() - start
+    results['peak_rss_mb']      = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+    results['peak_rss_delta_mb'] = results['peak_rss_mb'] - baseline_rss
+    return results
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit'   : commit,
+        'python'   : platform.python_version(),
+        'numpy'    : np.__version__,
+        'pandas'   : pd.__version__,
+        'torch'    : torch.__version__,
+        'platform' : platform.platform(),
+        'cpus'     : os.cpu_count(),
+    }
+
+def run_benchmarks(names=None, config=None, n_threads=1, verbose=True):
+    '''
+    Runs the benchmarks, each one in a fresh process (so that peak RSS is per benchmark).
+    Returns a JSON serializable dict with the environment, the config and the results.
+    '''
+    config  = {**DEFAULT_CONFIG, **(config or {})}
+    names   = names or list(BENCHMARKS)
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    for name in names:
+        with context.Pool(1) as pool:
+            results[name] = pool.apply(_run_isolated, (name, config, n_threads))
+        if verbose:
+            print(f"{name:>15}: {results[name]['seconds']:.1f}s, peak RSS {results[name]['peak_rss_mb']:.0f} MB "
+                  f"(+{results[name]['peak_rss_delta_mb']:.0f} MB)")
+    return {'timestamp' : time.strftime('%Y-%m-%dT%H:%M:%S'), 'environment' : environment(), 'config' : config, 'results' : results}
+
+def _flatten(results, prefix=''):
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f'{prefix}{key}.'))
+        elif isinstance(value, (int, float)):
+            flat[f'{prefix}{key}'] = value
+    return flat
+
+def compare_results(current, baseline):
+    '''
+    Relative change of the latency and throughput metrics between two runs (new / old).
+    '''
+    new, old = _flatten(current['results']), _flatten(baseline['results'])
+    metrics  = [key for key in new if key in old and key.endswith(('p50_ms', 'p99_ms', 'items_per_sec'))]
+    return pd.DataFrame([{'metric' : key, 'baseline' : old[key], 'current' : new[key],
+                          'ratio' : new[key] / old[key] if old[key] else float('nan')} for key in metrics])
@@ -0,0 +1,116 @@
+#----------------------------------------------------------------------------------------------------------------------------------------
+# LIBRARIES
+import argparse
+import os
+import pandas as pd
+from processing import filter_players, build_features, merge_transfermarkt, add_elo_ranks, write_dataset
+from processing import read_elo_snapshots, build_alias_index, update_alias_index, save_alias_index, load_alias_index, missing_elo_report
+from processing.dataset import EXCLUDED_LEAGUES
+#----------------------------------------------------------------------------------------------------------------------------------------
+# GLOBAL (DEFAULT) PARAMETERS AND SETTINGS
+
+FBREF_PATH   = 'data/FBref/players_stats_FBref.csv'
+TM_PATH      = 'data/Transfermarkt/players_bio_tm.csv'
+CLUBELO_PATH = 'data/Clubelo/clubelo_2024-01-01.csv'
+ALIAS_PATH   = 'data/Clubelo/club_aliases.csv'
+OUTPUT_PATH  = 'data/training_dataset.parquet'
+MIN_90S      = 5
+THRESHOLD    = 0.9
+N_WORKERS    = 1
+
+
+
+if __name__ == "__main__":
+
+    #----------------------------------------------------------------------------------------------------------------------------------------
+    # PARSE ARGUMENTS
+    parser = argparse.ArgumentParser(
+        description = "Python script to build the training dataset (same steps as data_processing.ipynb)"
+        )
+
+    # Paths
+    parser.add_argument("-FP","--FBrefPath",
+                        type    = str,
+                        default = FBREF_PATH,
+                        help    = "Path to the FBref players stats"
+                       )
+    parser.add_argument("-TP","--TransfermarktPath",
+                        type    = str,
+                        default = TM_PATH,
+                        help    = "Path to the Transfermarkt players bio"
+                       )
+    parser.add_argument("-EP","--ClubeloPath",
+                        type    = str,
+                        default = CLUBELO_PATH,
+                        help    = "Path to the Club Elo ratings (a snapshot .csv, or a directory / glob pattern of snapshots)"
+                       )
+    parser.add_argument("-AP","--AliasPath",
+                        type    = str,
+                        default = ALIAS_PATH,
+                        help    = "Path to the Club Elo --> FBref club names index (built and saved on the first run, then reused and extended with the clubs of new snapshots; delete it to rebuild)"
+                       )
+    parser.add_argument("-OP","--OutputPath",
+                        type    = str,
+                        default = OUTPUT_PATH,
+                        help    = "Path to the output dataset (.parquet, a .csv copy and a .schema.json manifest are written alongside)"
+                       )
+
+    # Settings
+    parser.add_argument("-M","--Min90s",
+                        type    = float,
+                        default = MIN_90S,
+                        help    = "Minimum number of 90s played"
+                       )
+    parser.add_argument("-T","--Threshold",
+                        type    = float,
+                        default = THRESHOLD,
+                        help    = "Jaro-Winkler threshold for the player names matching"
+                       )
+    parser.add_argument("-NW","--NumWorkers",
+                        type    = int,
+                        default = N_WORKERS,
+                        help    = "Number of processes for the player names matching"
+                       )
+    parser.add_argument("-ED","--EloDate",
+                        type    = str,
+                        default = None,
+                        help    = "Date of the Club Elo ratings (YYYY-MM-DD, latest snapshot on or before it), or a column of the FBref data holding one date per row. Defaults to the latest snapshot"
+                       )
+
+    args = parser.parse_args()
+    if not args.OutputPath.endswith('.parquet'):
+        parser.error("--OutputPath must be a .parquet file (the .csv copy is written next to it)")
+
+    #----------------------------------------------------------------------------------------------------------------------------------------
+    # PIPELINE
+
+    fbref_df = filter_players(pd.read_csv(args.FBrefPath),min_90s=args.Min90s)
+    features_df = build_features(fbref_df)
+    print(f"FBref features: {features_df.shape}")
+
+    merged_df = merge_transfermarkt(features_df,pd.read_csv(args.TransfermarktPath),threshold=args.Threshold,n_workers=args.NumWorkers)
+    merged_df = merged_df[~merged_df['League'].isin(EXCLUDED_LEAGUES)]
+    print(f"Merged with Transfermarkt: {merged_df.shape}")
+
+    elo_df = read_elo_snapshots(args.ClubeloPath)
+    if os.path.exists(args.AliasPath):
+        alias_index,n_added = update_alias_index(load_alias_index(args.AliasPath),elo_df,features_df)
+        if n_added:
+            save_alias_index(alias_index,args.AliasPath)
+            print(f"Club names index: {n_added} new clubs added")
+    else:
+        alias_index = build_alias_index(elo_df,features_df)
+        save_alias_index(alias_index,args.AliasPath)
+    print(f"Club names index: {alias_index['Method'].value_counts().to_dict()} ({args.AliasPath})")
+
+    dataset_df = add_elo_ranks(merged_df,elo_df,alias_index=alias_index,date=args.EloDate)
+    # Missing ranks would turn into NaN losses during training: those players are dropped (and reported)
+    missing_report, missing = missing_elo_report(dataset_df)
+    if len(missing):
+        dataset_df = dataset_df.drop(index=missing.index).reset_index(drop=True)
+        print(f"Dropped {len(missing)} players without Club Elo ratings:\n{missing_report.to_string(index=False)}")
+    manifest_path = write_dataset(dataset_df,args.OutputPath)
+    dataset_df.to_csv(os.path.splitext(args.OutputPath)[0] + '.csv',index=False)
+    print(f"Training dataset: {dataset_df.shape} --> {args.OutputPath} ({manifest_path})")
+
+    #----------------------------------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,5 @@
+from .trainer import DataLoaderTrainer,ResidentTrainer,EnsembleTrainer,StreamingTrainer,DistributedTrainer,ENGINES,Throughput,build_optimizer,build_scheduler,beta_schedule,full_beta_epoch
+from .checkpoints import CheckpointManager,state_path,ensemble_path,bundle_path
+from .telemetry import Telemetry,PhaseTimer,memory_stats
+from .distributed import setup_distributed,cleanup_distributed
+from .stopping import EarlyStopping
\ No newline at end of file
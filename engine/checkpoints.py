@@ -0,0 +1,168 @@
+#------------------------------------------------------------------------------------------------------------------
+# Libraries
+
+import os
+import queue
+import threading
+import time
+import torch
+
+#------------------------------------------------------------------------------------------------------------------
+# Global variables
+
+CHECKPOINT_EVERY = 50
+
+#------------------------------------------------------------------------------------------------------------------
+# Helpers
+
+def _to_cpu(obj):
+    '''
+    Recursive copy of a (nested) state dict with every tensor detached and cloned on the CPU,
+    so that training can go on while the snapshot is written.
+    '''
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to('cpu', copy=True)
+    if isinstance(obj, dict):
+        return {key : _to_cpu(value) for key,value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_to_cpu(value) for value in obj)
+    return obj
+
+def _atomic_save(obj, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + '.tmp'
+    torch.save(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+def state_path(checkpoints_path):
+    '''
+    Path of the full training state stored next to the model weights (vae.pth --> vae_state.pth).
+    '''
+    root, ext = os.path.splitext(checkpoints_path)
+    return root + '_state' + (ext or '.pth')
+
+def ensemble_path(checkpoints_path):
+    '''
+    Path of the VAEEnsemble weights trained with --NumModels > 1 (vae.pth --> vae_ensemble.pth),
+    vae.pth itself always holds a plain VAE state dict.
+    '''
+    root, ext = os.path.splitext(checkpoints_path)
+    return root + '_ensemble' + (ext or '.pth')
+
+def bundle_path(checkpoints_path):
+    '''
+    Path of the model bundle stored next to the model weights (vae.pth --> vae_bundle.pth).
+    '''
+    root, ext = os.path.splitext(checkpoints_path)
+    return root + '_bundle' + (ext or '.pth')
+
+#------------------------------------------------------------------------------------------------------------------
+# Checkpoint manager
+
+class CheckpointManager:
+    '''
+    Saves checkpoints from a background thread:
+    - the weights of the best model (lowest test loss, from epoch track_from on) at checkpoints_path,
+      as a plain state dict (same format as before, so experiments.ipynb loads it unchanged)
+    - every `every` epochs (and at the last one) the full training state at state_path(checkpoints_path):
+      model, optimizer, scheduler, epoch, loss history, best loss and RNG states, used by --Resume
+    Snapshots are taken on the CPU before being queued, so the training loop only pays for the copy
+    (the time spent by the writer in torch.save is accumulated in save_seconds).
+    '''
+    def __init__(self, checkpoints_path, every=CHECKPOINT_EVERY, track_from=0):
+        self.checkpoints_path = checkpoints_path
+        self.state_path       = state_path(checkpoints_path)
+        self.every            = every
+        self.track_from       = track_from
+        self.best_loss        = float('inf')
+        self.best_epoch       = None
+        self.save_seconds     = 0.0
+        self._queue           = queue.Queue()
+        self._error           = None
+        self._thread          = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _writer(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                obj, path = item
+                start = time.perf_counter()
+                _atomic_save(obj, path)
+                self.save_seconds += time.perf_counter() - start
+            except Exception as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _submit(self, obj, path):
+        if self._error is not None:
+            raise RuntimeError(f"Checkpoint writer failed: {self._error}") from self._error
+        self._queue.put((obj, path))
+
+    def step(self, epoch, model, optimizer, scheduler, history, test_loss, last=False):
+        '''
+        To be called at the end of every epoch (0-based). Returns True if the model is a new best.
+        '''
+        is_best = epoch >= self.track_from and test_loss < self.best_loss
+        if is_best:
+            self.best_loss  = test_loss
+            self.best_epoch = epoch
+            self._submit(_to_cpu(model.state_dict()), self.checkpoints_path)
+
+        if last or (self.every and (epoch + 1) % self.every == 0):
+            state = {
+                'epoch'      : epoch,
+                'model'      : model.state_dict(),
+                'optimizer'  : optimizer.state_dict(),
+                'scheduler'  : scheduler.state_dict(),
+                'history'    : history,
+                'best_loss'  : self.best_loss,
+                'best_epoch' : self.best_epoch,
+                'rng'        : {
+                    'torch' : torch.get_rng_state(),
+                    'cuda'  : torch.cuda.get_rng_state_all() if torch.cuda.is_available() else None,
+                },
+            }
+            self._submit(_to_cpu(state), self.state_path)
+        return is_best
+
+    def resume(self, model, optimizer, scheduler, map_location='cpu'):
+        '''
+        Restores model, optimizer, scheduler, best loss and RNG states from state_path.
+        Returns the epoch to start from and the loss history.
+        '''
+        # map_location also moves the RNG states: they are brought back to the CPU before being restored
+        state = torch.load(self.state_path, map_location=map_location, weights_only=False)
+        model.load_state_dict(state['model'])
+        optimizer.load_state_dict(state['optimizer'])
+        scheduler.load_state_dict(state['scheduler'])
+        self.best_loss  = state['best_loss']
+        self.best_epoch = state['best_epoch']
+        torch.set_rng_state(state['rng']['torch'].cpu())
+        if state['rng']['cuda'] is not None and torch.cuda.is_available():
+            torch.cuda.set_rng_state_all([rng_state.cpu() for rng_state in state['rng']['cuda']])
+        return state['epoch'] + 1, state['history']
+
+    def wait(self):
+        self._queue.join()
+        if self._error is not None:
+            raise RuntimeError(f"Checkpoint writer failed: {self._error}") from self._error
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        if self._error is not None:
+            raise RuntimeError(f"Checkpoint writer failed: {self._error}") from self._error
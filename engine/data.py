@@ -0,0 +1,51 @@
+#------------------------------------------------------------------------------------------------------------------
+# Libraries
+
+import pandas as pd
+import torch
+from processing.dataset import NON_FEATURE_COLUMNS
+
+#------------------------------------------------------------------------------------------------------------------
+# Global variables
+
+TRAIN_FRACTION = 0.8
+
+#------------------------------------------------------------------------------------------------------------------
+# Loading and preprocessing
+
+def read_training_data(path):
+    '''
+    Reads the training dataset, either the .csv or the .parquet written by build_dataset.py.
+    '''
+    return pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+
+def feature_columns(data):
+    '''
+    Columns of the training dataset fed to the VAE, in order.
+    '''
+    return [column for column in data.columns if column not in NON_FEATURE_COLUMNS]
+
+def load_features(path):
+    '''
+    Returns the training dataset and its feature matrix as a float32 tensor (non-numeric columns dropped).
+    '''
+    data = read_training_data(path)
+    X = data[feature_columns(data)].to_numpy(dtype='float32')
+    return data, torch.tensor(X, dtype=torch.float32)
+
+def standardize(X, mean=None, std=None):
+    '''
+    Standardizes X column-wise (with its own mean/std unless given). Returns X, mean and std.
+    '''
+    mean = X.mean(dim=0) if mean is None else mean
+    std  = X.std(dim=0) if std is None else std
+    return (X - mean) / std, mean, std
+
+def train_test_split(X, train_fraction=TRAIN_FRACTION):
+    '''
+    Random train-test split (consumes the global torch RNG as training.py always did).
+    '''
+    permuted_idx = torch.randperm(X.shape[0])
+    X_train   = X[permuted_idx[:int(train_fraction*X.shape[0])]]
+    X_test    = X[permuted_idx[int(train_fraction*X.shape[0]):]]
+    return X_train, X_test
@@ -0,0 +1,57 @@
+#------------------------------------------------------------------------------------------------------------------
+# Libraries
+
+import os
+import socket
+import torch
+import torch.distributed as dist
+
+#------------------------------------------------------------------------------------------------------------------
+# Process group
+#
+# Data-parallel training is launched locally with torchrun, which starts one training.py per process
+# and sets RANK / WORLD_SIZE / MASTER_ADDR / MASTER_PORT:
+#     torchrun --standalone --nproc_per_node 8 training.py --Engine distributed
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('localhost', 0))
+        return s.getsockname()[1]
+
+def setup_distributed(backend='gloo'):
+    '''
+    Joins the process group described by the torchrun environment variables (a group of one process
+    when training.py is started directly). Returns rank and world size.
+    '''
+    if not dist.is_initialized():
+        if 'WORLD_SIZE' not in os.environ:
+            os.environ.update({'RANK' : '0', 'WORLD_SIZE' : '1', 'MASTER_ADDR' : 'localhost', 'MASTER_PORT' : str(_free_port())})
+        dist.init_process_group(backend)
+    return dist.get_rank(), dist.get_world_size()
+
+def cleanup_distributed():
+    if dist.is_initialized():
+        dist.destroy_process_group()
+
+#------------------------------------------------------------------------------------------------------------------
+# Collectives
+
+def broadcast_parameters(model, src=0):
+    '''
+    Copies the parameters of rank src to every rank (all ranks start from the same weights).
+    '''
+    for parameter in model.parameters():
+        dist.broadcast(parameter.data, src)
+
+def all_reduce_gradients(parameters):
+    '''
+    Sums the gradients over the ranks with a single all-reduce on a flat buffer.
+    Since vae_loss sums over the rows, the result is the gradient of the whole (global) batch.
+    '''
+    grads = [parameter.grad for parameter in parameters]
+    flat = torch.cat([grad.reshape(-1) for grad in grads])
+    dist.all_reduce(flat)
+    offset = 0
+    for grad in grads:
+        grad.copy_(flat[offset:offset + grad.numel()].view_as(grad))
+        offset += grad.numel()
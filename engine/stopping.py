@@ -0,0 +1,48 @@
+#------------------------------------------------------------------------------------------------------------------
+# Libraries
+
+import math
+
+#------------------------------------------------------------------------------------------------------------------
+# Early stopping
+
+class EarlyStopping:
+    '''
+    Convergence-aware epoch budget (used by training.py and the sweeps):
+    - the test set is evaluated every eval_every epochs and at the last one
+    - training stops when the test loss has not improved by more than min_delta for patience epochs
+      (patience=0 disables it)
+    - with min_lr (the floor of ReduceLROnPlateau), training stops as soon as the learning rate reaches it
+    - nothing is tracked before epoch track_from (the end of the beta warmup, see full_beta_epoch):
+      training never stops before beta = 1 has been optimised
+    best_loss / best_epoch (0-based) track the best evaluated test loss, stop_reason why training stopped.
+    '''
+    def __init__(self, epochs, patience=0, min_delta=0.0, eval_every=1, min_lr=None, track_from=0):
+        self.epochs      = epochs
+        self.patience    = patience
+        self.min_delta   = min_delta
+        self.eval_every  = max(1, eval_every)
+        self.min_lr      = min_lr
+        self.track_from  = track_from
+        self.best_loss   = float('inf')
+        self.best_epoch  = None
+        self.stop_reason = None
+
+    def should_evaluate(self, epoch):
+        return (epoch + 1) % self.eval_every == 0 or epoch == self.epochs - 1
+
+    def step(self, epoch, test_loss, lr):
+        '''
+        To be called at the end of every epoch (test_loss is NaN when the test set was not evaluated,
+        lr is the learning rate after the scheduler step). Returns True if training should stop.
+        '''
+        if epoch < self.track_from:
+            return False
+        if not math.isnan(test_loss) and test_loss < self.best_loss - self.min_delta:
+            self.best_loss  = test_loss
+            self.best_epoch = epoch
+        if self.patience and not math.isnan(test_loss) and epoch - (self.best_epoch if self.best_epoch is not None else self.track_from - 1) >= self.patience:
+            self.stop_reason = f"no improvement of the test loss larger than {self.min_delta:g} in {self.patience} epochs"
+        elif self.min_lr is not None and lr <= self.min_lr:
+            self.stop_reason = f"learning rate at its floor ({self.min_lr:g})"
+        return self.stop_reason is not None
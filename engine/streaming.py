@@ -0,0 +1,225 @@
+#------------------------------------------------------------------------------------------------------------------
+# Libraries
+
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import torch
+from .data import NON_FEATURE_COLUMNS, TRAIN_FRACTION
+
+#------------------------------------------------------------------------------------------------------------------
+# Global variables
+
+# A player (name and birth year) always falls on the same side of the train-test split, whatever the season
+SPLIT_KEY_COLUMNS = ['Player', 'Born']
+
+CHUNK_SIZE     = 65536
+SHUFFLE_BUFFER = 65536
+HASH_BUCKETS   = 10000
+
+#------------------------------------------------------------------------------------------------------------------
+# Shards
+
+def list_shards(path):
+    '''
+    Files of a (possibly sharded) dataset: a single .csv / .parquet file, a directory of them or a glob pattern.
+    '''
+    if os.path.isdir(path):
+        shards = [os.path.join(path, name) for name in os.listdir(path)]
+    else:
+        shards = glob.glob(path)
+    shards = sorted(shard for shard in shards if shard.endswith(('.csv', '.parquet')))
+    if not shards:
+        raise FileNotFoundError(f"No .csv or .parquet shards found at {path}")
+    return shards
+
+def shard_columns(shard):
+    '''
+    Column names of a shard, read from the Parquet schema or the CSV header.
+    '''
+    if shard.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(shard).schema_arrow.names
+    return pd.read_csv(shard, nrows=0).columns.tolist()
+
+def streaming_feature_columns(shards):
+    '''
+    Feature columns of a sharded dataset (taken from the first shard, every shard must have them).
+    '''
+    return [column for column in shard_columns(shards[0]) if column not in NON_FEATURE_COLUMNS]
+
+def iter_chunks(shard, columns, chunk_size=CHUNK_SIZE):
+    '''
+    Yields the given columns of a shard as DataFrames of at most chunk_size rows.
+    '''
+    if shard.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(shard).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(shard, usecols=columns, chunksize=chunk_size)
+
+def split_mask(chunk, train_fraction=TRAIN_FRACTION):
+    '''
+    True for the rows in the training split: the split is decided by a hash of SPLIT_KEY_COLUMNS,
+    so it does not depend on the order of the rows, on the sharding or on the file format.
+    '''
+    keys = pd.DataFrame({'Player' : chunk['Player'].astype(str), 'Born' : chunk['Born'].astype('float64')})
+    buckets = pd.util.hash_pandas_object(keys, index=False).to_numpy(dtype=np.uint64) % HASH_BUCKETS
+    return buckets < int(train_fraction * HASH_BUCKETS)
+
+#------------------------------------------------------------------------------------------------------------------
+# One-pass statistics
+
+class RunningStats:
+    '''
+    Column-wise count, mean and sum of squared deviations updated chunk by chunk (Welford / Chan et al.
+    parallel update, in float64), so that mean and std are computed in one pass and stats of different
+    shards can be merged.
+    '''
+    def __init__(self, n_features):
+        self.count = 0
+        self.mean  = np.zeros(n_features)
+        self.m2    = np.zeros(n_features)
+
+    def update(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if len(X) == 0:
+            return self
+        other = RunningStats(X.shape[1])
+        other.count = len(X)
+        other.mean  = X.mean(axis=0)
+        other.m2    = ((X - other.mean)**2).sum(axis=0)
+        return self.merge(other)
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean  = self.mean + delta * other.count / count
+        self.m2    = self.m2 + other.m2 + delta**2 * self.count * other.count / count
+        self.count = count
+        return self
+
+    @property
+    def std(self):
+        # Unbiased, as torch.std in standardize()
+        return np.sqrt(self.m2 / max(self.count - 1, 1))
+
+def _shard_stats(shard, columns, train_fraction, chunk_size):
+    stats   = RunningStats(len(columns))
+    n_train = 0
+    for chunk in iter_chunks(shard, columns + SPLIT_KEY_COLUMNS, chunk_size):
+        stats.update(chunk[columns].to_numpy(dtype=np.float64))
+        n_train += int(split_mask(chunk, train_fraction).sum())
+    return stats, n_train
+
+def scan_shards(shards, columns, train_fraction=TRAIN_FRACTION, chunk_size=CHUNK_SIZE, n_workers=1):
+    '''
+    Single pass over the shards (in parallel on n_workers processes): feature mean and std (float32 tensors,
+    over all the rows as standardize() does in memory) and number of train / test rows.
+    '''
+    jobs = [(shard, columns, train_fraction, chunk_size) for shard in shards]
+    if n_workers == 1:
+        results = [_shard_stats(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            results = list(executor.map(_shard_stats, *zip(*jobs)))
+
+    stats   = RunningStats(len(columns))
+    n_train = 0
+    for shard_stats, shard_train in results:
+        stats.merge(shard_stats)
+        n_train += shard_train
+    mean = torch.tensor(stats.mean, dtype=torch.float32)
+    std  = torch.tensor(stats.std, dtype=torch.float32)
+    return mean, std, n_train, stats.count - n_train
+
+#------------------------------------------------------------------------------------------------------------------
+# Dataset
+
+class StreamingDataset(torch.utils.data.IterableDataset):
+    '''
+    Standardized feature batches read chunk by chunk from the shards of one split ('train' or 'test'):
+    - with shuffle, the shard order is permuted and rows go through a shuffling buffer of shuffle_buffer rows
+      (memory stays bounded by the buffer plus one chunk, whatever the size of the dataset)
+    - the permutations are drawn from seed, which StreamingTrainer sets with set_seed() before every epoch
+    - with DataLoader workers, every worker reads its own subset of the shards
+    Yields float32 tensors of batch_size rows (the last one can be smaller), to be used with DataLoader(batch_size=None).
+    '''
+    def __init__(self, shards, columns, mean, std, batch_size, split='train', train_fraction=TRAIN_FRACTION,
+                 shuffle=True, shuffle_buffer=SHUFFLE_BUFFER, chunk_size=CHUNK_SIZE):
+        self.shards         = list(shards)
+        self.columns        = list(columns)
+        self.mean           = np.asarray(mean, dtype=np.float32)
+        self.std            = np.asarray(std, dtype=np.float32)
+        self.batch_size     = batch_size
+        self.split          = split
+        self.train_fraction = train_fraction
+        self.shuffle        = shuffle
+        self.shuffle_buffer = shuffle_buffer
+        self.chunk_size     = chunk_size
+        self.seed           = 0
+
+    def set_seed(self, seed):
+        self.seed = seed
+
+    def _chunks(self, rng):
+        shards = self.shards
+        worker = torch.utils.data.get_worker_info()
+        if worker is not None:
+            shards = shards[worker.id::worker.num_workers]
+        if self.shuffle:
+            shards = [shards[i] for i in rng.permutation(len(shards))]
+        for shard in shards:
+            for chunk in iter_chunks(shard, self.columns + SPLIT_KEY_COLUMNS, self.chunk_size):
+                mask = split_mask(chunk, self.train_fraction)
+                if self.split == 'test':
+                    mask = ~mask
+                X = chunk[self.columns].to_numpy(dtype=np.float32)[mask]
+                if len(X):
+                    yield (X - self.mean) / self.std
+
+    def __iter__(self):
+        worker = torch.utils.data.get_worker_info()
+        rng = np.random.default_rng([self.seed, worker.id if worker is not None else 0])
+        pool = np.empty((0, len(self.columns)), dtype=np.float32)
+        for X in self._chunks(rng):
+            pool = np.concatenate((pool, X))
+            if not self.shuffle:
+                n_full = len(pool) // self.batch_size * self.batch_size
+                for start in range(0, n_full, self.batch_size):
+                    yield torch.from_numpy(pool[start:start + self.batch_size])
+                pool = pool[n_full:]
+                continue
+            if len(pool) < self.shuffle_buffer + self.batch_size:
+                continue
+            # Batches are drawn at random from the pool, shuffle_buffer rows are kept to be mixed with the next chunks
+            pool = pool[rng.permutation(len(pool))]
+            n_out = (len(pool) - self.shuffle_buffer) // self.batch_size * self.batch_size
+            for start in range(0, n_out, self.batch_size):
+                yield torch.from_numpy(pool[start:start + self.batch_size])
+            pool = pool[n_out:]
+        if self.shuffle:
+            pool = pool[rng.permutation(len(pool))]
+        for start in range(0, len(pool), self.batch_size):
+            yield torch.from_numpy(pool[start:start + self.batch_size])
+
+def streaming_loaders(shards, columns, mean, std, batch_size, train_fraction=TRAIN_FRACTION,
+                      shuffle_buffer=SHUFFLE_BUFFER, chunk_size=CHUNK_SIZE, n_workers=0):
+    '''
+    Train (shuffled) and test DataLoaders over StreamingDatasets of the same shards.
+    '''
+    loaders = []
+    for split in ('train', 'test'):
+        dataset = StreamingDataset(shards, columns, mean, std, batch_size,
+                                   split          = split,
+                                   train_fraction = train_fraction,
+                                   shuffle        = split == 'train',
+                                   shuffle_buffer = shuffle_buffer,
+                                   chunk_size     = chunk_size)
+        loaders.append(torch.utils.data.DataLoader(dataset, batch_size=None, num_workers=min(n_workers, len(shards))))
+    return loaders
@@ -0,0 +1,226 @@
+#------------------------------------------------------------------------------------------------------------------
+# Libraries
+
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+import torch
+from models import VAE,kaiming_weights_init
+from .trainer import ResidentTrainer,build_optimizer,build_scheduler,beta_schedule,full_beta_epoch
+from .stopping import EarlyStopping
+
+#------------------------------------------------------------------------------------------------------------------
+# Global variables
+
+# Default search space: every hyperparameter of training.py (same names as its command line options)
+SEARCH_SPACE = {
+    'HiddenDim1'   : [64],
+    'HiddenDim2'   : [32],
+    'LatentDim'    : [4, 8, 16, 32],
+    'LearningRate' : [1e-3, 1e-2],
+    'BatchSize'    : [512],
+    'Warmup'       : [False, True],
+}
+
+RESULTS_FILE = 'results.csv'
+
+# Worker state, set once per process by _init_worker
+_WORKER = {}
+
+#------------------------------------------------------------------------------------------------------------------
+# Search space
+
+def grid_trials(space):
+    '''
+    All the combinations of the values in space (a dict name --> list of values).
+    '''
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+def random_trials(space, n_trials, seed=0):
+    '''
+    n_trials random configurations. Every entry of space is either a list of values (sampled uniformly)
+    or a dict {'low': .., 'high': .., 'log': bool, 'int': bool} describing a range.
+    '''
+    rng = random.Random(seed)
+    trials = []
+    for _ in range(n_trials):
+        trial = {}
+        for name, values in space.items():
+            if isinstance(values, dict):
+                low, high = values['low'], values['high']
+                value = math.exp(rng.uniform(math.log(low), math.log(high))) if values.get('log') else rng.uniform(low, high)
+                trial[name] = int(round(value)) if values.get('int') else value
+            else:
+                trial[name] = rng.choice(values)
+        trials.append(trial)
+    return trials
+
+def load_search_space(path):
+    with open(path) as f:
+        return json.load(f)
+
+#------------------------------------------------------------------------------------------------------------------
+# Pruning
+
+class MedianPruner:
+    '''
+    A trial is pruned at a report epoch if its best test loss so far is worse than the median of the
+    best test losses the other trials reported at the same epoch (only after warmup_epochs and once
+    at least min_trials trials reported there). Reports are shared across processes through a Manager dict.
+    '''
+    def __init__(self, reports, lock, every=100, warmup_epochs=200, min_trials=4):
+        self.reports       = reports
+        self.lock          = lock
+        self.every         = every
+        self.warmup_epochs = warmup_epochs
+        self.min_trials    = min_trials
+
+    def should_prune(self, epoch, best_loss):
+        if not self.every or (epoch + 1) % self.every != 0:
+            return False
+        with self.lock:
+            previous = self.reports.get(epoch, [])
+            self.reports[epoch] = previous + [best_loss]
+        if epoch + 1 < self.warmup_epochs or len(previous) < self.min_trials:
+            return False
+        return best_loss > statistics.median(previous)
+
+#------------------------------------------------------------------------------------------------------------------
+# Workers
+
+def _init_worker(shm_name, shape, n_train, n_threads, pruner):
+    '''
+    Attaches to the shared dataset (no copy) and caps the intra-op threads of the process.
+    '''
+    torch.set_num_threads(n_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+    shm = shared_memory.SharedMemory(name=shm_name)
+    X = torch.from_numpy(np.ndarray(shape, dtype=np.float32, buffer=shm.buf))
+    _WORKER.update(shm=shm, X_train=X[:n_train], X_test=X[n_train:], pruner=pruner)
+
+def run_trial(trial_id, params, epochs, seed, output_dir, device='cpu', stopping=None):
+    '''
+    Trains one configuration with the resident engine and saves the weights of its best epoch.
+    Best epoch, pruning and ranking only use the test losses at beta = 1 (after the warmup of the Warmup trials).
+    stopping holds the EarlyStopping options (patience, min_delta, eval_every, stop_at_min_lr).
+    Returns a row of the results table.
+    '''
+    torch.manual_seed(seed + trial_id)
+    start   = time.perf_counter()
+    X_train = _WORKER['X_train']
+    X_test  = _WORKER['X_test']
+    pruner  = _WORKER['pruner']
+
+    vae = VAE(
+        input_dim   = X_train.shape[1],
+        latent_dim  = int(params['LatentDim']),
+        hidden_dim1 = int(params['HiddenDim1']),
+        hidden_dim2 = int(params['HiddenDim2'])).to(device)
+    vae.apply(kaiming_weights_init)
+    optimizer = build_optimizer(vae, float(params['LearningRate']))
+    stopping  = dict(stopping or {})
+    scheduler = build_scheduler(optimizer, eval_every=stopping.get('eval_every', 1))
+    betas     = beta_schedule(epochs, bool(params['Warmup']), device)
+    track     = full_beta_epoch(epochs, bool(params['Warmup']))
+    trainer   = ResidentTrainer(vae, optimizer, X_train, X_test, int(params['BatchSize']), device)
+    stopper   = EarlyStopping(epochs,
+                              patience   = stopping.get('patience', 0),
+                              min_delta  = stopping.get('min_delta', 0.0),
+                              eval_every = stopping.get('eval_every', 1),
+                              min_lr     = scheduler.min_lrs[0] if stopping.get('stop_at_min_lr') else None,
+                              track_from = track)
+
+    status, best_loss, best_epoch, best_state = 'completed', float('inf'), None, None
+    for epoch in range(epochs):
+        evaluate = stopper.should_evaluate(epoch)
+        train_loss,_,_,test_loss = trainer.epoch(betas[epoch], evaluate=evaluate)
+        if evaluate:
+            scheduler.step(test_loss)
+            if not math.isfinite(test_loss):
+                status = 'failed'
+                break
+            if epoch >= track and test_loss < best_loss:
+                best_loss, best_epoch = test_loss, epoch
+                best_state = {key : value.detach().to('cpu', copy=True) for key,value in vae.state_dict().items()}
+        if pruner is not None and best_state is not None and pruner.should_prune(epoch, best_loss):
+            status = 'pruned'
+            break
+        if stopper.step(epoch, test_loss, optimizer.param_groups[0]['lr']):
+            status = 'stopped'
+            break
+
+    checkpoint = None
+    if best_state is not None:
+        checkpoint = os.path.join(output_dir, f'trial_{trial_id:03d}.pth')
+        torch.save(best_state, checkpoint)
+
+    return {
+        'trial'          : trial_id,
+        **params,
+        'status'         : status,
+        'best_test_loss' : best_loss if best_state is not None else float('nan'),
+        'best_epoch'     : best_epoch + 1 if best_epoch is not None else None,
+        'epochs_run'     : epoch + 1,
+        'final_lr'       : optimizer.param_groups[0]['lr'],
+        'seconds'        : time.perf_counter() - start,
+        'checkpoint'     : checkpoint,
+    }
+
+#------------------------------------------------------------------------------------------------------------------
+# Sweep
+
+def run_sweep(X_train, X_test, trials, epochs, output_dir, n_workers=None, seed=1610,
+              prune_every=100, prune_warmup=200, prune_min_trials=4, stopping=None, verbose=True):
+    '''
+    Runs the trials on a process pool sized to the available cores:
+    - X_train / X_test (already normalized) are copied once into shared memory and attached by every worker
+    - every worker gets cpu_count // n_workers torch threads, to avoid oversubscription
+    - weak trials are pruned with MedianPruner (prune_every=0 disables pruning)
+    - converged trials stop early with the EarlyStopping options in stopping (see run_trial)
+    Results (one row per trial, best first) are written to output_dir/results.csv and returned.
+    '''
+    os.makedirs(output_dir, exist_ok=True)
+    n_cpus    = os.cpu_count() or 1
+    n_workers = max(1, min(n_workers or n_cpus, len(trials)))
+    n_threads = max(1, n_cpus // n_workers)
+
+    X = np.concatenate([X_train.numpy(), X_test.numpy()]).astype(np.float32)
+    shm = shared_memory.SharedMemory(create=True, size=X.nbytes)
+    np.ndarray(X.shape, dtype=np.float32, buffer=shm.buf)[:] = X
+
+    context = multiprocessing.get_context('spawn')
+    manager = context.Manager()
+    pruner  = MedianPruner(manager.dict(), manager.Lock(), prune_every, prune_warmup, prune_min_trials) if prune_every else None
+
+    rows = []
+    try:
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(shm.name, X.shape, len(X_train), n_threads, pruner)) as executor:
+            futures = [executor.submit(run_trial, trial_id, params, epochs, seed, output_dir, stopping=stopping) for trial_id, params in enumerate(trials)]
+            for future in as_completed(futures):
+                row = future.result()
+                rows.append(row)
+                if verbose:
+                    print(f"Trial {row['trial']:3d} {row['status']:>9} | best test loss {row['best_test_loss']:.4f} "
+                          f"(epoch {row['best_epoch']}) | {row['seconds']:.1f}s | {len(rows)}/{len(trials)}")
+    finally:
+        manager.shutdown()
+        shm.close()
+        shm.unlink()
+
+    results = pd.DataFrame(rows).sort_values('best_test_loss').reset_index(drop=True)
+    results.to_csv(os.path.join(output_dir, RESULTS_FILE), index=False)
+    return results
@@ -0,0 +1,249 @@
+#------------------------------------------------------------------------------------------------------------------
+# Libraries
+
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import torch
+
+#------------------------------------------------------------------------------------------------------------------
+# Phase timers
+
+class NullTimer:
+    '''
+    Default timer of the training engines: every phase is a no-op.
+    '''
+    def __call__(self, phase):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iterate(self, phase, iterable):
+        return iterable
+
+NULL_TIMER = NullTimer()
+
+class PhaseTimer:
+    '''
+    Accumulates wall-clock seconds per phase:
+
+        with timer('forward'):
+            reconstructed, mu, logvar = vae(batch)
+
+    On CUDA / MPS the device is synchronized around every phase (otherwise kernels launched in one phase
+    would be paid for in the next one), which slows the resident engine down: the timings are meant
+    to show how an epoch splits, the samples/sec of an instrumented run are a lower bound.
+    While a profiler window is open every phase is also recorded as a torch.profiler range.
+    '''
+    def __init__(self, device='cpu'):
+        device_type    = torch.device(device).type
+        self.sync      = torch.cuda.synchronize if device_type == 'cuda' else torch.mps.synchronize if device_type == 'mps' else None
+        self.seconds   = {}
+        self.counts    = {}
+        self.profiling = False
+        self._phase    = None
+        self._start    = None
+        self._range    = None
+
+    def __call__(self, phase):
+        self._phase = phase
+        return self
+
+    def __enter__(self):
+        if self.profiling:
+            self._range = torch.profiler.record_function(self._phase)
+            self._range.__enter__()
+        if self.sync is not None:
+            self.sync()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.sync is not None:
+            self.sync()
+        elapsed = time.perf_counter() - self._start
+        self.seconds[self._phase] = self.seconds.get(self._phase, 0.0) + elapsed
+        self.counts[self._phase]  = self.counts.get(self._phase, 0) + 1
+        if self._range is not None:
+            self._range.__exit__(*exc)
+            self._range = None
+        return False
+
+    def iterate(self, phase, iterable):
+        '''
+        Yields the items of iterable, timing every next() as phase (e.g. DataLoader collation).
+        '''
+        iterator = iter(iterable)
+        while True:
+            with self(phase):
+                item = next(iterator, StopIteration)
+            if item is StopIteration:
+                return
+            yield item
+
+    def reset(self):
+        self.seconds = {}
+        self.counts  = {}
+
+#------------------------------------------------------------------------------------------------------------------
+# Memory
+
+def _current_rss_mb():
+    # /proc is only available on Linux, None elsewhere
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        return None
+
+def memory_stats(device='cpu'):
+    '''
+    Current and peak RSS of the process and, on CUDA / MPS, the device memory (MB).
+    The CUDA peak is the one since the last reset_peak_memory(device).
+    '''
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss      = _current_rss_mb()
+    peak_rss = peak_rss / 2**20 if sys.platform == 'darwin' else peak_rss / 2**10
+    stats = {
+        'rss_mb'      : rss,
+        'peak_rss_mb' : max(peak_rss, rss or 0.0),
+    }
+    device = torch.device(device)
+    if device.type == 'cuda':
+        stats['device_mb']      = torch.cuda.memory_allocated(device) / 2**20
+        stats['device_peak_mb'] = torch.cuda.max_memory_allocated(device) / 2**20
+    elif device.type == 'mps':
+        stats['device_mb']      = torch.mps.current_allocated_memory() / 2**20
+        stats['device_peak_mb'] = torch.mps.driver_allocated_memory() / 2**20
+    return stats
+
+def reset_peak_memory(device='cpu'):
+    if torch.device(device).type == 'cuda':
+        torch.cuda.reset_peak_memory_stats(device)
+
+#------------------------------------------------------------------------------------------------------------------
+# Metrics stream
+
+class Telemetry:
+    '''
+    Per-epoch metrics of a training run written as JSON lines to path:
+    - a 'run' record with the settings, device and library versions
+    - an 'epoch' record per epoch with losses, lr, beta, seconds, samples/sec, seconds per phase,
+      checkpoint writing time and memory
+    - a 'summary' record with the totals per phase when the run ends
+    The epochs listed in profile_epochs (1-based, as in the progress bar) are run under torch.profiler,
+    the chrome trace and the table of the top operators are saved in profile_dir.
+    With path=None the timers are no-ops and nothing is written.
+    '''
+    def __init__(self, path=None, device='cpu', profile_epochs=(), profile_dir=None):
+        self.path           = path
+        self.device         = device
+        self.enabled        = path is not None
+        self.timer          = PhaseTimer(device) if self.enabled else NULL_TIMER
+        self.profile_epochs = set(profile_epochs or ())
+        self.profile_dir    = profile_dir or os.path.join(os.path.dirname(path or '') or '.', 'profile')
+        self.totals         = {}
+        self._file          = None
+        self._profiler      = None
+        self._profile_path  = None
+        if self.enabled:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(path, 'a')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def attach(self, trainer):
+        trainer.timer = self.timer
+        return trainer
+
+    def _write(self, record):
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+
+    def start(self, settings):
+        if not self.enabled:
+            return
+        self._write({
+            'event'    : 'run',
+            'time'     : time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'device'   : str(self.device),
+            'python'   : platform.python_version(),
+            'torch'    : torch.__version__,
+            'threads'  : torch.get_num_threads(),
+            'settings' : settings,
+        })
+
+    def begin_epoch(self, epoch):
+        '''
+        To be called before the training epoch (0-based): resets the timers and opens the profiler window.
+        '''
+        if not self.enabled:
+            return
+        self.timer.reset()
+        reset_peak_memory(self.device)
+        if epoch + 1 in self.profile_epochs:
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if torch.device(self.device).type == 'cuda':
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            self._profiler = torch.profiler.profile(activities=activities, profile_memory=True)
+            self._profiler.__enter__()
+            self.timer.profiling = True
+
+    def end_epoch(self, epoch):
+        '''
+        To be called right after the training epoch: closes the profiler window and saves its outputs.
+        '''
+        self._profile_path = None
+        if self._profiler is None:
+            return
+        self._profiler.__exit__(None, None, None)
+        self.timer.profiling = False
+        os.makedirs(self.profile_dir, exist_ok=True)
+        root = os.path.join(self.profile_dir, f"epoch{epoch + 1}")
+        self._profiler.export_chrome_trace(root + '.json')
+        with open(root + '.txt', 'w') as f:
+            f.write(self._profiler.key_averages().table(sort_by='self_cpu_time_total', row_limit=30))
+        self._profiler = None
+        self._profile_path = root + '.json'
+
+    def log(self, epoch, **values):
+        '''
+        Writes the record of an epoch (0-based): values (losses, lr, beta, seconds, ...) plus phases and memory.
+        '''
+        if not self.enabled:
+            return
+        for phase, seconds in self.timer.seconds.items():
+            self.totals[phase] = self.totals.get(phase, 0.0) + seconds
+        record = {'event' : 'epoch', 'epoch' : epoch + 1, **values}
+        record['phases'] = dict(self.timer.seconds)
+        if 'seconds' in values:
+            record['phases']['other'] = max(values['seconds'] - sum(seconds for phase, seconds in self.timer.seconds.items() if phase != 'checkpoint'), 0.0)
+        record.update(memory_stats(self.device))
+        if self._profile_path is not None:
+            record['profile'] = self._profile_path
+        self._write(record)
+
+    def close(self, **values):
+        if self._profiler is not None:
+            self._profiler.__exit__(None, None, None)
+            self._profiler = None
+        if self._file is None:
+            return
+        self._write({'event' : 'summary', **values, 'phases' : self.totals, **memory_stats(self.device)})
+        self._file.close()
+        self._file = None
@@ -0,0 +1,406 @@
+#------------------------------------------------------------------------------------------------------------------
+# Libraries
+
+import math
+import time
+import torch
+from models import vae_loss,ensemble_vae_loss
+from .telemetry import NULL_TIMER
+from .distributed import all_reduce_gradients,broadcast_parameters
+
+#------------------------------------------------------------------------------------------------------------------
+# Optimization settings (same for training.py and the sweeps)
+
+def build_optimizer(vae, lr):
+    return torch.optim.AdamW(vae.parameters(), lr=lr,weight_decay=0.001,betas=(0.9, 0.99))
+
+def build_scheduler(optimizer, eval_every=1):
+    # The scheduler is stepped once per evaluation: its patience is scaled to still span ~50 epochs
+    return torch.optim.lr_scheduler.ReduceLROnPlateau(optimizer, 'min', factor=0.75, patience=max(1, round(50 / eval_every)),min_lr = 1e-6)
+
+def beta_schedule(epochs, warmup=False, device='cpu'):
+    '''
+    Beta of the KL term for every epoch: linear warmup from 0 to 1 over the first 10% of the epochs, or constant 1.
+    '''
+    if warmup:
+        warmup_epochs =  epochs // 10
+        betas = torch.linspace(0, 1, warmup_epochs)
+        betas = torch.cat((betas,torch.ones(epochs - warmup_epochs))).to(device)
+    else:
+        betas = torch.full((epochs,),1.0).to(device)
+    return betas
+
+def full_beta_epoch(epochs, warmup=False):
+    '''
+    First epoch (0-based) trained with beta = 1. Test losses of the warmup epochs are computed with beta < 1,
+    on a smaller scale than the later ones: best models and convergence are only tracked from this epoch on.
+    '''
+    return max(epochs // 10 - 1, 0) if warmup else 0
+
+#------------------------------------------------------------------------------------------------------------------
+# Training engines
+#
+# All the engines expose the same interface:
+# - train_epoch(beta) --> (train loss, reconstruction loss, kl loss) averaged over the mini-batches
+# - evaluate(beta)    --> test loss averaged over the mini-batches
+# - epoch(beta)       --> [train loss, reconstruction loss, kl loss, test loss] as python floats
+#                         (with evaluate=False the test set is skipped and the test loss is NaN)
+# so that training.py can switch between them with the --Engine flag (or --NumModels / --Streaming).
+# Every engine has a `timer` (a no-op by default, see engine/telemetry.py) splitting an epoch into
+# data, forward, loss, backward, (allreduce,) optimizer, accumulate and evaluate phases.
+
+class DataLoaderTrainer:
+    '''
+    Original training loop: mini-batches from torch DataLoader, losses synced with .item() on every batch.
+    '''
+    def __init__(self, vae, optimizer, X_train, X_test, batch_size, device):
+        self.vae          = vae
+        self.optimizer    = optimizer
+        self.device       = device
+        self.train_loader = torch.utils.data.DataLoader(X_train, batch_size = batch_size, shuffle = True)
+        self.test_loader  = torch.utils.data.DataLoader(X_test , batch_size = batch_size, shuffle = False)
+        self.n_train      = len(X_train)
+        self.timer        = NULL_TIMER
+
+    def train_epoch(self, beta):
+        self.vae.train()
+        total_loss = 0
+        total_kl_loss = 0
+        total_r_loss = 0
+        for batch in self.timer.iterate('data', self.train_loader):
+            with self.timer('data'):
+                batch = batch.to(self.device)
+            with self.timer('optimizer'):
+                self.optimizer.zero_grad()
+
+            with self.timer('forward'):
+                reconstructed, mu, logvar = self.vae(batch)
+            with self.timer('loss'):
+                loss,r_loss,kl_loss = vae_loss(reconstructed, batch, mu, logvar, beta)
+            with self.timer('backward'):
+                loss.backward()
+            with self.timer('optimizer'):
+                self.optimizer.step()
+
+            with self.timer('accumulate'):
+                total_loss += loss.item()
+                total_kl_loss += kl_loss.item()
+                total_r_loss += r_loss.item()
+        n_batches = len(self.train_loader)
+        return total_loss / n_batches, total_r_loss / n_batches, total_kl_loss / n_batches
+
+    def evaluate(self, beta):
+        self.vae.eval()
+        total_test_loss = 0
+        for test_batch in self.test_loader:
+            test_batch = test_batch.to(self.device)
+
+            test_reconstructed, test_mu, test_logvar = self.vae(test_batch)
+            test_loss,_,_ = vae_loss(test_reconstructed, test_batch, test_mu, test_logvar, beta)
+
+            total_test_loss += test_loss.item()
+        return total_test_loss / len(self.test_loader)
+
+    def epoch(self, beta, evaluate=True):
+        train_losses = self.train_epoch(beta)
+        test_loss = float('nan')
+        if evaluate:
+            with self.timer('evaluate'):
+                test_loss = self.evaluate(beta)
+        return [*train_losses, test_loss]
+
+
+class ResidentTrainer:
+    '''
+    Training loop keeping X_train / X_test on the device:
+    - mini-batches are gathered with a random index permutation (no per-sample collation)
+    - losses are accumulated in a device tensor and synced once per epoch
+    - the test set is evaluated in a single batched forward under torch.no_grad()
+    Losses are averaged over the same number of mini-batches as DataLoaderTrainer, so the two are comparable.
+    '''
+    def __init__(self, vae, optimizer, X_train, X_test, batch_size, device):
+        self.vae            = vae
+        self.optimizer      = optimizer
+        self.device         = device
+        self.batch_size     = batch_size
+        self.X_train        = X_train.to(device)
+        self.X_test         = X_test.to(device)
+        self.n_train        = len(X_train)
+        self.n_batches      = math.ceil(len(X_train) / batch_size)
+        self.n_test_batches = math.ceil(len(X_test) / batch_size)
+        self.timer          = NULL_TIMER
+
+    def train_epoch(self, beta):
+        self.vae.train()
+        totals = torch.zeros(3, device=self.device)
+        with self.timer('data'):
+            permutation = torch.randperm(self.n_train, device=self.device)
+        for start in range(0, self.n_train, self.batch_size):
+            with self.timer('data'):
+                batch = self.X_train[permutation[start:start + self.batch_size]]
+            with self.timer('optimizer'):
+                self.optimizer.zero_grad(set_to_none=True)
+
+            with self.timer('forward'):
+                reconstructed, mu, logvar = self.vae(batch)
+            with self.timer('loss'):
+                loss,r_loss,kl_loss = vae_loss(reconstructed, batch, mu, logvar, beta)
+            with self.timer('backward'):
+                loss.backward()
+            with self.timer('optimizer'):
+                self.optimizer.step()
+
+            with self.timer('accumulate'):
+                totals += torch.stack((loss, r_loss, kl_loss)).detach()
+        return totals / self.n_batches
+
+    @torch.no_grad()
+    def evaluate(self, beta):
+        self.vae.eval()
+        test_reconstructed, test_mu, test_logvar = self.vae(self.X_test)
+        test_loss,_,_ = vae_loss(test_reconstructed, self.X_test, test_mu, test_logvar, beta)
+        return test_loss / self.n_test_batches
+
+    def epoch(self, beta, evaluate=True):
+        # Single device sync per epoch
+        train_losses = self.train_epoch(beta)
+        test_loss = torch.full((), float('nan'), device=self.device)
+        if evaluate:
+            with self.timer('evaluate'):
+                test_loss = self.evaluate(beta)
+        return torch.cat((train_losses, test_loss.view(1))).tolist()
+
+class EnsembleTrainer:
+    '''
+    Resident training of a VAEEnsemble: every member gets its own shuffling of X_train, the N members
+    are served by one batched matmul per layer and the loss is computed per member (the sum is
+    backpropagated, members don't share parameters so their gradients are independent).
+    epoch() returns the losses averaged over the members, the per-member losses are kept in member_losses.
+    '''
+    def __init__(self, ensemble, optimizer, X_train, X_test, batch_size, device):
+        self.vae            = ensemble
+        self.optimizer      = optimizer
+        self.device         = device
+        self.batch_size     = batch_size
+        self.n_models       = ensemble.n_models
+        self.X_train        = X_train.to(device)
+        self.X_test         = X_test.to(device)
+        self.n_train        = len(X_train)
+        self.n_batches      = math.ceil(len(X_train) / batch_size)
+        self.n_test_batches = math.ceil(len(X_test) / batch_size)
+        self.member_losses  = None
+        self.timer          = NULL_TIMER
+
+    def train_epoch(self, beta):
+        self.vae.train()
+        totals = torch.zeros(3, self.n_models, device=self.device)
+        with self.timer('data'):
+            permutations = torch.rand(self.n_models, self.n_train, device=self.device).argsort(dim=1)
+        for start in range(0, self.n_train, self.batch_size):
+            with self.timer('data'):
+                batch = self.X_train[permutations[:, start:start + self.batch_size]]
+            with self.timer('optimizer'):
+                self.optimizer.zero_grad(set_to_none=True)
+
+            with self.timer('forward'):
+                reconstructed, mu, logvar = self.vae(batch)
+            with self.timer('loss'):
+                loss,r_loss,kl_loss = ensemble_vae_loss(reconstructed, batch, mu, logvar, beta)
+            with self.timer('backward'):
+                loss.sum().backward()
+            with self.timer('optimizer'):
+                self.optimizer.step()
+
+            with self.timer('accumulate'):
+                totals += torch.stack((loss, r_loss, kl_loss)).detach()
+        return totals / self.n_batches
+
+    @torch.no_grad()
+    def evaluate(self, beta):
+        self.vae.eval()
+        test_reconstructed, test_mu, test_logvar = self.vae(self.X_test)
+        test_loss,_,_ = ensemble_vae_loss(test_reconstructed, self.X_test, test_mu, test_logvar, beta)
+        return test_loss / self.n_test_batches
+
+    def epoch(self, beta, evaluate=True):
+        # Single device sync per epoch: rows are train, reconstruction, kl and test losses of every member
+        train_losses = self.train_epoch(beta)
+        test_losses = torch.full((self.n_models,), float('nan'), device=self.device)
+        if evaluate:
+            with self.timer('evaluate'):
+                test_losses = self.evaluate(beta)
+        losses = torch.cat((train_losses, test_losses.view(1, -1)))
+        self.member_losses = losses.T.tolist()
+        return losses.mean(dim=1).tolist()
+
+class StreamingTrainer:
+    '''
+    Training loop over the DataLoaders of engine/streaming.py, for datasets which don't fit in memory:
+    batches are read from the shards and moved to the device one at a time, losses are accumulated
+    in a device tensor and synced once per epoch. The shuffling of every epoch is seeded from the
+    global torch RNG, so a resumed run reproduces the uninterrupted one.
+    '''
+    def __init__(self, vae, optimizer, train_loader, test_loader, device):
+        self.vae          = vae
+        self.optimizer    = optimizer
+        self.device       = device
+        self.train_loader = train_loader
+        self.test_loader  = test_loader
+        self.timer        = NULL_TIMER
+
+    def train_epoch(self, beta):
+        self.vae.train()
+        self.train_loader.dataset.set_seed(int(torch.randint(2**31, (1,))))
+        totals = torch.zeros(3, device=self.device)
+        n_batches = 0
+        for batch in self.timer.iterate('data', self.train_loader):
+            with self.timer('data'):
+                batch = batch.to(self.device, non_blocking=True)
+            with self.timer('optimizer'):
+                self.optimizer.zero_grad(set_to_none=True)
+
+            with self.timer('forward'):
+                reconstructed, mu, logvar = self.vae(batch)
+            with self.timer('loss'):
+                loss,r_loss,kl_loss = vae_loss(reconstructed, batch, mu, logvar, beta)
+            with self.timer('backward'):
+                loss.backward()
+            with self.timer('optimizer'):
+                self.optimizer.step()
+
+            with self.timer('accumulate'):
+                totals += torch.stack((loss, r_loss, kl_loss)).detach()
+            n_batches += 1
+        return totals / max(n_batches, 1)
+
+    @torch.no_grad()
+    def evaluate(self, beta):
+        self.vae.eval()
+        total_test_loss = torch.zeros((), device=self.device)
+        n_batches = 0
+        for test_batch in self.test_loader:
+            test_batch = test_batch.to(self.device, non_blocking=True)
+            test_reconstructed, test_mu, test_logvar = self.vae(test_batch)
+            test_loss,_,_ = vae_loss(test_reconstructed, test_batch, test_mu, test_logvar, beta)
+            total_test_loss += test_loss
+            n_batches += 1
+        return total_test_loss / max(n_batches, 1)
+
+    def epoch(self, beta, evaluate=True):
+        # Single device sync per epoch
+        train_losses = self.train_epoch(beta)
+        test_loss = torch.full((), float('nan'), device=self.device)
+        if evaluate:
+            with self.timer('evaluate'):
+                test_loss = self.evaluate(beta)
+        return torch.cat((train_losses, test_loss.view(1))).tolist()
+
+class DistributedTrainer:
+    '''
+    Data-parallel version of ResidentTrainer for CPU nodes (one process per core, gloo backend, see engine/distributed.py):
+    - every rank draws the same permutation of X_train and takes its slice of every mini-batch,
+      gradients are summed with one all-reduce per step, so each step is the one of a single process
+      on the whole mini-batch (same number of steps per epoch and same schedule as the other engines)
+    - the reparameterization noise is drawn from a per-rank seed, while the global RNG (saved in the
+      checkpoints by rank 0) advances identically on all the ranks
+    - losses are summed over the ranks once per epoch, so every rank steps ReduceLROnPlateau with the same test loss
+    '''
+    def __init__(self, vae, optimizer, X_train, X_test, batch_size, device):
+        self.vae            = vae
+        self.optimizer      = optimizer
+        self.device         = device
+        self.batch_size     = batch_size
+        self.rank           = torch.distributed.get_rank()
+        self.world_size     = torch.distributed.get_world_size()
+        self.parameters     = [parameter for parameter in vae.parameters() if parameter.requires_grad]
+        self.X_train        = X_train.to(device)
+        self.X_test         = X_test.to(device).tensor_split(self.world_size)[self.rank]
+        self.n_train        = len(X_train)
+        self.n_batches      = math.ceil(len(X_train) / batch_size)
+        self.n_test_batches = math.ceil(len(X_test) / batch_size)
+        self.timer          = NULL_TIMER
+        broadcast_parameters(vae)
+
+    def train_epoch(self, beta, generator):
+        self.vae.train()
+        totals = torch.zeros(3, device=self.device)
+        with self.timer('data'):
+            permutation = torch.randperm(self.n_train, generator=generator).to(self.device)
+        for start in range(0, self.n_train, self.batch_size):
+            with self.timer('data'):
+                batch = self.X_train[permutation[start:start + self.batch_size].tensor_split(self.world_size)[self.rank]]
+            with self.timer('optimizer'):
+                self.optimizer.zero_grad(set_to_none=True)
+
+            with self.timer('forward'):
+                reconstructed, mu, logvar = self.vae(batch)
+            with self.timer('loss'):
+                loss,r_loss,kl_loss = vae_loss(reconstructed, batch, mu, logvar, beta)
+            with self.timer('backward'):
+                loss.backward()
+            with self.timer('allreduce'):
+                all_reduce_gradients(self.parameters)
+            with self.timer('optimizer'):
+                self.optimizer.step()
+
+            with self.timer('accumulate'):
+                totals += torch.stack((loss, r_loss, kl_loss)).detach()
+        return totals / self.n_batches
+
+    @torch.no_grad()
+    def evaluate(self, beta):
+        self.vae.eval()
+        test_reconstructed, test_mu, test_logvar = self.vae(self.X_test)
+        test_loss,_,_ = vae_loss(test_reconstructed, self.X_test, test_mu, test_logvar, beta)
+        return test_loss / self.n_test_batches
+
+    def epoch(self, beta, evaluate=True):
+        seed = int(torch.randint(2**31, (1,)))
+        with torch.random.fork_rng(devices=[]):
+            torch.manual_seed(seed + 1 + self.rank)
+            train_losses = self.train_epoch(beta, torch.Generator().manual_seed(seed))
+            test_loss = torch.full((), float('nan'))
+            if evaluate:
+                with self.timer('evaluate'):
+                    test_loss = self.evaluate(beta)
+        # Single all-reduce of the losses per epoch
+        losses = torch.cat((train_losses, test_loss.view(1)))
+        with self.timer('allreduce'):
+            torch.distributed.all_reduce(losses)
+        return losses.tolist()
+
+ENGINES = {
+    'dataloader'  : DataLoaderTrainer,
+    'resident'    : ResidentTrainer,
+    'distributed' : DistributedTrainer,
+}
+
+#------------------------------------------------------------------------------------------------------------------
+# Throughput
+
+class Throughput:
+    '''
+    Tracks training samples per second (per epoch and overall).
+    '''
+    def __init__(self, n_samples):
+        self.n_samples = n_samples
+        self.seconds   = 0.0
+        self.epochs    = 0
+        self.last      = 0.0
+        self.elapsed   = 0.0
+        self._start    = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed  = time.perf_counter() - self._start
+        self.seconds += self.elapsed
+        self.epochs  += 1
+        self.last     = self.n_samples / self.elapsed if self.elapsed > 0 else float('inf')
+        return False
+
+    @property
+    def samples_per_sec(self):
+        return self.n_samples * self.epochs / self.seconds if self.seconds > 0 else 0.0
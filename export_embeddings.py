@@ -0,0 +1,129 @@
+#----------------------------------------------------------------------------------------------------------------------------------------
+# LIBRARIES
+import argparse
+import time
+import torch
+from models import VAE,ModelBundle
+from engine.data import load_features,read_training_data,standardize
+from scouting import EmbeddingStore
+from scouting.export import export_embeddings
+from scouting.refresh import refresh_embeddings
+#----------------------------------------------------------------------------------------------------------------------------------------
+# GLOBAL (DEFAULT) PARAMETERS AND SETTINGS
+
+DATA_PATH        = 'data/training_dataset.csv'
+CHECKPOINTS_PATH = 'checkpoints/vae.pth'
+OUTPUT_DIR       = 'checkpoints/embeddings/'
+HIDDEN_DIM1      = 64
+HIDDEN_DIM2      = 32
+LATENT_DIM       = 16
+BATCH_SIZE       = 4096
+DEVICE           = 'cuda' if torch.cuda.is_available() else 'mps' if torch.backends.mps.is_available() else 'cpu'
+
+
+
+if __name__ == "__main__":
+
+    #----------------------------------------------------------------------------------------------------------------------------------------
+    # PARSE ARGUMENTS
+    parser = argparse.ArgumentParser(
+        description = "Python script to export the player embeddings (mu, logvar) as a memory-mapped store"
+        )
+
+    # Paths
+    parser.add_argument("-DP","--DataPath",
+                        type    = str,
+                        default = DATA_PATH,
+                        help    = "Path to the training dataset"
+                       )
+    parser.add_argument("-CP","--CheckpointsPath",
+                        type    = str,
+                        default = CHECKPOINTS_PATH,
+                        help    = "Path to the model weights"
+                       )
+    parser.add_argument("-BP","--BundlePath",
+                        type    = str,
+                        default = None,
+                        help    = "Path to a model bundle written by training.py (architecture and normalization are read from it, the model options are ignored)"
+                       )
+    parser.add_argument("-OD","--OutputDir",
+                        type    = str,
+                        default = OUTPUT_DIR,
+                        help    = "Directory of the embedding store"
+                       )
+
+    # Model
+    parser.add_argument("-H1","--HiddenDim1",
+                        type    = int,
+                        default = HIDDEN_DIM1,
+                        help    = "Hidden dimension 1"
+                       )
+    parser.add_argument("-H2","--HiddenDim2",
+                        type    = int,
+                        default = HIDDEN_DIM2,
+                        help    = "Hidden dimension 2"
+                       )
+    parser.add_argument("-LD","--LatentDim",
+                        type    = int,
+                        default = LATENT_DIM,
+                        help    = "Latent dimension"
+                       )
+
+    # Other settings
+    parser.add_argument("-BS","--BatchSize",
+                        type    = int,
+                        default = BATCH_SIZE,
+                        help    = "Batch size of the encoder"
+                       )
+    parser.add_argument("-RF","--Refresh",
+                        action  = "store_true",
+                        help    = "Add this flag to refresh an existing store in place (only new or changed rows are encoded, requires --BundlePath)"
+                       )
+    parser.add_argument("-F16","--Float16",
+                        action  = "store_true",
+                        help    = "Add this flag to store the embeddings as float16"
+                       )
+
+    args = parser.parse_args()
+
+    #----------------------------------------------------------------------------------------------------------------------------------------
+    # INCREMENTAL REFRESH
+
+    if args.Refresh:
+        if args.BundlePath is None:
+            parser.error("--Refresh requires --BundlePath")
+        bundle = ModelBundle.load(args.BundlePath, device=DEVICE)
+        data   = read_training_data(args.DataPath)
+        store  = EmbeddingStore(args.OutputDir, mode='r+')
+        refresh_embeddings(store, data, bundle, batch_size=args.BatchSize)
+        print(f"{store.n_active} embeddings --> {args.OutputDir}")
+        raise SystemExit
+
+    #----------------------------------------------------------------------------------------------------------------------------------------
+    # EXPORT
+
+    if args.BundlePath is not None:
+        bundle = ModelBundle.load(args.BundlePath, device=DEVICE)
+        data, _ = load_features(args.DataPath)
+        X   = bundle.normalize(bundle.features(data)).cpu()
+        vae = bundle.vae
+    else:
+        data, X = load_features(args.DataPath)
+        X,_,_ = standardize(X)
+
+        vae = VAE(
+            input_dim   = X.shape[1],
+            latent_dim  = args.LatentDim,
+            hidden_dim1 = args.HiddenDim1,
+            hidden_dim2 = args.HiddenDim2).to(DEVICE)
+        vae.load_state_dict(torch.load(args.CheckpointsPath, map_location=DEVICE))
+
+    start = time.perf_counter()
+    store = export_embeddings(vae, X, data, args.OutputDir,
+                              dtype      = 'float16' if args.Float16 else 'float32',
+                              batch_size = args.BatchSize,
+                              device     = DEVICE,
+                              info       = {'data_path' : args.DataPath, 'checkpoints_path' : args.BundlePath or args.CheckpointsPath})
+    print(f"{len(store)} embeddings ({store.latent_dim} dims, {store.info['dtype']}) --> {args.OutputDir} in {time.perf_counter() - start:.2f}s")
+
+    #----------------------------------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,75 @@
+#----------------------------------------------------------------------------------------------------------------------------------------
+# LIBRARIES
+import argparse
+import os
+from models import ModelBundle,InferenceEncoder,export_encoder,measure_latency
+from engine.data import read_training_data
+#----------------------------------------------------------------------------------------------------------------------------------------
+# GLOBAL (DEFAULT) PARAMETERS AND SETTINGS
+
+BUNDLE_PATH      = 'checkpoints/vae_bundle.pth'
+DATA_PATH        = 'data/training_dataset.csv'
+N_THREADS        = 1
+
+
+
+if __name__ == "__main__":
+
+    #----------------------------------------------------------------------------------------------------------------------------------------
+    # PARSE ARGUMENTS
+    parser = argparse.ArgumentParser(
+        description = "Python script to export an inference-only encoder (TorchScript, CPU) from a model bundle and measure its latency"
+        )
+
+    # Paths
+    parser.add_argument("-BP","--BundlePath",
+                        type    = str,
+                        default = BUNDLE_PATH,
+                        help    = "Path to the model bundle written by training.py"
+                       )
+    parser.add_argument("-OP","--OutputPath",
+                        type    = str,
+                        default = None,
+                        help    = "Path to the exported encoder (default: <bundle>_encoder.pt)"
+                       )
+    parser.add_argument("-DP","--DataPath",
+                        type    = str,
+                        default = DATA_PATH,
+                        help    = "Dataset used to measure the latency and the error of the exported encoder"
+                       )
+
+    # Settings
+    parser.add_argument("-Q","--Quantize",
+                        action  = "store_true",
+                        help    = "Add this flag to quantize the Linear layers to int8 (dynamic quantization)"
+                       )
+    parser.add_argument("-NT","--NumThreads",
+                        type    = int,
+                        default = N_THREADS,
+                        help    = "Number of torch threads used for inference"
+                       )
+
+    args = parser.parse_args()
+
+    #----------------------------------------------------------------------------------------------------------------------------------------
+    # EXPORT
+
+    output_path = args.OutputPath or os.path.splitext(args.BundlePath)[0] + ('_encoder_int8.pt' if args.Quantize else '_encoder.pt')
+    bundle = ModelBundle.load(args.BundlePath)
+    export_encoder(bundle, output_path, quantize=args.Quantize)
+    print(f"Encoder{' (int8)' if args.Quantize else ''} --> {output_path}")
+
+    #----------------------------------------------------------------------------------------------------------------------------------------
+    # LATENCY
+
+    encoder = InferenceEncoder(output_path, num_threads=args.NumThreads)
+    data    = read_training_data(args.DataPath)
+    X       = data[encoder.feature_columns].to_numpy(dtype='float32')
+
+    reference = bundle.encode(data)[0].numpy()
+    error = abs(encoder.encode_batch(X) - reference)
+    print(f"Abs error vs the eager model: mean {error.mean():.2e}, max {error.max():.2e}")
+    for batch_size, latency in measure_latency(encoder, X).items():
+        print(f"Batch of {batch_size:5d} rows | p50 {latency['p50_ms']:.3f} ms | p99 {latency['p99_ms']:.3f} ms")
+
+    #----------------------------------------------------------------------------------------------------------------------------------------
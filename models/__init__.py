@@ -1 +1,4 @@
-from .variational_autoencoder import VAE,vae_loss,kaiming_weights_init
\ No newline at end of file
+from .variational_autoencoder import VAE,vae_loss,kaiming_weights_init
+from .ensemble import VAEEnsemble,ensemble_vae_loss
+from .bundle import ModelBundle
+from .inference import MuEncoder,InferenceEncoder,export_encoder,measure_latency
\ No newline at end of file
@@ -0,0 +1,89 @@
+import os
+import torch
+from .variational_autoencoder import VAE
+
+BUNDLE_VERSION = 1
+
+# Self-describing model bundle: everything needed to embed new players without the training dataset
+# - config          : VAE architecture (input_dim, hidden_dim1, hidden_dim2, latent_dim)
+# - state_dict      : weights
+# - feature_columns : input features, in the order the model expects them
+# - dropped_columns : training dataset columns which are not features
+# - mean, std       : per-feature normalization statistics of the training dataset
+# - training        : training hyperparameters (informative only)
+# It only holds tensors, lists and numbers, so it can be read with torch.load(weights_only=True).
+class ModelBundle:
+    def __init__(self, vae, feature_columns, mean, std, dropped_columns=None, training=None):
+        self.vae             = vae
+        self.feature_columns = list(feature_columns)
+        self.mean            = mean
+        self.std             = std
+        self.dropped_columns = list(dropped_columns or [])
+        self.training        = dict(training or {})
+
+    @property
+    def config(self):
+        return {
+            'input_dim'   : self.vae.encoder[0].in_features,
+            'hidden_dim1' : self.vae.encoder[0].out_features,
+            'hidden_dim2' : self.vae.encoder[2].out_features,
+            'latent_dim'  : self.vae.mu_layer.out_features,
+        }
+
+    @property
+    def device(self):
+        return self.vae.mu_layer.weight.device
+
+    def save(self, path):
+        """Saves the bundle as a single file."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        torch.save({
+            'version'         : BUNDLE_VERSION,
+            'config'          : self.config,
+            'state_dict'      : {key : value.detach().cpu() for key,value in self.vae.state_dict().items()},
+            'feature_columns' : self.feature_columns,
+            'dropped_columns' : self.dropped_columns,
+            'mean'            : self.mean.detach().cpu(),
+            'std'             : self.std.detach().cpu(),
+            'training'        : self.training,
+        }, path)
+
+    @classmethod
+    def load(cls, path, device='cpu'):
+        """Rebuilds a ready-to-run model (in eval mode) from the bundle alone."""
+        bundle = torch.load(path, map_location='cpu', weights_only=True)
+        if bundle['version'] > BUNDLE_VERSION:
+            raise ValueError(f"Unsupported bundle version {bundle['version']} (latest supported: {BUNDLE_VERSION})")
+        vae = VAE(**bundle['config'])
+        vae.load_state_dict(bundle['state_dict'])
+        vae.to(device).eval()
+        return cls(vae, bundle['feature_columns'], bundle['mean'].to(device), bundle['std'].to(device),
+                   dropped_columns=bundle['dropped_columns'], training=bundle['training'])
+
+    def features(self, players):
+        """Feature matrix (float32 tensor) of a DataFrame, a dict (one player) or an array already in feature order."""
+        if isinstance(players, dict):
+            values = [[players[column] for column in self.feature_columns]]
+        elif hasattr(players, 'columns'):
+            missing = [column for column in self.feature_columns if column not in players.columns]
+            if missing:
+                raise KeyError(f"Missing feature columns: {missing}")
+            values = players[self.feature_columns].to_numpy(dtype='float32')
+        else:
+            values = players
+        X = torch.as_tensor(values, dtype=torch.float32, device=self.device)
+        X = X.view(1, -1) if X.dim() == 1 else X
+        if X.shape[1] != len(self.feature_columns):
+            raise ValueError(f"Expected {len(self.feature_columns)} features, got {X.shape[1]}")
+        return X
+
+    def normalize(self, X):
+        """Applies the training normalization."""
+        return (X - self.mean) / self.std
+
+    @torch.no_grad()
+    def encode(self, players):
+        """Latent mean and log-variance of new players (raw, non normalized features)."""
+        return self.vae.encode(self.normalize(self.features(players)))
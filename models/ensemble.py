@@ -0,0 +1,107 @@
+import torch
+from .variational_autoencoder import VAE
+
+# Ensemble of N VAEs with the same shape, trained at once:
+# the weights of every layer are stacked along a leading "member" dimension, so each layer
+# of all the N members is a single batched matmul (torch.baddbmm) on inputs of shape (N, batch, features).
+class VAEEnsemble(torch.nn.Module):
+    def __init__(self, n_models, input_dim, hidden_dim1, hidden_dim2, latent_dim, leaky_relu_alpha=None):
+        super(VAEEnsemble, self).__init__()
+        self.n_models = n_models
+        self.config   = dict(input_dim=input_dim, hidden_dim1=hidden_dim1, hidden_dim2=hidden_dim2,
+                             latent_dim=latent_dim, leaky_relu_alpha=leaky_relu_alpha)
+        self.activation = torch.nn.ReLU() if leaky_relu_alpha is None else torch.nn.LeakyReLU(leaky_relu_alpha)
+
+        # Same layers as VAE (names follow its state dict)
+        self.layers = {
+            'encoder.0'    : (input_dim, hidden_dim1),
+            'encoder.2'    : (hidden_dim1, hidden_dim2),
+            'mu_layer'     : (hidden_dim2, latent_dim),
+            'logvar_layer' : (hidden_dim2, latent_dim),
+            'decoder.0'    : (latent_dim, hidden_dim2),
+            'decoder.2'    : (hidden_dim2, hidden_dim1),
+            'decoder.4'    : (hidden_dim1, input_dim),
+        }
+        self.weights = torch.nn.ParameterDict()
+        self.biases  = torch.nn.ParameterDict()
+        for name, (in_features, out_features) in self.layers.items():
+            key = name.replace('.', '_')
+            self.weights[key] = torch.nn.Parameter(torch.empty(n_models, out_features, in_features))
+            self.biases[key]  = torch.nn.Parameter(torch.zeros(n_models, out_features))
+
+    @classmethod
+    def from_models(cls, models):
+        """Stacks the weights of N VAE instances (e.g. initialized with different seeds)."""
+        first = models[0]
+        ensemble = cls(
+            n_models         = len(models),
+            input_dim        = first.encoder[0].in_features,
+            hidden_dim1      = first.encoder[0].out_features,
+            hidden_dim2      = first.encoder[2].out_features,
+            latent_dim       = first.mu_layer.out_features,
+            leaky_relu_alpha = getattr(first.encoder[1], 'negative_slope', None))
+        states = [model.state_dict() for model in models]
+        with torch.no_grad():
+            for name in ensemble.layers:
+                key = name.replace('.', '_')
+                ensemble.weights[key].copy_(torch.stack([state[name + '.weight'] for state in states]))
+                ensemble.biases[key].copy_(torch.stack([state[name + '.bias'] for state in states]))
+        return ensemble
+
+    def member(self, i):
+        """Returns member i as a standalone VAE."""
+        vae = VAE(**self.config)
+        vae.load_state_dict(self.member_state_dict(i))
+        return vae.to(self.weights['encoder_0'].device)
+
+    def member_state_dict(self, i):
+        """State dict of member i, in the VAE format."""
+        state = {}
+        for name in self.layers:
+            key = name.replace('.', '_')
+            state[name + '.weight'] = self.weights[key][i].detach().clone()
+            state[name + '.bias']   = self.biases[key][i].detach().clone()
+        return state
+
+    def linear(self, name, x):
+        """Layer `name` of all the members: x (N, batch, in) --> (N, batch, out)."""
+        key = name.replace('.', '_')
+        return torch.baddbmm(self.biases[key].unsqueeze(1), x, self.weights[key].transpose(1, 2))
+
+    def encode(self, x):
+        """Encodes input into latent mean and log-variance. x is (batch, features) or (N, batch, features)."""
+        if x.dim() == 2:
+            x = x.expand(self.n_models, *x.shape)
+        h = self.activation(self.linear('encoder.0', x))
+        h = self.activation(self.linear('encoder.2', h))
+        return self.linear('mu_layer', h), self.linear('logvar_layer', h)
+
+    def reparameterize(self, mu, logvar):
+        """Reparameterization trick to sample z from the latent distribution."""
+        std = torch.exp(0.5 * logvar)
+        eps = torch.randn_like(std)
+        return mu + eps * std
+
+    def decode(self, z):
+        """Decodes latent vectors into reconstructed inputs."""
+        h = self.activation(self.linear('decoder.0', z))
+        h = self.activation(self.linear('decoder.2', h))
+        return self.linear('decoder.4', h)
+
+    def forward(self, x):
+        """Forward pass through all the members."""
+        mu, logvar = self.encode(x)
+        z = self.reparameterize(mu, logvar)
+        x_reconstructed = self.decode(z)
+        return x_reconstructed, mu, logvar
+
+
+# Per-member VAE loss: same terms as vae_loss, summed over batch and features of every member
+def ensemble_vae_loss(reconstructed, original, mu, logvar, beta=1.0):
+    """Computes the VAE loss of every member. Returns three tensors of shape (N,)."""
+    if original.dim() == 2:
+        original = original.expand_as(reconstructed)
+    reconstruction_loss = (reconstructed - original).pow(2).sum(dim=(1, 2))
+    kl_divergence = -0.5 * torch.sum(1 + logvar - mu.pow(2) - logvar.exp(), dim=(1, 2))
+    loss = reconstruction_loss + beta*kl_divergence
+    return loss, reconstruction_loss, kl_divergence
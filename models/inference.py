@@ -0,0 +1,93 @@
+import json
+import time
+import numpy as np
+import torch
+
+# Inference-only encoder: raw features --> mu (no logvar, no reparameterization, no decoder).
+# By default the normalization of the bundle is folded into the first Linear layer:
+#   W ((x - mean) / std) + b = (W / std) x + (b - W (mean / std))
+# (not with int8 quantization: dividing by small std values would blow up the weight range of the layer)
+class MuEncoder(torch.nn.Module):
+    def __init__(self, vae, mean, std, fold_normalization=True):
+        super(MuEncoder, self).__init__()
+        layers = [torch.nn.Linear(layer.in_features, layer.out_features) if isinstance(layer, torch.nn.Linear) else layer
+                  for layer in vae.encoder]
+        self.encoder  = torch.nn.Sequential(*layers)
+        self.mu_layer = torch.nn.Linear(vae.mu_layer.in_features, vae.mu_layer.out_features)
+        self.encoder.load_state_dict(vae.encoder.state_dict())
+        self.mu_layer.load_state_dict(vae.mu_layer.state_dict())
+        self.fold_normalization = fold_normalization
+        self.register_buffer('mean', mean.clone())
+        self.register_buffer('std', std.clone())
+        if fold_normalization:
+            with torch.no_grad():
+                first = self.encoder[0]
+                first.bias -= first.weight @ (mean / std)
+                first.weight /= std
+        self.eval()
+
+    def forward(self, x):
+        if not self.fold_normalization:
+            x = (x - self.mean) / self.std
+        return self.mu_layer(self.encoder(x))
+
+
+def export_encoder(bundle, path, quantize=False):
+    """Exports the mu encoder of a ModelBundle as a TorchScript file (optionally with dynamic int8 Linear layers)."""
+    model = MuEncoder(bundle.vae.cpu(), bundle.mean.cpu(), bundle.std.cpu(), fold_normalization=not quantize)
+    if quantize:
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    with torch.no_grad():
+        scripted = torch.jit.freeze(torch.jit.trace(model, torch.zeros(1, len(bundle.feature_columns))).eval())
+    metadata = {'feature_columns' : bundle.feature_columns, 'latent_dim' : bundle.config['latent_dim'], 'quantized' : quantize}
+    torch.jit.save(scripted, path, _extra_files={'metadata.json' : json.dumps(metadata)})
+    return path
+
+
+# Loaded encoder with a micro-batched API
+class InferenceEncoder:
+    def __init__(self, path, num_threads=None):
+        if num_threads is not None:
+            torch.set_num_threads(num_threads)
+        extra_files = {'metadata.json' : ''}
+        self.model = torch.jit.load(path, map_location='cpu', _extra_files=extra_files)
+        metadata = json.loads(extra_files['metadata.json'])
+        self.feature_columns = metadata['feature_columns']
+        self.latent_dim      = metadata['latent_dim']
+        self.quantized       = metadata['quantized']
+
+    def _features(self, players):
+        if hasattr(players, 'columns'):
+            players = players[self.feature_columns].to_numpy(dtype=np.float32)
+        X = torch.as_tensor(np.ascontiguousarray(players, dtype=np.float32))
+        return X.view(1, -1) if X.dim() == 1 else X
+
+    def encode_batch(self, players, batch_size=1024):
+        """mu of the players (raw features: DataFrame or array in feature order), as a float32 numpy array, in micro-batches."""
+        X  = self._features(players)
+        mu = np.empty((X.shape[0], self.latent_dim), dtype=np.float32)
+        with torch.inference_mode():
+            for start in range(0, X.shape[0], batch_size):
+                mu[start:start + batch_size] = self.model(X[start:start + batch_size]).numpy()
+        return mu
+
+    def encode(self, player):
+        """mu of a single player."""
+        return self.encode_batch(player)[0]
+
+
+def measure_latency(encoder, X, batch_sizes=(1, 1000), n_runs=200, n_warmup=20):
+    """p50/p99 latency (ms) of encode_batch for every batch size (rows are taken from X, repeated if needed)."""
+    X = np.asarray(X, dtype=np.float32)
+    results = {}
+    for batch_size in batch_sizes:
+        batch = X[np.arange(batch_size) % len(X)]
+        for _ in range(n_warmup):
+            encoder.encode_batch(batch, batch_size=batch_size)
+        timings = []
+        for _ in range(n_runs):
+            start = time.perf_counter()
+            encoder.encode_batch(batch, batch_size=batch_size)
+            timings.append((time.perf_counter() - start) * 1e3)
+        results[batch_size] = {'p50_ms' : float(np.percentile(timings, 50)), 'p99_ms' : float(np.percentile(timings, 99))}
+    return results
@@ -0,0 +1,4 @@
+from .name_matching import normalize_text,match_players,unmatched_report
+from .features import FEATURES,FEATURE_COLUMNS,filter_players,build_features
+from .clubelo import add_elo_ranks,build_alias_index,update_alias_index,save_alias_index,load_alias_index,read_elo_snapshots,missing_elo_report
+from .dataset import merge_transfermarkt,write_dataset,read_dataset
\ No newline at end of file
@@ -0,0 +1,293 @@
+#------------------------------------------------------------------------------------------------------------------
+# Libraries
+
+import glob
+import os
+import numpy as np
+import pandas as pd
+from rapidfuzz.distance import JaroWinkler
+from rapidfuzz.process import cdist
+from .name_matching import normalize_text
+
+#------------------------------------------------------------------------------------------------------------------
+# Global variables
+
+# Leagues covered by Club Elo (country and level)
+CLUBELO_LEAGUES = {
+    'Premier League'        : {'Country' : 'ENG', 'Level' : 1},
+    'Championship'          : {'Country' : 'ENG', 'Level' : 2},
+    'Serie A'               : {'Country' : 'ITA', 'Level' : 1},
+    'Serie B'               : {'Country' : 'ITA', 'Level' : 2},
+    'La Liga'               : {'Country' : 'ESP', 'Level' : 1},
+    'La Liga 2'             : {'Country' : 'ESP', 'Level' : 2},
+    'Bundesliga'            : {'Country' : 'GER', 'Level' : 1},
+    'Bundesliga 2'          : {'Country' : 'GER', 'Level' : 2},
+    'Ligue 1'               : {'Country' : 'FRA', 'Level' : 1},
+    'Ligue 2'               : {'Country' : 'FRA', 'Level' : 2},
+    'Eredivisie'            : {'Country' : 'NED', 'Level' : 1},
+    'Belgian Pro League'    : {'Country' : 'BEL', 'Level' : 1},
+    'Primeira Liga'         : {'Country' : 'POR', 'Level' : 1}
+}
+
+# Jaro-Winkler threshold of the fuzzy step of build_alias_index
+ALIAS_THRESHOLD = 0.9
+
+ALIAS_COLUMNS = ['Club', 'Squad', 'League', 'Method', 'Score']
+
+# Club Elo names --> FBref squad names (manual mapping)
+CLUBELO_TEAM_NAMES = {
+    # English Premier League
+    'Forest': "Nott'ham Forest",
+    'Luton': 'Luton Town',
+    'Man City': 'Manchester City',
+    'Man United': 'Manchester Utd',
+    'Newcastle': 'Newcastle Utd',
+    'Sheffield United': 'Sheffield Utd',
+
+    # English Championship
+    'Birmingham': 'Birmingham City',
+    'Cardiff': 'Cardiff City',
+    'Coventry': 'Coventry City',
+    'Hull': 'Hull City',
+    'Ipswich': 'Ipswich Town',
+    'Leeds': 'Leeds United',
+    'Leicester': 'Leicester City',
+    'Norwich': 'Norwich City',
+    'Plymouth': 'Plymouth Argyle',
+    'Rotherham': 'Rotherham Utd',
+    'Stoke': 'Stoke City',
+    'Swansea': 'Swansea City',
+
+    # Italian Serie A
+    'Verona': 'Hellas Verona',
+
+    # Italian Serie B
+    'Lecco': 'Calcio Lecco 1912',
+    'Feralpisalo': 'FeralpiSalò',
+    'Suedtirol': 'Südtirol',
+
+    # Spanish La Liga
+    'Alaves': 'Alavés',
+    'Almeria': 'Almería',
+    'Atletico': 'Atlético Madrid',
+    'Bilbao': 'Athletic Club',
+    'Celta': 'Celta Vigo',
+    'Cadiz': 'Cádiz',
+    'Sociedad': 'Real Sociedad',
+
+    # Spanish Segunda División
+    'Alcorcon': 'Alcorcón',
+    'Andorra CF': 'FC Andorra',
+    'Gijon': 'Sporting Gijón',
+    'Mirandes': 'CD Mirandés',
+    'Ferrol': 'Racing Ferrol',
+    'Leganes': 'Leganés',
+    'Santander' : 'Racing Sant',
+
+    # German Bundesliga
+    'Bayern': 'Bayern Munich',
+    'Darmstadt': 'Darmstadt 98',
+    'Frankfurt': 'Eint Frankfurt',
+    'Koeln': 'Köln',
+    'Mainz': 'Mainz 05',
+    'Werder': 'Werder Bremen',
+
+    # German 2. Bundesliga
+    'Duesseldorf': 'Düsseldorf',
+    'Fuerth': 'Greuther Fürth',
+    'Hamburg': 'Hamburger SV',
+    'Hannover': 'Hannover 96',
+    'Hertha': 'Hertha BSC',
+    'Holstein': 'Holstein Kiel',
+    'Karlsruhe': 'Karlsruher',
+    'Lautern': 'Kaiserslautern',
+    'Nuernberg': 'Nürnberg',
+    'Osnabrueck': 'Osnabrück',
+    'Paderborn': 'Paderborn 07',
+    'Rostock': 'Hansa Rostock',
+    'Schalke': 'Schalke 04',
+    'St Pauli': 'St. Pauli',
+
+    # French Ligue 1
+    'Clermont': 'Clermont Foot',
+    'Paris SG': 'Paris S-G',
+
+    # French Ligue 2
+    'US Quevilly': 'Quevilly-Rouen',
+    'Concarneau': 'US Concarneau',
+    'Pau': 'Pau FC',
+    'Saint-Etienne': 'Saint-Étienne',
+    'Laval' : 'Stade Laval',
+    'Rodez' : 'Rodez Aveyron',
+
+    # Dutch Eredivisie
+    'Alkmaar': 'AZ Alkmaar',
+    'Almere': 'Almere City',
+    'Go Ahead Eagles': 'Go Ahead Eag',
+    'Heracles': 'Heracles Almelo',
+    'Nijmegen': 'NEC Nijmegen',
+    'PSV': 'PSV Eindhoven',
+    'Sittard': 'Fortuna Sittard',
+    'Sparta Rotterdam': "Sparta R'dam",
+    'Waalwijk': 'RKC Waalwijk',
+
+    # Belgian Pro League
+    'Brugge': 'Club Brugge',
+    'Leuven': 'OH Leuven',
+    'Molenbeek': 'RWD Molenbeek',
+    'St Gillis': 'Union SG',
+    'St Truiden': 'Sint-Truiden',
+    'Standard': 'Standard Liège',
+
+    # Portuguese Primeira Liga
+    'Estrela Amadora': 'Estrela',
+    'Famalicao': 'Famalicão',
+    'Guimaraes': 'Vitória',
+    'Sporting': 'Sporting CP',
+    'Gil Vicente': 'Gil Vicente FC',
+}
+
+#------------------------------------------------------------------------------------------------------------------
+# Snapshots
+
+def read_elo_snapshots(path):
+    '''
+    Reads one or more Club Elo snapshots (as downloaded from api.clubelo.com/<date>) from a .csv file,
+    a directory or a glob pattern, concatenated. All the rows of a snapshot share the same From date.
+    '''
+    paths = sorted(glob.glob(os.path.join(path, '*.csv'))) if os.path.isdir(path) else sorted(glob.glob(path))
+    if not paths:
+        raise FileNotFoundError(f"No Club Elo snapshots found at {path}")
+    return pd.concat([pd.read_csv(path) for path in paths], ignore_index=True)
+
+def _leagues():
+    return pd.DataFrame.from_dict(CLUBELO_LEAGUES, orient='index').rename_axis('League').reset_index()
+
+#------------------------------------------------------------------------------------------------------------------
+# Club names
+
+def build_alias_index(elo_df, squads_df=None, threshold=ALIAS_THRESHOLD):
+    '''
+    Maps every Club Elo club of elo_df (any number of snapshots) to its FBref squad name.
+    Matching steps, by precedence (column Method):
+    - 'manual' : CLUBELO_TEAM_NAMES
+    - 'exact'  : same normalized name (normalize_text) as a squad of the same league
+    - 'fuzzy'  : best Jaro-Winkler similarity >= threshold among the squads of the same league left unmatched
+                 (one club per squad, best scores first)
+    - 'identity' : the Club Elo name is kept as it is (the only step besides 'manual' when squads_df is None)
+    squads_df needs 'Squad' and 'League' (e.g. the FBref features). The index is meant to be built once
+    and stored with save_alias_index, Score is the similarity of the fuzzy matches.
+    '''
+    clubs = elo_df.drop_duplicates('Club', keep='last')[['Club', 'Country', 'Level']]
+    index = clubs.merge(_leagues(), on=['Country', 'Level'], how='left')[['Club', 'League']]
+    index['Squad']  = index['Club'].map(CLUBELO_TEAM_NAMES).astype(object)
+    index['Method'] = np.where(index['Squad'].notna(), 'manual', None)
+    index['Score']  = np.nan
+
+    if squads_df is not None:
+        squads = squads_df[['League', 'Squad']].drop_duplicates()
+        squads = squads[~squads['Squad'].isin(index['Squad'])]
+        squads = squads.assign(Key=squads['Squad'].map(normalize_text))
+
+        # Exact match of the normalized names within a league
+        pending = index[index['Squad'].isna()]
+        exact = pending.reset_index().assign(Key=pending['Club'].map(normalize_text).to_numpy()).merge(
+            squads.drop_duplicates(['League', 'Key']), on=['League', 'Key'], suffixes=('', '_fbref'))
+        index.loc[exact['index'], 'Squad']  = exact['Squad_fbref'].to_numpy()
+        index.loc[exact['index'], 'Method'] = 'exact'
+        squads = squads[~squads['Squad'].isin(index['Squad'])]
+
+        # Fuzzy match of the remaining names, blocked by league
+        pending = index[index['Squad'].isna() & index['League'].notna()]
+        for league, clubs_league in pending.groupby('League'):
+            candidates = squads[squads['League'] == league]
+            if candidates.empty:
+                continue
+            scores = cdist(clubs_league['Club'].map(normalize_text).to_numpy(), candidates['Key'].to_numpy(),
+                           scorer=JaroWinkler.normalized_similarity, dtype=np.float32)
+            rows, columns = np.nonzero(scores >= threshold)
+            taken_rows, taken_columns = set(), set()
+            for i in np.argsort(-scores[rows, columns], kind='stable'):
+                row, column = rows[i], columns[i]
+                if row in taken_rows or column in taken_columns:
+                    continue
+                taken_rows.add(row)
+                taken_columns.add(column)
+                position = clubs_league.index[row]
+                index.loc[position, ['Squad', 'Method', 'Score']] = [candidates['Squad'].iloc[column], 'fuzzy', float(scores[row, column])]
+
+    unmatched = index['Squad'].isna()
+    index.loc[unmatched, 'Squad']  = index.loc[unmatched, 'Club']
+    index.loc[unmatched, 'Method'] = 'identity'
+    return index[ALIAS_COLUMNS].reset_index(drop=True)
+
+def update_alias_index(index, elo_df, squads_df=None, threshold=ALIAS_THRESHOLD):
+    '''
+    Extends a stored index with the clubs of elo_df it does not cover yet (e.g. promoted clubs of a new
+    snapshot), matched as in build_alias_index against the squads not already taken.
+    Returns the extended index and the number of clubs added.
+    '''
+    new_clubs = elo_df[~elo_df['Club'].isin(index['Club'])]
+    if new_clubs.empty:
+        return index, 0
+    if squads_df is not None:
+        squads_df = squads_df[~squads_df['Squad'].isin(index['Squad'])]
+    added = build_alias_index(new_clubs, squads_df, threshold=threshold)
+    return pd.concat([index, added], ignore_index=True), len(added)
+
+def save_alias_index(index, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    index.to_csv(path, index=False)
+
+def load_alias_index(path):
+    return pd.read_csv(path)
+
+#------------------------------------------------------------------------------------------------------------------
+# Enrichment
+
+def add_elo_ranks(df, elo_df, alias_index=None, date=None):
+    '''
+    Adds to every player row the Club Elo ratings as of a date:
+    - LeagueRank : mean Elo of the clubs of its league
+    - SquadRank  : Elo of its squad
+    elo_df can hold several snapshots (see read_elo_snapshots): every row gets the latest snapshot with
+    From <= date, where date is a column of df (e.g. the start of each row's season), a single date for all
+    the rows, or None for the latest snapshot. Both joins are vectorized (merge_asof by league / squad).
+    Club names are mapped with alias_index (see build_alias_index; by default only CLUBELO_TEAM_NAMES),
+    clubs missing from it keep their Club Elo name.
+    Players of leagues not covered by CLUBELO_LEAGUES (or of unmapped squads) get missing values,
+    listed by missing_elo_report.
+    '''
+    if alias_index is None:
+        alias_index = build_alias_index(elo_df)
+    elo_df = elo_df.assign(From=pd.to_datetime(elo_df['From'])).merge(alias_index[['Club', 'Squad']], on='Club', how='left')
+    elo_df['Squad'] = elo_df['Squad'].fillna(elo_df['Club'])
+
+    # merge_asof needs join keys of the same dtype: league and squad names are joined as python objects
+    league_rank = elo_df.groupby(['From', 'Country', 'Level'], as_index=False)['Elo'].mean().merge(_leagues(), on=['Country', 'Level'])
+    league_rank = league_rank[['From', 'League', 'Elo']].rename(columns={'League' : 'EloLeague', 'Elo' : 'LeagueRank'})
+    league_rank = league_rank.astype({'EloLeague' : object}).sort_values('From')
+    squad_rank  = elo_df.drop_duplicates(['From', 'Squad'])[['From', 'Squad', 'Elo']].rename(columns={'Squad' : 'EloSquad', 'Elo' : 'SquadRank'})
+    squad_rank  = squad_rank.astype({'EloSquad' : object}).sort_values('From')
+
+    if date is None:
+        dates = elo_df['From'].max()
+    elif isinstance(date, str) and date in df.columns:
+        dates = pd.to_datetime(df[date]).to_numpy()
+    else:
+        dates = pd.Timestamp(date)
+    players = df.assign(EloDate=dates, EloRow=np.arange(len(df)), EloLeague=df['League'].astype(object), EloSquad=df['Squad'].astype(object))
+    players = players.sort_values('EloDate', kind='stable')
+    players = pd.merge_asof(players, league_rank, left_on='EloDate', right_on='From', by='EloLeague', direction='backward').drop(columns='From')
+    players = pd.merge_asof(players, squad_rank, left_on='EloDate', right_on='From', by='EloSquad', direction='backward').drop(columns='From')
+    return players.sort_values('EloRow').drop(columns=['EloDate', 'EloRow', 'EloLeague', 'EloSquad']).reset_index(drop=True)
+
+def missing_elo_report(df):
+    '''
+    Players left without LeagueRank or SquadRank by add_elo_ranks, counted per (League, Squad):
+    useful to complete CLUBELO_TEAM_NAMES or the alias index.
+    '''
+    missing = df[df[['LeagueRank', 'SquadRank']].isna().any(axis=1)]
+    return missing.groupby(['League', 'Squad'], observed=True).size().rename('Players').reset_index(), missing
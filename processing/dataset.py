@@ -0,0 +1,84 @@
+#------------------------------------------------------------------------------------------------------------------
+# Libraries
+
+import json
+import os
+import numpy as np
+import pandas as pd
+from .features import FEATURES
+from .name_matching import NAME_MATCH_THRESHOLD, match_players, normalize_text
+
+#------------------------------------------------------------------------------------------------------------------
+# Global variables
+
+# Leagues dropped from the training dataset since they are not covered by Club Elo
+EXCLUDED_LEAGUES = ['Major League Soccer','Liga MX','Campeonato Brasileiro Série A']
+
+# Columns of the training dataset which are not fed to the VAE
+NON_FEATURE_COLUMNS = ['Player', 'Nation', 'Pos_fbref','Pos_tm', 'Squad','League', 'Born','90s','MarketValue']
+
+CATEGORICAL_COLUMNS = ['Nation', 'Pos_fbref', 'Pos_tm', 'Squad', 'League']
+
+#------------------------------------------------------------------------------------------------------------------
+# Merging
+
+def merge_transfermarkt(features_df, tm_df, threshold=NAME_MATCH_THRESHOLD, n_workers=1):
+    '''
+    Attaches position, height, foot and market value from Transfermarkt to the FBref features
+    (players are linked by name, league and birth year, see match_players).
+    '''
+    tm_df   = tm_df[tm_df['Pos'] != 'Goalkeeper'].dropna()
+    matches = match_players(features_df, tm_df, threshold=threshold, n_workers=n_workers)
+
+    fbref_df = features_df.assign(matched_key=matches['matched_key']).dropna(subset=['matched_key'])
+    fbref_df = fbref_df.assign(Born=fbref_df['Born'].astype(float))
+    tm_df    = tm_df.assign(matched_key=tm_df['Player'].map(normalize_text), Born=tm_df['BirthYear'].astype(float))
+    # Don't consider duplicated keys in tm dataframe
+    tm_df    = tm_df[~tm_df.duplicated(subset=['matched_key','League','Born'],keep=False)]
+
+    merged_df = fbref_df.merge(tm_df[['matched_key','League','Born','Pos','Height','Foot','MarketValue']],
+                               on=['matched_key','League','Born'],
+                               how='inner',
+                               suffixes=('_fbref', '_tm'))
+    merged_df['Height'] = merged_df['Height'].str.replace(' m','').str.replace(',','').astype(int)
+    merged_df['Foot']   = (merged_df['Foot'] == 'right').astype(int)
+    merged_df = merged_df.rename(columns={'Foot' : 'RightFoot'}).drop(columns=['matched_key'])
+    return merged_df
+
+#------------------------------------------------------------------------------------------------------------------
+# Storage
+
+def write_dataset(df, path):
+    '''
+    Writes df as typed Parquet (float32 features, categorical labels) next to a
+    <name>.schema.json manifest describing every column and how each feature is computed.
+    Returns the path of the manifest.
+    '''
+    df = df.copy()
+    for column in df.columns:
+        if column in CATEGORICAL_COLUMNS:
+            df[column] = df[column].astype('category')
+        elif column not in NON_FEATURE_COLUMNS and pd.api.types.is_float_dtype(df[column]):
+            df[column] = df[column].astype(np.float32)
+    df.to_parquet(path,index=False)
+
+    formulas = {name : {'numerator' : numerator, 'denominator' : denominator} for name,numerator,denominator in FEATURES}
+    manifest = {
+        'rows'    : len(df),
+        'columns' : [
+            {
+                'name'    : column,
+                'dtype'   : str(df[column].dtype),
+                'role'    : 'metadata' if column in NON_FEATURE_COLUMNS else 'feature',
+                'formula' : formulas.get(column),
+            }
+            for column in df.columns
+        ],
+    }
+    manifest_path = os.path.splitext(path)[0] + '.schema.json'
+    with open(manifest_path,'w') as f:
+        json.dump(manifest,f,indent=2,ensure_ascii=False)
+    return manifest_path
+
+def read_dataset(path):
+    return pd.read_parquet(path)
@@ -0,0 +1,176 @@
+#------------------------------------------------------------------------------------------------------------------
+# Libraries
+
+import numpy as np
+import pandas as pd
+
+#------------------------------------------------------------------------------------------------------------------
+# Global variables
+
+KEY_COLUMNS = ['Player','Nation','Pos','Squad','League','Age','Born','90s']
+
+# Every feature is declared once as (name, numerator, denominator):
+# - denominator '90s' gives a per 90 minutes feature
+# - any other denominator gives a ratio
+# - denominator None keeps the FBref column as it is
+# The order reproduces the columns of the training dataset built in data_processing.ipynb.
+
+SHOOTING_FEATURES = [
+    ('Standard_Sh/90'         , 'Standard_Sh/90'    , None),
+    ('Standard_SoT/90'        , 'Standard_SoT/90'   , None),
+    ('Standard_Dist'          , 'Standard_Dist'     , None),
+    ('Standard_Gls/90'        , 'Standard_Gls'      , '90s'),
+    ('Expected_xG/90'         , 'Expected_xG'       , '90s'),
+    ('Expected_npxG/90'       , 'Expected_npxG'     , '90s'),
+    ('Standard_FK/Sh'         , 'Standard_FK'       , 'Standard_Sh'),
+]
+
+PASSING_FEATURES = [
+    ('Total_Cmp%'             , 'Total_Cmp%'        , None),
+    ('Expected_A-xAG'         , 'Expected_A-xAG'    , None),
+    ('Total_Cmp/90'           , 'Total_Cmp'         , '90s'),
+    ('Total_Att/90'           , 'Total_Att'         , '90s'),
+    ('Average_TotDist'        , 'Total_TotDist'     , 'Total_Cmp'),
+    ('Average_PrgDist'        , 'Total_PrgDist'     , 'Total_Cmp'),
+    ('Short_Cmp/90'           , 'Short_Cmp'         , '90s'),
+    ('Short_Att/90'           , 'Short_Att'         , '90s'),
+    ('Medium_Cmp/90'          , 'Medium_Cmp'        , '90s'),
+    ('Medium_Att/90'          , 'Medium_Att'        , '90s'),
+    ('Long_Cmp/90'            , 'Long_Cmp'          , '90s'),
+    ('Long_Att/90'            , 'Long_Att'          , '90s'),
+    ('Ast/90'                 , 'Ast'               , '90s'),
+    ('xAG/90'                 , 'xAG'               , '90s'),
+    ('Expected_xA/90'         , 'Expected_xA'       , '90s'),
+    ('KP/90'                  , 'KP'                , '90s'),
+    ('1/3/90'                 , '1/3'               , '90s'),
+    ('PPA/90'                 , 'PPA'               , '90s'),
+    ('CrsPA/90'               , 'CrsPA'             , '90s'),
+    ('PrgP/90'                , 'PrgP'              , '90s'),
+]
+
+PASS_TYPES_FEATURES = [
+    ('Pass_Types_Live/90'     , 'Pass_Types_Live'   , '90s'),
+    ('Pass_Types_Dead/90'     , 'Pass_Types_Dead'   , '90s'),
+    ('Pass_Types_FK/90'       , 'Pass_Types_FK'     , '90s'),
+    ('Pass_Types_TB/90'       , 'Pass_Types_TB'     , '90s'),
+    ('Pass_Types_Sw/90'       , 'Pass_Types_Sw'     , '90s'),
+    ('Pass_Types_Crs/90'      , 'Pass_Types_Crs'    , '90s'),
+    ('Pass_Types_TI/90'       , 'Pass_Types_TI'     , '90s'),
+    ('Outcomes_Cmp/90'        , 'Outcomes_Cmp'      , '90s'),
+    ('Outcomes_Off/Cmp'       , 'Outcomes_Off'      , 'Outcomes_Cmp'),
+    ('Outcomes_Blocks/Cmp'    , 'Outcomes_Blocks'   , 'Outcomes_Cmp'),
+]
+
+GCA_FEATURES = [
+    ('SCA_SCA90'              , 'SCA_SCA90'         , None),
+    ('GCA_GCA90'              , 'GCA_GCA90'         , None),
+    ('SCA_Types_PassLive/90'  , 'SCA_Types_PassLive', '90s'),
+    ('SCA_Types_PassDead/90'  , 'SCA_Types_PassDead', '90s'),
+    ('SCA_Types_TO/90'        , 'SCA_Types_TO'      , '90s'),
+    ('SCA_Types_Sh/90'        , 'SCA_Types_Sh'      , '90s'),
+    ('SCA_Types_Fld/90'       , 'SCA_Types_Fld'     , '90s'),
+    ('SCA_Types_Def/90'       , 'SCA_Types_Def'     , '90s'),
+    ('GCA_Types_PassLive/90'  , 'GCA_Types_PassLive', '90s'),
+    ('GCA_Types_PassDead/90'  , 'GCA_Types_PassDead', '90s'),
+    ('GCA_Types_TO/90'        , 'GCA_Types_TO'      , '90s'),
+    ('GCA_Types_Sh/90'        , 'GCA_Types_Sh'      , '90s'),
+    ('GCA_Types_Fld/90'       , 'GCA_Types_Fld'     , '90s'),
+    ('GCA_Types_Def/90'       , 'GCA_Types_Def'     , '90s'),
+]
+
+DEFENSE_FEATURES = [
+    ('Tackles_Tkl/90'         , 'Tackles_Tkl'       , '90s'),
+    ('Tackles_TklW/90'        , 'Tackles_TklW'      , '90s'),
+    ('Tackles_Def_3rd/90'     , 'Tackles_Def_3rd'   , '90s'),
+    ('Tackles_Mid_3rd/90'     , 'Tackles_Mid_3rd'   , '90s'),
+    ('Tackles_Att_3rd/90'     , 'Tackles_Att_3rd'   , '90s'),
+    ('Challenges_Tkl/90'      , 'Challenges_Tkl'    , '90s'),
+    ('Challenges_Att/90'      , 'Challenges_Att'    , '90s'),
+    ('Challenges_Lost/90'     , 'Challenges_Lost'   , 'Challenges_Att'),
+    ('Blocks_Blocks/90'       , 'Blocks_Blocks'     , '90s'),
+    ('Blocks_Sh/90'           , 'Blocks_Sh'         , '90s'),
+    ('Blocks_Pass/90'         , 'Blocks_Pass'       , '90s'),
+    ('Int/90'                 , 'Int'               , '90s'),
+    ('Clr/90'                 , 'Clr'               , '90s'),
+    ('Err/90'                 , 'Err'               , '90s'),
+]
+
+POSSESSION_FEATURES = [
+    ('Touches_Touches/90'     , 'Touches_Touches'   , '90s'),
+    ('Touches_Def_Pen/90'     , 'Touches_Def_Pen'   , '90s'),
+    ('Touches_Def_3rd/90'     , 'Touches_Def_3rd'   , '90s'),
+    ('Touches_Mid_3rd/90'     , 'Touches_Mid_3rd'   , '90s'),
+    ('Touches_Att_3rd/90'     , 'Touches_Att_3rd'   , '90s'),
+    ('Touches_Att_Pen/90'     , 'Touches_Att_Pen'   , '90s'),
+    ('Take-Ons_Att/90'        , 'Take-Ons_Att'      , '90s'),
+    ('Take-Ons_Succ/90'       , 'Take-Ons_Succ'     , '90s'),
+    ('Take-Ons_Tkld/90'       , 'Take-Ons_Tkld'     , '90s'),
+    ('Carries_Carries/90'     , 'Carries_Carries'   , '90s'),
+    ('Carries_AverageTotDist' , 'Carries_TotDist'   , 'Carries_Carries'),
+    ('Carries_AveragePrgDist' , 'Carries_PrgDist'   , 'Carries_Carries'),
+    ('Carries_PrgC/90'        , 'Carries_PrgC'      , '90s'),
+    ('Carries_1/3/90'         , 'Carries_1/3'       , '90s'),
+    ('Carries_CPA/90'         , 'Carries_CPA'       , '90s'),
+    ('Carries_Mis/90'         , 'Carries_Mis'       , '90s'),
+    ('Carries_Dis/90'         , 'Carries_Dis'       , '90s'),
+    ('Receiving_Rec/90'       , 'Receiving_Rec'     , '90s'),
+    ('Receiving_PrgR/90'      , 'Receiving_PrgR'    , '90s'),
+]
+
+MISC_FEATURES = [
+    ('Performance_CrdY/90'    , 'Performance_CrdY'  , '90s'),
+    ('Performance_Fls/90'     , 'Performance_Fls'   , '90s'),
+    ('Performance_Fld/90'     , 'Performance_Fld'   , '90s'),
+    ('Performance_Off/90'     , 'Performance_Off'   , '90s'),
+    ('Performance_Crs/90'     , 'Performance_Crs'   , '90s'),
+    ('Performance_Int/90'     , 'Performance_Int'   , '90s'),
+    ('Aerial_Duels_Won/90'    , 'Aerial_Duels_Won'  , '90s'),
+    ('Aerial_Duels_Lost/90'   , 'Aerial_Duels_Lost' , '90s'),
+]
+
+FEATURE_GROUPS = {
+    'shooting'              : SHOOTING_FEATURES,
+    'passing'               : PASSING_FEATURES,
+    'pass types'            : PASS_TYPES_FEATURES,
+    'goal and shot creation': GCA_FEATURES,
+    'defensive actions'     : DEFENSE_FEATURES,
+    'possession'            : POSSESSION_FEATURES,
+    'miscellaneous'         : MISC_FEATURES,
+}
+
+FEATURES        = [feature for group in FEATURE_GROUPS.values() for feature in group]
+FEATURE_COLUMNS = [name for name,_,_ in FEATURES]
+
+#------------------------------------------------------------------------------------------------------------------
+# Pipeline
+
+def filter_players(df, min_90s=5):
+    '''
+    Keeps outfield players with at least min_90s full matches and at least one shot
+    (see the "Basic pre-processing" section of data_processing.ipynb).
+    '''
+    return df[(df['Pos'] != 'GK') & (df['90s'] >= min_90s) & (df['Standard_Sh'] > 0)]
+
+def build_features(df, features=FEATURES, dtype=np.float32):
+    '''
+    Computes all the features in a single vectorized pass:
+    the needed FBref columns are converted once to a dtype matrix (plus a column of ones for the
+    features kept as they are), then every feature is numerator / denominator on column indices.
+    Rows with missing values are dropped, as in the notebook.
+    '''
+    inputs = list(dict.fromkeys([numerator for _,numerator,_ in features] + [denominator for _,_,denominator in features if denominator is not None]))
+    position = {column : i for i,column in enumerate(inputs)}
+
+    X = np.empty((len(df), len(inputs) + 1), dtype=dtype)
+    X[:, :-1] = df[inputs].to_numpy(dtype=dtype)
+    X[:, -1]  = 1
+    numerators   = [position[numerator] for _,numerator,_ in features]
+    denominators = [position[denominator] if denominator is not None else len(inputs) for _,_,denominator in features]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = X[:, numerators] / X[:, denominators]
+
+    features_df = pd.concat([
+        df[KEY_COLUMNS].reset_index(drop=True),
+        pd.DataFrame(values, columns=[name for name,_,_ in features]),
+    ], axis=1)
+    return features_df.dropna().reset_index(drop=True)
@@ -0,0 +1,109 @@
+#------------------------------------------------------------------------------------------------------------------
+# Libraries
+
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from rapidfuzz.distance import JaroWinkler
+from rapidfuzz.process import cdist
+
+#------------------------------------------------------------------------------------------------------------------
+# Global variables
+
+NAME_MATCH_THRESHOLD = 0.9
+
+MATCH_COLUMNS = ['matched_key', 'best_candidate', 'score', 'n_candidates', 'status']
+
+#------------------------------------------------------------------------------------------------------------------
+# Normalization
+
+def normalize_text(text):
+    text = unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('utf-8')
+    text = text.replace('-', ' ')
+    text = text.replace(' ', '')
+    text = text.replace("'",'')
+    return text.lower()
+
+#------------------------------------------------------------------------------------------------------------------
+# Matching
+
+def _match_league(fbref_league, tm_league, threshold):
+    '''
+    Matches the FBref players of one league against the Transfermarkt players of the same league.
+    Candidates are blocked by birth year, and every block is scored with a single compiled
+    Jaro-Winkler cdist call (same similarity as textdistance.jaro_winkler).
+    '''
+    n_players      = len(fbref_league)
+    best_candidate = np.full(n_players, None, dtype=object)
+    score          = np.full(n_players, np.nan)
+    n_candidates   = np.zeros(n_players, dtype=int)
+
+    names  = fbref_league['NormalizedPlayer'].to_numpy()
+    blocks = pd.Series(np.arange(n_players)).groupby(fbref_league['Born'].to_numpy()).indices
+    tm_blocks = pd.Series(tm_league['NormalizedPlayer'].to_numpy()).groupby(tm_league['BirthYear'].to_numpy()).indices
+    tm_names  = tm_league['NormalizedPlayer'].to_numpy()
+    for year, positions in blocks.items():
+        if year not in tm_blocks:
+            continue
+        candidates = tm_names[tm_blocks[year]]
+        scores     = cdist(names[positions], candidates, scorer=JaroWinkler.normalized_similarity, dtype=np.float32)
+        best_idx   = scores.argmax(axis=1)
+        best_candidate[positions] = candidates[best_idx]
+        score[positions]          = scores[np.arange(len(positions)), best_idx]
+        n_candidates[positions]   = len(candidates)
+
+    matched = score >= threshold
+    return pd.DataFrame({
+        'matched_key'    : np.where(matched, best_candidate, None),
+        'best_candidate' : best_candidate,
+        'score'          : score,
+        'n_candidates'   : n_candidates,
+        'status'         : np.where(matched, 'matched', np.where(n_candidates > 0, 'below_threshold', 'no_candidates')),
+    }, index=fbref_league.index)
+
+def match_players(fbref_data, tm_data, threshold=NAME_MATCH_THRESHOLD, leagues=None, n_workers=1):
+    '''
+    Links FBref players to Transfermarkt players with the same league and birth year
+    (fbref_data needs 'Player','League','Born', tm_data needs 'Player','League','BirthYear').
+    Leagues are processed in parallel on n_workers processes.
+
+    Returns a frame aligned with fbref_data holding:
+    - matched_key    : normalized Transfermarkt name, None if unmatched
+    - best_candidate : best scoring candidate, even if below threshold
+    - score          : Jaro-Winkler similarity of the best candidate
+    - n_candidates   : size of the (league, birth year) block
+    - status         : 'matched', 'below_threshold' or 'no_candidates'
+    '''
+    fbref_data = fbref_data[['Player','League','Born']].copy()
+    tm_data    = tm_data[['Player','League','BirthYear']].copy()
+    fbref_data['NormalizedPlayer'] = fbref_data['Player'].map(normalize_text)
+    tm_data['NormalizedPlayer']    = tm_data['Player'].map(normalize_text)
+
+    if leagues is None:
+        leagues = fbref_data['League'].unique().tolist()
+    tm_by_league = dict(tuple(tm_data.groupby('League')))
+    jobs = [
+        (fbref_data[fbref_data['League'] == league], tm_by_league.get(league, tm_data.iloc[:0]), threshold)
+        for league in leagues
+    ]
+
+    if n_workers == 1:
+        results = [_match_league(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            results = list(executor.map(_match_league, *zip(*jobs)))
+
+    result = pd.concat(results) if results else pd.DataFrame(columns=MATCH_COLUMNS)
+    result = result.reindex(fbref_data.index)
+    result['status'] = result['status'].fillna('league_not_requested')
+    result['n_candidates'] = result['n_candidates'].fillna(0).astype(int)
+    return result
+
+def unmatched_report(fbref_data, matches):
+    '''
+    Summary of the unmatched players per league and reason, useful to tune the threshold.
+    '''
+    unmatched = fbref_data[['Player','League','Squad']].join(matches[['best_candidate','score','status']])
+    unmatched = unmatched[matches['status'] != 'matched']
+    return unmatched.groupby(['League','status']).size().unstack(fill_value=0), unmatched
@@ -0,0 +1,70 @@
+#----------------------------------------------------------------------------------------------------------------------------------------
+# LIBRARIES
+import argparse
+from scouting import EmbeddingStore
+from scouting.projection import N_COMPONENTS,N_NEIGHBORS,project_store
+#----------------------------------------------------------------------------------------------------------------------------------------
+# GLOBAL (DEFAULT) PARAMETERS AND SETTINGS
+
+STORE_DIR        = 'checkpoints/embeddings/'
+OUTPUT_DIR       = 'checkpoints/vae_projection/'
+METHOD           = 'mapper'
+
+
+
+if __name__ == "__main__":
+
+    #----------------------------------------------------------------------------------------------------------------------------------------
+    # PARSE ARGUMENTS
+    parser = argparse.ArgumentParser(
+        description = "Python script to project the player embeddings with UMAP (fitted once, new players are placed incrementally)"
+        )
+
+    # Paths
+    parser.add_argument("-SD","--StoreDir",
+                        type    = str,
+                        default = STORE_DIR,
+                        help    = "Directory of the embedding store (see export_embeddings.py)"
+                       )
+    parser.add_argument("-OD","--OutputDir",
+                        type    = str,
+                        default = OUTPUT_DIR,
+                        help    = "Directory of the fitted projection and of the cached coordinates (coordinates.npy, one row per store row)"
+                       )
+
+    # Settings
+    parser.add_argument("-NC","--NumComponents",
+                        type    = int,
+                        default = N_COMPONENTS,
+                        help    = "Number of UMAP components"
+                       )
+    parser.add_argument("-NN","--NumNeighbors",
+                        type    = int,
+                        default = N_NEIGHBORS,
+                        help    = "Number of UMAP neighbors"
+                       )
+    parser.add_argument("-M","--Method",
+                        type    = str,
+                        default = METHOD,
+                        choices = ['mapper','umap'],
+                        help    = "How new embeddings are placed: 'mapper' (parametric mapper, fast) or 'umap' (UMAP.transform)"
+                       )
+    parser.add_argument("-RF","--Refit",
+                        action  = "store_true",
+                        help    = "Add this flag to fit the projection again on all the embeddings"
+                       )
+
+    args = parser.parse_args()
+
+    #----------------------------------------------------------------------------------------------------------------------------------------
+    # PROJECTION
+
+    store = EmbeddingStore(args.StoreDir)
+    coordinates = project_store(store, args.OutputDir,
+                                refit        = args.Refit,
+                                method       = args.Method,
+                                n_components = args.NumComponents,
+                                n_neighbors  = args.NumNeighbors)
+    print(f"{store.n_active} coordinates ({coordinates.shape[1]} components) --> {args.OutputDir}")
+
+    #----------------------------------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,3 @@
+from .store import EmbeddingStore,parse_market_value
+from .knn import ExactIndex,IVFIndex,build_index
+from .filters import FilteredIndex
\ No newline at end of file
@@ -0,0 +1,50 @@
+#------------------------------------------------------------------------------------------------------------------
+# Libraries
+
+import hashlib
+import numpy as np
+import torch
+from .store import EmbeddingStore
+from .refresh import row_keys,row_fingerprints
+
+#------------------------------------------------------------------------------------------------------------------
+# Global variables
+
+ENCODE_BATCH_SIZE = 4096
+
+#------------------------------------------------------------------------------------------------------------------
+# Export
+
+@torch.no_grad()
+def encode_dataset(vae, X, batch_size=ENCODE_BATCH_SIZE, device='cpu'):
+    '''
+    Runs VAE.encode in batches over X (already normalized). Returns mu and logvar as float32 numpy arrays.
+    '''
+    vae.eval()
+    mu     = np.empty((X.shape[0], vae.mu_layer.out_features), dtype=np.float32)
+    logvar = np.empty_like(mu)
+    for start in range(0, X.shape[0], batch_size):
+        batch_mu, batch_logvar = vae.encode(X[start:start + batch_size].to(device))
+        mu[start:start + batch_size]     = batch_mu.cpu().numpy()
+        logvar[start:start + batch_size] = batch_logvar.cpu().numpy()
+    return mu, logvar
+
+def model_fingerprint(vae):
+    '''
+    sha256 of the weights of the model, stored with the embeddings it produced (info['model_fingerprint']).
+    '''
+    digest = hashlib.sha256()
+    for name, tensor in sorted(vae.state_dict().items()):
+        digest.update(name.encode('utf-8'))
+        digest.update(tensor.detach().to('cpu', torch.float32).contiguous().numpy().tobytes())
+    return digest.hexdigest()
+
+def export_embeddings(vae, X, data, directory, dtype='float32', batch_size=ENCODE_BATCH_SIZE, device='cpu', info=None):
+    '''
+    Encodes the dataset and writes an EmbeddingStore (data holds the rows of X), with the row keys and
+    fingerprints used by incremental refreshes and the fingerprint of the model.
+    '''
+    mu, logvar = encode_dataset(vae, X, batch_size=batch_size, device=device)
+    info = {**(info or {}), 'model_fingerprint' : model_fingerprint(vae)}
+    return EmbeddingStore.write(directory, mu, logvar, data, dtype=dtype, info=info,
+                                keys=row_keys(data), fingerprints=row_fingerprints(data))
@@ -0,0 +1,142 @@
+#------------------------------------------------------------------------------------------------------------------
+# Libraries
+
+import numpy as np
+from .knn import _prepare, _distances, _top_k
+from .store import CATEGORICAL_FIELDS
+
+#------------------------------------------------------------------------------------------------------------------
+# Global variables
+
+NUMERIC_FIELDS = ['Age', 'MarketValue']
+
+# Training dataset column names accepted as filters
+FIELD_ALIASES = {'Pos_tm' : 'Pos'}
+
+#------------------------------------------------------------------------------------------------------------------
+# Filtered search
+
+class FilteredIndex:
+    '''
+    Similarity search restricted to the players matching structured filters on the store metadata:
+    - categorical fields (League, Pos / Pos_tm, Squad): a value or a list of values
+    - numeric fields (Age, MarketValue in euros): a (low, high) range, low included and high excluded,
+      None for an open side (e.g. Age=(None, 23) means under 23)
+
+        index = FilteredIndex(store)
+        index.similar_players('Rafael Leão', k=5, League=['Ligue 2', 'Eredivisie'], Age=(None, 23), MarketValue=(None, 5e6))
+
+    The embeddings are stored partitioned by League (every league is a contiguous block), the other
+    categorical fields have an inverted list per category and the numeric fields a sorted index.
+    A filter only touches the partitions / posting lists it selects; they are intersected through a
+    bitmap and only the surviving candidates are scored (matrix multiply + partial selection).
+    Deleted rows of the store are skipped; after a refresh of the store build a new FilteredIndex.
+    '''
+    def __init__(self, store, metric='euclidean', partition_by='League'):
+        self.store    = store
+        self.metric   = metric
+        codes         = np.asarray(store.metadata[partition_by])
+        # position in the partitioned layout --> row id of the store
+        self.order    = np.argsort(codes, kind='stable')
+        self.X        = _prepare(store.mu, metric)[self.order]
+        self.X_sq_norms = (self.X * self.X).sum(axis=1)[None, :]
+        self.active     = np.asarray(store.active)[self.order]
+
+        self.postings = {}
+        for field in CATEGORICAL_FIELDS:
+            field_codes = np.asarray(store.metadata[field])[self.order]
+            positions   = np.argsort(field_codes, kind='stable')
+            offsets     = np.concatenate([[0], np.cumsum(np.bincount(field_codes, minlength=len(store.categories[field])))])
+            self.postings[field] = (positions, offsets)
+
+        self.sorted = {}
+        for field in NUMERIC_FIELDS:
+            values    = np.asarray(store.metadata[field], dtype=np.float64)[self.order]
+            positions = np.argsort(values, kind='stable')   # NaN last
+            n_valid   = int((~np.isnan(values)).sum())
+            self.sorted[field] = (positions[:n_valid], values[positions[:n_valid]])
+
+    def __len__(self):
+        return len(self.X)
+
+    def _positions(self, field, condition):
+        field = FIELD_ALIASES.get(field, field)
+        if field in self.postings:
+            values = condition if isinstance(condition, (list, tuple, set, np.ndarray)) else [condition]
+            positions, offsets = self.postings[field]
+            categories = {category : code for code, category in enumerate(self.store.categories[field])}
+            codes = [categories[value] for value in values if value in categories]
+            return np.concatenate([positions[offsets[code]:offsets[code + 1]] for code in codes] or [np.empty(0, dtype=np.int64)])
+        if field in self.sorted:
+            low, high = condition
+            positions, values = self.sorted[field]
+            start = 0 if low is None else np.searchsorted(values, low, side='left')
+            end   = len(values) if high is None else np.searchsorted(values, high, side='left')
+            return positions[start:end]
+        raise ValueError(f"Unknown filter '{field}' (available: {list(self.postings) + list(self.sorted) + list(FIELD_ALIASES)})")
+
+    def _candidates(self, filters):
+        '''
+        Positions (in the partitioned layout, sorted) of the players matching all the filters.
+        '''
+        if not filters:
+            return np.flatnonzero(self.active)
+        selections = sorted((self._positions(field, condition) for field, condition in filters.items()), key=len)
+        bitmap = np.zeros(len(self.X), dtype=bool)
+        bitmap[selections[0]] = True
+        bitmap &= self.active
+        for positions in selections[1:]:
+            selected = np.zeros(len(self.X), dtype=bool)
+            selected[positions] = True
+            bitmap &= selected
+        return np.flatnonzero(bitmap)
+
+    def candidates(self, **filters):
+        '''
+        Row ids of the players matching the filters.
+        '''
+        return np.sort(self.order[self._candidates(filters)])
+
+    def search(self, queries, k=5, exclude=None, **filters):
+        '''
+        k nearest players matching the filters for every query embedding. Returns (distances, row ids),
+        arrays of shape (n_queries, k) padded with inf / -1 when fewer players match.
+        exclude optionally gives a row id to leave out for every query (e.g. the query player).
+        '''
+        Q = _prepare(np.atleast_2d(queries), self.metric)
+        positions = self._candidates(filters)
+        distances = np.full((len(Q), k), np.inf, dtype=np.float32)
+        indices   = np.full((len(Q), k), -1, dtype=np.int64)
+        if len(positions) == 0:
+            return distances, indices
+
+        candidate_distances = _distances(Q, self.X[positions], self.X_sq_norms[:, positions], self.metric)
+        row_ids = self.order[positions]
+        if exclude is not None:
+            candidate_distances[np.asarray(exclude)[:, None] == row_ids[None, :]] = np.inf
+        top_distances, top = _top_k(candidate_distances, k)
+        top_ids = row_ids[top]
+        top_ids[~np.isfinite(top_distances)] = -1
+        distances[:, :top.shape[1]] = top_distances
+        indices[:, :top.shape[1]]   = top_ids
+        return distances, indices
+
+    def similar(self, row_ids, k=5, **filters):
+        '''
+        k nearest players matching the filters for players of the store (the player itself is excluded).
+        '''
+        row_ids = np.atleast_1d(np.asarray(row_ids))
+        return self.search(self.store.mu[row_ids], k, exclude=row_ids, **filters)
+
+    def similar_players(self, player, k=5, **filters):
+        '''
+        Metadata of the k players most similar to `player` (by name) matching the filters, with their distance.
+        '''
+        row_ids = self.store.find(player)
+        if len(row_ids) == 0:
+            raise ValueError(f"Player '{player}' not found")
+        distances, indices = self.similar(row_ids[:1], k, **filters)
+        found = indices[0] >= 0
+        result = self.store.to_frame(indices[0][found])
+        result['Distance'] = distances[0][found]
+        return result
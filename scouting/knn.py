@@ -0,0 +1,220 @@
+#------------------------------------------------------------------------------------------------------------------
+# Libraries
+
+import numpy as np
+
+#------------------------------------------------------------------------------------------------------------------
+# Global variables
+
+METRICS = ['euclidean', 'cosine']
+
+# Above this number of players build_index switches to the approximate IVF index
+EXACT_MAX_SIZE = 50000
+
+#------------------------------------------------------------------------------------------------------------------
+# Helpers
+
+def _prepare(embeddings, metric):
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric '{metric}' (available: {METRICS})")
+    X = np.ascontiguousarray(embeddings, dtype=np.float32)
+    if metric == 'cosine':
+        X = X / np.maximum(np.linalg.norm(X, axis=1, keepdims=True), 1e-12)
+    return X
+
+def _distances(Q, X, X_sq_norms, metric):
+    '''
+    Distances between the (already prepared) queries Q and X through a single matrix multiply.
+    '''
+    if metric == 'cosine':
+        return 1.0 - Q @ X.T
+    squared = (Q * Q).sum(axis=1, keepdims=True) - 2.0 * (Q @ X.T) + X_sq_norms
+    return np.sqrt(np.maximum(squared, 0.0))
+
+def _top_k(distances, k):
+    '''
+    Partial selection of the k smallest distances of every row, then sort of those k only.
+    '''
+    k = min(k, distances.shape[1])
+    if k < distances.shape[1]:
+        indices = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    else:
+        indices = np.broadcast_to(np.arange(k), distances.shape).copy()
+    selected = np.take_along_axis(distances, indices, axis=1)
+    order = np.argsort(selected, axis=1, kind='stable')
+    return np.take_along_axis(selected, order, axis=1), np.take_along_axis(indices, order, axis=1)
+
+#------------------------------------------------------------------------------------------------------------------
+# Indexes
+#
+# Both indexes expose:
+# - search(queries, k)               --> (distances, row ids), arrays of shape (n_queries, k) sorted by distance
+#                                        (padded with inf / -1 when fewer players are available)
+# - neighbors(row_ids, k)            --> same, for players of the index (the player itself is excluded)
+# - upsert(row_ids, embeddings)      --> adds or replaces players in place
+# - remove(row_ids)                  --> removes players in place
+# Only the rows flagged in `active` are returned (e.g. EmbeddingStore.active, deleted rows are skipped).
+
+class _Index:
+    def neighbors(self, row_ids, k=5):
+        row_ids = np.atleast_1d(np.asarray(row_ids))
+        distances, indices = self.search(self.X[row_ids], k + 1)
+        # Drop the player itself (normally the first hit, but ties can move it)
+        keep = indices != row_ids[:, None]
+        keep[keep.sum(axis=1) > k, -1] = False
+        return distances[keep].reshape(len(row_ids), k), indices[keep].reshape(len(row_ids), k)
+
+    def _grow(self, n_rows):
+        if n_rows > len(self.X):
+            extra = n_rows - len(self.X)
+            self.X      = np.concatenate([self.X, np.zeros((extra, self.X.shape[1]), dtype=np.float32)])
+            self.active = np.concatenate([self.active, np.zeros(extra, dtype=bool)])
+
+def _pad(distances, indices, k):
+    if distances.shape[1] < k:
+        n_missing = k - distances.shape[1]
+        distances = np.hstack([distances, np.full((len(distances), n_missing), np.inf, dtype=distances.dtype)])
+        indices   = np.hstack([indices, np.full((len(indices), n_missing), -1, dtype=indices.dtype)])
+    indices[~np.isfinite(distances)] = -1
+    return distances, indices
+
+class ExactIndex(_Index):
+    '''
+    Exact kNN: queries are processed in blocks of block_size, every block is a single matrix multiply
+    against all the players followed by a partial selection (no full N x N matrix, no full sort).
+    '''
+    def __init__(self, embeddings, metric='euclidean', block_size=1024, active=None):
+        self.metric     = metric
+        self.X          = _prepare(embeddings, metric).copy()
+        self.X_sq_norms = (self.X * self.X).sum(axis=1)[None, :]
+        self.active     = np.ones(len(self.X), dtype=bool) if active is None else np.array(active, dtype=bool)
+        self.block_size = block_size
+
+    def __len__(self):
+        return int(self.active.sum())
+
+    def search(self, queries, k=5):
+        Q = _prepare(np.atleast_2d(queries), self.metric)
+        inactive = np.flatnonzero(~self.active)
+        distances = np.empty((len(Q), min(k, len(self.X))), dtype=np.float32)
+        indices   = np.empty((len(Q), min(k, len(self.X))), dtype=np.int64)
+        for start in range(0, len(Q), self.block_size):
+            block = slice(start, start + self.block_size)
+            block_distances = _distances(Q[block], self.X, self.X_sq_norms, self.metric)
+            block_distances[:, inactive] = np.inf
+            distances[block], indices[block] = _top_k(block_distances, k)
+        return _pad(distances, indices, k)
+
+    def upsert(self, row_ids, embeddings):
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        if len(row_ids) == 0:
+            return
+        self._grow(row_ids.max() + 1)
+        self.X[row_ids]      = _prepare(embeddings, self.metric)
+        self.active[row_ids] = True
+        self.X_sq_norms      = (self.X * self.X).sum(axis=1)[None, :]
+
+    def remove(self, row_ids):
+        self.active[np.asarray(row_ids, dtype=np.int64)] = False
+
+class IVFIndex(_Index):
+    '''
+    Approximate kNN with an inverted file: players are clustered with k-means into n_lists cells,
+    a query only scans the players of its n_probe closest cells (exact distances on those candidates).
+    Cells are stored as one permutation of the row ids plus offsets, so every cell is a contiguous slice.
+    Players added or changed after the build go to a small buffer scanned by every query
+    (rebuild the index when it gets large).
+    '''
+    def __init__(self, embeddings, metric='euclidean', n_lists=None, n_probe=16, n_iter=20, seed=0, active=None):
+        self.metric     = metric
+        self.X          = _prepare(embeddings, metric).copy()
+        self.active     = np.ones(len(self.X), dtype=bool) if active is None else np.array(active, dtype=bool)
+        self.n_lists    = min(n_lists or max(1, int(np.sqrt(len(self.X)))), len(self.X))
+        self.n_probe    = n_probe
+        self.centroids  = self._kmeans(n_iter, seed)
+
+        assignments  = self._assign(self.X)
+        self.order   = np.argsort(assignments, kind='stable')
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=self.n_lists))])
+        self.X_lists = self.X[self.order]
+        self.X_lists_sq_norms = (self.X_lists * self.X_lists).sum(axis=1)
+        # Rows whose cell entry is still up to date
+        self.in_lists = np.ones(len(self.X), dtype=bool)
+        self.buffer   = np.empty(0, dtype=np.int64)
+
+    def __len__(self):
+        return int(self.active.sum())
+
+    def _assign(self, X, block_size=65536):
+        # Closest centroid (squared distances, ||x||^2 is constant for every row and can be skipped)
+        centroids_sq_norms = (self.centroids * self.centroids).sum(axis=1)[None, :]
+        return np.concatenate([
+            (centroids_sq_norms - 2.0 * (X[start:start + block_size] @ self.centroids.T)).argmin(axis=1)
+            for start in range(0, len(X), block_size)
+        ])
+
+    def _kmeans(self, n_iter, seed, points_per_list=64):
+        # k-means is fitted on a sample of at most points_per_list players per cell
+        rng = np.random.default_rng(seed)
+        sample = self.X[rng.choice(len(self.X), min(len(self.X), points_per_list * self.n_lists), replace=False)]
+        self.centroids = sample[rng.choice(len(sample), self.n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            assignments = self._assign(sample)
+            counts = np.bincount(assignments, minlength=self.n_lists)
+            sums = np.stack([np.bincount(assignments, weights=column, minlength=self.n_lists) for column in sample.T], axis=1)
+            empty = counts == 0
+            self.centroids[~empty] = sums[~empty] / counts[~empty, None]
+            # Empty cells are re-seeded with random players
+            self.centroids[empty] = sample[rng.choice(len(sample), empty.sum(), replace=False)]
+            if self.metric == 'cosine':
+                self.centroids /= np.maximum(np.linalg.norm(self.centroids, axis=1, keepdims=True), 1e-12)
+        return self.centroids
+
+    def search(self, queries, k=5):
+        Q = _prepare(np.atleast_2d(queries), self.metric)
+        n_probe = min(self.n_probe, self.n_lists)
+        centroids_sq_norms = (self.centroids * self.centroids).sum(axis=1)[None, :]
+        probes = _top_k(centroids_sq_norms - 2.0 * (Q @ self.centroids.T), n_probe)[1]
+        buffer = self.buffer[self.active[self.buffer]]
+
+        distances = np.full((len(Q), k), np.inf, dtype=np.float32)
+        indices   = np.full((len(Q), k), -1, dtype=np.int64)
+        for i, cells in enumerate(probes):
+            positions = np.concatenate([np.arange(self.offsets[cell], self.offsets[cell + 1]) for cell in cells])
+            row_ids   = self.order[positions]
+            keep      = self.in_lists[row_ids] & self.active[row_ids]
+            positions, row_ids = positions[keep], row_ids[keep]
+            candidate_distances = _distances(Q[i:i + 1], self.X_lists[positions], self.X_lists_sq_norms[None, positions], self.metric)
+            if len(buffer):
+                X_buffer = self.X[buffer]
+                candidate_distances = np.hstack([candidate_distances, _distances(Q[i:i + 1], X_buffer, (X_buffer * X_buffer).sum(axis=1)[None, :], self.metric)])
+                row_ids = np.concatenate([row_ids, buffer])
+            if len(row_ids) == 0:
+                continue
+            top_distances, top = _top_k(candidate_distances, k)
+            distances[i, :top.shape[1]] = top_distances[0]
+            indices[i, :top.shape[1]]   = row_ids[top[0]]
+        return distances, indices
+
+    def upsert(self, row_ids, embeddings):
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        if len(row_ids) == 0:
+            return
+        self._grow(row_ids.max() + 1)
+        if len(self.in_lists) < len(self.X):
+            self.in_lists = np.concatenate([self.in_lists, np.zeros(len(self.X) - len(self.in_lists), dtype=bool)])
+        self.X[row_ids]        = _prepare(embeddings, self.metric)
+        self.active[row_ids]   = True
+        self.in_lists[row_ids] = False
+        self.buffer = np.union1d(self.buffer, row_ids)
+
+    def remove(self, row_ids):
+        self.active[np.asarray(row_ids, dtype=np.int64)] = False
+
+def build_index(embeddings, metric='euclidean', exact_max_size=EXACT_MAX_SIZE, **kwargs):
+    '''
+    ExactIndex for up to exact_max_size players, IVFIndex above.
+    '''
+    if len(embeddings) <= exact_max_size:
+        return ExactIndex(embeddings, metric=metric, **kwargs)
+    return IVFIndex(embeddings, metric=metric, **kwargs)
@@ -0,0 +1,205 @@
+#------------------------------------------------------------------------------------------------------------------
+# Libraries
+
+import json
+import os
+import pickle
+import time
+import numpy as np
+import torch
+
+#------------------------------------------------------------------------------------------------------------------
+# Global variables
+
+# Same settings as the 3D scatter of experiments.ipynb
+N_COMPONENTS = 3
+N_NEIGHBORS  = 10
+RANDOM_STATE = 1610
+
+REDUCER_FILE      = 'reducer.pkl'
+MAPPER_FILE       = 'mapper.pth'
+INFO_FILE         = 'projection.json'
+COORDINATES_FILE  = 'coordinates.npy'
+FINGERPRINTS_FILE = 'fingerprints.npy'
+
+#------------------------------------------------------------------------------------------------------------------
+# Parametric mapper
+
+class ProjectionMapper(torch.nn.Module):
+    '''
+    Small MLP trained to reproduce the fitted UMAP coordinates, used to place new embeddings in batches
+    without running UMAP.transform.
+    '''
+    def __init__(self, latent_dim, n_components=N_COMPONENTS, hidden_dim=64):
+        super(ProjectionMapper, self).__init__()
+        self.config = dict(latent_dim=latent_dim, n_components=n_components, hidden_dim=hidden_dim)
+        self.net = torch.nn.Sequential(
+            torch.nn.Linear(latent_dim, hidden_dim),
+            torch.nn.ReLU(),
+            torch.nn.Linear(hidden_dim, hidden_dim),
+            torch.nn.ReLU(),
+            torch.nn.Linear(hidden_dim, n_components),
+        )
+
+    def forward(self, x):
+        return self.net(x)
+
+def train_mapper(embeddings, coordinates, epochs=2000, lr=1e-2, seed=RANDOM_STATE):
+    '''
+    Fits a ProjectionMapper on (embedding, coordinates) pairs (full batch, inputs and targets standardized).
+    Returns the mapper, the normalization statistics and the RMSE relative to the spread of the coordinates.
+    '''
+    torch.manual_seed(seed)
+    X = torch.as_tensor(np.asarray(embeddings, dtype=np.float32))
+    Y = torch.as_tensor(np.asarray(coordinates, dtype=np.float32))
+    stats = {'x_mean' : X.mean(dim=0), 'x_std' : X.std(dim=0), 'y_mean' : Y.mean(dim=0), 'y_std' : Y.std(dim=0)}
+    X = (X - stats['x_mean']) / stats['x_std']
+    Y = (Y - stats['y_mean']) / stats['y_std']
+
+    mapper    = ProjectionMapper(X.shape[1], Y.shape[1])
+    optimizer = torch.optim.Adam(mapper.parameters(), lr=lr)
+    scheduler = torch.optim.lr_scheduler.CosineAnnealingLR(optimizer, epochs)
+    for _ in range(epochs):
+        optimizer.zero_grad(set_to_none=True)
+        loss = torch.nn.functional.mse_loss(mapper(X), Y)
+        loss.backward()
+        optimizer.step()
+        scheduler.step()
+    mapper.eval()
+    return mapper, stats, float(loss.detach().sqrt())
+
+#------------------------------------------------------------------------------------------------------------------
+# Projection
+
+class Projection:
+    '''
+    UMAP projection of the latent space, fitted once and saved to a directory (next to the model bundle):
+    - reducer.pkl  : the fitted UMAP reducer (exact out-of-sample placement with UMAP.transform)
+    - mapper.pth   : a parametric mapper trained on the fitted coordinates (fast batched placement)
+    - projection.json with the settings and the mapper fit error
+    '''
+    def __init__(self, reducer, mapper, stats, info):
+        self.reducer = reducer
+        self.mapper  = mapper
+        self.stats   = stats
+        self.info    = info
+
+    @classmethod
+    def fit(cls, embeddings, n_components=N_COMPONENTS, n_neighbors=N_NEIGHBORS, random_state=RANDOM_STATE, mapper_epochs=2000):
+        '''
+        Fits UMAP on the embeddings and the mapper on the result. Returns the projection and the fitted coordinates.
+        '''
+        # umap is imported here only: importing it takes several seconds (numba), which placing new players doesn't need
+        from umap.umap_ import UMAP
+        start = time.perf_counter()
+        reducer = UMAP(n_components=n_components, n_neighbors=n_neighbors, random_state=random_state)
+        coordinates = reducer.fit_transform(np.asarray(embeddings, dtype=np.float32))
+        umap_seconds = time.perf_counter() - start
+
+        mapper, stats, rmse = train_mapper(embeddings, coordinates, epochs=mapper_epochs, seed=random_state)
+        info = {
+            'n_components'      : n_components,
+            'n_neighbors'       : n_neighbors,
+            'random_state'      : random_state,
+            'n_fitted'          : int(len(coordinates)),
+            'umap_seconds'      : umap_seconds,
+            'mapper_rmse'       : rmse,
+        }
+        return cls(reducer, mapper, stats, info), coordinates.astype(np.float32)
+
+    @torch.no_grad()
+    def transform(self, embeddings, batch_size=4096, method='mapper'):
+        '''
+        Coordinates of new embeddings, in batches: 'mapper' (fast, approximate) or 'umap' (UMAP.transform).
+        '''
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        coordinates = np.empty((len(embeddings), self.info['n_components']), dtype=np.float32)
+        for start in range(0, len(embeddings), batch_size):
+            batch = embeddings[start:start + batch_size]
+            if method == 'umap':
+                coordinates[start:start + batch_size] = self.reducer.transform(batch)
+            else:
+                X = (torch.as_tensor(batch) - self.stats['x_mean']) / self.stats['x_std']
+                coordinates[start:start + batch_size] = (self.mapper(X) * self.stats['y_std'] + self.stats['y_mean']).numpy()
+        return coordinates
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, REDUCER_FILE), 'wb') as f:
+            pickle.dump(self.reducer, f)
+        torch.save({'config' : self.mapper.config, 'state_dict' : self.mapper.state_dict(), 'stats' : self.stats},
+                   os.path.join(directory, MAPPER_FILE))
+        with open(os.path.join(directory, INFO_FILE), 'w') as f:
+            json.dump(self.info, f, indent=2)
+
+    @classmethod
+    def load(cls, directory, load_reducer=True):
+        '''
+        Loads a saved projection (load_reducer=False skips unpickling UMAP when only the mapper is needed).
+        '''
+        with open(os.path.join(directory, INFO_FILE)) as f:
+            info = json.load(f)
+        saved  = torch.load(os.path.join(directory, MAPPER_FILE), map_location='cpu', weights_only=True)
+        mapper = ProjectionMapper(**saved['config'])
+        mapper.load_state_dict(saved['state_dict'])
+        mapper.eval()
+        reducer = None
+        if load_reducer:
+            with open(os.path.join(directory, REDUCER_FILE), 'rb') as f:
+                reducer = pickle.load(f)
+        return cls(reducer, mapper, saved['stats'], info)
+
+#------------------------------------------------------------------------------------------------------------------
+# Cached coordinates of an embedding store
+
+def project_store(store, directory, refit=False, method='mapper', verbose=True, **fit_kwargs):
+    '''
+    Coordinates of every row of an EmbeddingStore (NaN for deleted rows), cached in directory:
+    the projection is fitted only once (or with refit=True), later calls only project the rows that are
+    new or changed since the last call (detected with the store fingerprints).
+    The projection is fitted again when the store was exported with another model (its model_fingerprint,
+    see export_embeddings, differs from the one saved in projection.json): the latent space has changed.
+    '''
+    coordinates_path  = os.path.join(directory, COORDINATES_FILE)
+    fingerprints_path = os.path.join(directory, FINGERPRINTS_FILE)
+    active       = np.asarray(store.active)
+    fingerprints = np.asarray(store.fingerprints) if store.fingerprints is not None else np.zeros(len(store), dtype=np.uint64)
+
+    model = store.info.get('model_fingerprint')
+
+    fit = refit or not os.path.exists(os.path.join(directory, INFO_FILE))
+    if not fit:
+        projection = Projection.load(directory, load_reducer=method == 'umap')
+        if projection.info.get('model_fingerprint') != model:
+            fit = True
+            if verbose:
+                print("The embeddings were exported with another model: fitting the projection again")
+    if fit:
+        projection, fitted = Projection.fit(store.mu[active], **fit_kwargs)
+        projection.info['model_fingerprint'] = model
+        projection.save(directory)
+        coordinates = np.full((len(store), projection.info['n_components']), np.nan, dtype=np.float32)
+        coordinates[active] = fitted
+        todo = np.empty(0, dtype=np.int64)
+        if verbose:
+            print(f"Fitted UMAP on {active.sum()} embeddings in {projection.info['umap_seconds']:.1f}s "
+                  f"(mapper relative RMSE {projection.info['mapper_rmse']:.3f})")
+    else:
+        cached     = np.load(coordinates_path)
+        cached_fingerprints = np.load(fingerprints_path)
+        coordinates = np.full((len(store), projection.info['n_components']), np.nan, dtype=np.float32)
+        n_cached = min(len(cached), len(store))
+        coordinates[:n_cached] = cached[:n_cached]
+        stale = np.ones(len(store), dtype=bool)
+        stale[:n_cached] = cached_fingerprints[:n_cached] != fingerprints[:n_cached]
+        todo = np.flatnonzero(active & (stale | np.isnan(coordinates).any(axis=1)))
+
+    if len(todo):
+        coordinates[todo] = projection.transform(store.mu[todo], method=method)
+    coordinates[~active] = np.nan
+    if verbose and not fit:
+        print(f"Projected {len(todo)} new or changed embeddings")
+
+    np.save(coordinates_path, coordinates)
+    np.save(fingerprints_path, fingerprints)
+    return coordinates
@@ -0,0 +1,112 @@
+#------------------------------------------------------------------------------------------------------------------
+# Libraries
+
+import time
+import numpy as np
+import pandas as pd
+
+#------------------------------------------------------------------------------------------------------------------
+# Global variables
+
+# Columns identifying a player row across dataset refreshes
+KEY_COLUMNS = ['Player', 'Born', 'Squad', 'League']
+
+#------------------------------------------------------------------------------------------------------------------
+# Change detection
+
+def row_keys(data):
+    '''
+    uint64 hash of the KEY_COLUMNS of every row.
+    '''
+    keys = pd.util.hash_pandas_object(data[KEY_COLUMNS], index=False).to_numpy(dtype=np.uint64)
+    duplicated = pd.Series(keys).duplicated(keep=False).to_numpy()
+    if duplicated.any():
+        raise ValueError(f"Duplicated player keys {KEY_COLUMNS}: {data.loc[duplicated, KEY_COLUMNS].head().to_dict('records')}")
+    return keys
+
+def canonical_rows(data):
+    '''
+    data with the numeric columns as float32 and the other ones as str: the .parquet (float32 features,
+    categorical labels) and .csv (float64, object) copies written by build_dataset.py become identical.
+    '''
+    return pd.DataFrame({column : data[column].astype(np.float32) if pd.api.types.is_numeric_dtype(data[column]) else data[column].astype(str)
+                         for column in data.columns})
+
+def row_fingerprints(data):
+    '''
+    uint64 hash of every row (all columns: features and metadata), computed on canonical_rows(data)
+    so that it does not depend on the file format the dataset was read from.
+    '''
+    return pd.util.hash_pandas_object(canonical_rows(data), index=False).to_numpy(dtype=np.uint64)
+
+def diff_rows(store, data):
+    '''
+    Compares the active rows of the store with the rows of data. Returns
+    - deleted  : row ids of the store whose key is not in data anymore
+    - updated  : (row ids, positions in data) of the rows whose fingerprint changed
+    - inserted : positions in data of the new keys
+    - keys, fingerprints of data
+    '''
+    if store.keys is None:
+        raise ValueError("This store has no row keys, export it again to enable incremental refreshes")
+    keys, fingerprints = row_keys(data), row_fingerprints(data)
+    active_ids  = np.flatnonzero(store.active)
+    store_keys  = pd.Index(np.asarray(store.keys)[active_ids])
+    matches     = store_keys.get_indexer(keys)
+
+    existing  = np.flatnonzero(matches >= 0)
+    row_ids   = active_ids[matches[existing]]
+    changed   = np.asarray(store.fingerprints)[row_ids] != fingerprints[existing]
+    deleted   = np.setdiff1d(active_ids, row_ids, assume_unique=True)
+    return {
+        'deleted'      : deleted,
+        'updated'      : (row_ids[changed], existing[changed]),
+        'inserted'     : np.flatnonzero(matches < 0),
+        'keys'         : keys,
+        'fingerprints' : fingerprints,
+    }
+
+#------------------------------------------------------------------------------------------------------------------
+# Refresh
+
+def refresh_embeddings(store, data, bundle, indexes=(), batch_size=4096, verbose=True):
+    '''
+    Incremental refresh of a store opened with mode='r+': only the new or changed rows of data are
+    encoded with the model bundle, then deletes, updates and inserts are applied in place to the store
+    and to the given kNN indexes (ExactIndex / IVFIndex built on the store row ids).
+    Returns a report with the number of rows per kind of change and the elapsed time.
+    '''
+    start   = time.perf_counter()
+    changes = diff_rows(store, data)
+    updated_ids, updated_positions = changes['updated']
+    positions = np.concatenate([updated_positions, changes['inserted']]).astype(np.int64)
+    row_ids   = np.concatenate([updated_ids, np.full(len(changes['inserted']), -1)]).astype(np.int64)
+
+    store.delete(changes['deleted'])
+    for index in indexes:
+        index.remove(changes['deleted'])
+
+    if len(positions):
+        rows = data.iloc[positions]
+        mu, logvar = [], []
+        for batch_start in range(0, len(rows), batch_size):
+            batch_mu, batch_logvar = bundle.encode(rows.iloc[batch_start:batch_start + batch_size])
+            mu.append(batch_mu.cpu().numpy())
+            logvar.append(batch_logvar.cpu().numpy())
+        mu, logvar = np.concatenate(mu), np.concatenate(logvar)
+        row_ids = store.upsert(row_ids, mu, logvar, rows, changes['keys'][positions], changes['fingerprints'][positions])
+        for index in indexes:
+            index.upsert(row_ids, mu)
+    store.flush()
+
+    report = {
+        'deleted'   : len(changes['deleted']),
+        'updated'   : len(updated_ids),
+        'inserted'  : len(changes['inserted']),
+        'unchanged' : len(data) - len(positions),
+        'seconds'   : time.perf_counter() - start,
+    }
+    if verbose:
+        print(f"Refresh: {report['inserted']} inserted, {report['updated']} updated, {report['deleted']} deleted, "
+              f"{report['unchanged']} unchanged in {report['seconds']:.3f}s")
+    return report
@@ -0,0 +1,293 @@
+#------------------------------------------------------------------------------------------------------------------
+# Libraries
+
+import json
+import os
+import numpy as np
+
+#------------------------------------------------------------------------------------------------------------------
+# Global variables
+
+STORE_FILE    = 'store.json'
+MU_FILE       = 'mu.npy'
+LOGVAR_FILE   = 'logvar.npy'
+METADATA_FILE = 'metadata.npy'
+
+# Row-level change detection (see scouting/refresh.py)
+KEYS_FILE         = 'keys.npy'
+FINGERPRINTS_FILE = 'fingerprints.npy'
+ACTIVE_FILE       = 'active.npy'
+
+# Free slots are added in chunks when the store grows (fraction of the current size)
+GROWTH_FACTOR = 0.5
+
+# Metadata kept next to the embeddings (training dataset column --> store field)
+METADATA_COLUMNS = {
+    'Player'      : 'Player',
+    'Squad'       : 'Squad',
+    'League'      : 'League',
+    'Pos_tm'      : 'Pos',
+    'Age'         : 'Age',
+    'MarketValue' : 'MarketValue',
+}
+
+# Low-cardinality fields stored as int16 codes (categories are listed in store.json)
+CATEGORICAL_FIELDS = ['Squad', 'League', 'Pos']
+
+#------------------------------------------------------------------------------------------------------------------
+# Helpers
+
+def parse_market_value(value):
+    '''
+    Transfermarkt market value ("€15.00m", "€500k", "-") in euros, NaN if missing.
+    '''
+    if not isinstance(value, str):
+        return float('nan')
+    value = value.strip().lstrip('€').replace(',', '')
+    multiplier = {'k' : 1e3, 'm' : 1e6, 'bn' : 1e9}
+    for suffix, factor in sorted(multiplier.items(), key=lambda item: -len(item[0])):
+        if value.endswith(suffix):
+            value, scale = value[:-len(suffix)], factor
+            break
+    else:
+        scale = 1.0
+    try:
+        return float(value) * scale
+    except ValueError:
+        return float('nan')
+
+#------------------------------------------------------------------------------------------------------------------
+# Store
+
+class EmbeddingStore:
+    '''
+    Player embeddings saved as memory-mapped .npy arrays, so that opening a store only maps the files:
+    - mu.npy / logvar.npy : (n_slots, latent_dim) float32 or float16
+    - metadata.npy        : structured array keyed by row id (player, squad, league, position, age,
+                            market value in euros); categorical fields are int16 codes
+    - keys.npy            : uint64 hash identifying the player of every row
+    - fingerprints.npy    : uint64 hash of the dataset row the embedding was computed from
+    - active.npy          : False for deleted rows, whose slots are reused by later inserts
+    - store.json          : shapes, dtype, categories and where the embeddings come from
+    A freshly exported store has row i = i-th row of the dataset; row ids stay stable through refreshes.
+    Open with mode='r+' to update the store in place (upsert / delete).
+    '''
+    def __init__(self, directory, mode='r'):
+        self.directory = directory
+        self.mode      = mode
+        with open(os.path.join(directory, STORE_FILE)) as f:
+            self.info = json.load(f)
+        self.categories = self.info['categories']
+        self._map()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _map(self):
+        self.mu       = np.load(self._path(MU_FILE), mmap_mode=self.mode)
+        self.logvar   = np.load(self._path(LOGVAR_FILE), mmap_mode=self.mode)
+        self.metadata = np.load(self._path(METADATA_FILE), mmap_mode=self.mode)
+        if os.path.exists(self._path(KEYS_FILE)):
+            self.keys         = np.load(self._path(KEYS_FILE), mmap_mode=self.mode)
+            self.fingerprints = np.load(self._path(FINGERPRINTS_FILE), mmap_mode=self.mode)
+            self.active       = np.load(self._path(ACTIVE_FILE), mmap_mode=self.mode)
+        else:
+            # Store written before change detection: every row is active, no keys
+            self.keys, self.fingerprints = None, None
+            self.active = np.ones(len(self.mu), dtype=bool)
+
+    def __len__(self):
+        return self.mu.shape[0]
+
+    @property
+    def n_active(self):
+        return int(np.count_nonzero(self.active))
+
+    @property
+    def latent_dim(self):
+        return self.mu.shape[1]
+
+    def field(self, name, row_ids=None):
+        '''
+        Values of a metadata field (of all the rows or of the given row ids), with categorical codes decoded.
+        '''
+        values = self.metadata[name] if row_ids is None else self.metadata[name][row_ids]
+        if name in self.categories:
+            return np.asarray(self.categories[name], dtype=object)[values]
+        return np.asarray(values)
+
+    def find(self, player):
+        '''
+        Row ids of the players with the given name.
+        '''
+        return np.flatnonzero((self.metadata['Player'] == player) & self.active)
+
+    def record(self, row_id):
+        return {name : self.field(name)[row_id] for name in self.metadata.dtype.names}
+
+    def to_frame(self, row_ids=None):
+        '''
+        Metadata of the active rows as a pandas DataFrame indexed by row_id (pandas is only imported here).
+        With row_ids only those rows are decoded, in the given order.
+        '''
+        import pandas as pd
+        if row_ids is not None:
+            row_ids = np.asarray(row_ids, dtype=np.int64)
+            return pd.DataFrame({name : self.field(name, row_ids) for name in self.metadata.dtype.names}).set_index('row_id')
+        frame = pd.DataFrame({name : self.field(name) for name in self.metadata.dtype.names}).set_index('row_id')
+        return frame[np.asarray(self.active)]
+
+    #--------------------------------------------------------------------------------------------------------------
+    # Writing
+
+    @staticmethod
+    def _metadata_records(metadata_df, categories, row_ids):
+        '''
+        Structured metadata array for the rows of metadata_df (new categories are appended to categories).
+        '''
+        columns = {field : metadata_df[column].to_numpy() for column, field in METADATA_COLUMNS.items()}
+        for field in CATEGORICAL_FIELDS:
+            labels = categories.setdefault(field, [])
+            codes  = {label : code for code, label in enumerate(labels)}
+            values = columns[field].astype(str)
+            for value in dict.fromkeys(values):
+                if value not in codes:
+                    codes[value] = len(labels)
+                    labels.append(value)
+            columns[field] = np.array([codes[value] for value in values], dtype=np.int16)
+        players = columns['Player'].astype(str)
+
+        records = np.empty(len(metadata_df), dtype=[
+            ('row_id'      , np.int32),
+            ('Player'      , f'U{max(1, max((len(player) for player in players), default=1))}'),
+            ('Squad'       , np.int16),
+            ('League'      , np.int16),
+            ('Pos'         , np.int16),
+            ('Age'         , np.float32),
+            ('MarketValue' , np.float32),
+        ])
+        records['row_id']      = row_ids
+        records['Player']      = players
+        for field in CATEGORICAL_FIELDS:
+            records[field] = columns[field]
+        records['Age']         = columns['Age'].astype(np.float32)
+        records['MarketValue'] = np.array([parse_market_value(value) for value in columns['MarketValue']], dtype=np.float32)
+        return records
+
+    def _write_info(self):
+        self.info['n_players']  = self.n_active
+        self.info['categories'] = self.categories
+        with open(self._path(STORE_FILE), 'w') as f:
+            json.dump(self.info, f, indent=2, ensure_ascii=False)
+
+    @staticmethod
+    def write(directory, mu, logvar, metadata_df, dtype='float32', info=None, keys=None, fingerprints=None):
+        '''
+        Writes a store from the mu/logvar arrays and the training dataset rows they come from
+        (metadata_df needs the METADATA_COLUMNS). keys / fingerprints enable incremental refreshes.
+        Returns the opened store.
+        '''
+        os.makedirs(directory, exist_ok=True)
+        n_rows = len(metadata_df)
+        arrays = {
+            MU_FILE           : np.asarray(mu, dtype=dtype),
+            LOGVAR_FILE       : np.asarray(logvar, dtype=dtype),
+            KEYS_FILE         : np.zeros(n_rows, dtype=np.uint64) if keys is None else np.asarray(keys, dtype=np.uint64),
+            FINGERPRINTS_FILE : np.zeros(n_rows, dtype=np.uint64) if fingerprints is None else np.asarray(fingerprints, dtype=np.uint64),
+            ACTIVE_FILE       : np.ones(n_rows, dtype=bool),
+        }
+        for name, values in arrays.items():
+            array = np.lib.format.open_memmap(os.path.join(directory, name), mode='w+', dtype=values.dtype, shape=values.shape)
+            array[:] = values
+            array.flush()
+            del array
+
+        categories = {}
+        np.save(os.path.join(directory, METADATA_FILE), EmbeddingStore._metadata_records(metadata_df, categories, np.arange(n_rows)))
+
+        with open(os.path.join(directory, STORE_FILE), 'w') as f:
+            json.dump({
+                'n_players'  : int(n_rows),
+                'latent_dim' : int(np.shape(mu)[1]),
+                'dtype'      : np.dtype(dtype).name,
+                'categories' : categories,
+                **(info or {}),
+            }, f, indent=2, ensure_ascii=False)
+        return EmbeddingStore(directory)
+
+    #--------------------------------------------------------------------------------------------------------------
+    # In place updates (mode='r+')
+
+    def _resize(self, capacity, metadata_dtype=None):
+        '''
+        Rewrites the arrays with capacity slots (new slots inactive) and/or a wider metadata dtype.
+        '''
+        n_rows = len(self)
+        arrays = {
+            MU_FILE           : self.mu,
+            LOGVAR_FILE       : self.logvar,
+            METADATA_FILE     : self.metadata,
+            KEYS_FILE         : self.keys,
+            FINGERPRINTS_FILE : self.fingerprints,
+            ACTIVE_FILE       : self.active,
+        }
+        for name, old in arrays.items():
+            dtype = metadata_dtype if name == METADATA_FILE and metadata_dtype is not None else old.dtype
+            new = np.lib.format.open_memmap(self._path(name + '.tmp'), mode='w+', dtype=dtype, shape=(capacity,) + old.shape[1:])
+            if name == METADATA_FILE:
+                new[:n_rows] = old.astype(dtype)
+                new['row_id'][n_rows:] = np.arange(n_rows, capacity)
+            else:
+                new[:n_rows] = old
+                new[n_rows:] = 0
+            new.flush()
+            del new
+        del arrays
+        self.mu = self.logvar = self.metadata = self.keys = self.fingerprints = self.active = None
+        for name in [MU_FILE, LOGVAR_FILE, METADATA_FILE, KEYS_FILE, FINGERPRINTS_FILE, ACTIVE_FILE]:
+            os.replace(self._path(name + '.tmp'), self._path(name))
+        self._map()
+
+    def delete(self, row_ids):
+        '''
+        Marks rows as deleted (their slots are reused by later inserts).
+        '''
+        self.active[np.asarray(row_ids, dtype=np.int64)] = False
+
+    def upsert(self, row_ids, mu, logvar, metadata_df, keys, fingerprints):
+        '''
+        Writes the given rows in place: row_ids >= 0 are updated, row_ids == -1 are inserted into free
+        slots (the store grows by GROWTH_FACTOR when none are left). Returns the row ids written.
+        '''
+        if self.keys is None:
+            raise ValueError("This store has no row keys, export it again to enable in place updates")
+        row_ids = np.array(row_ids, dtype=np.int64)
+        inserts = np.flatnonzero(row_ids < 0)
+        if len(inserts):
+            free = np.flatnonzero(~np.asarray(self.active))
+            if len(free) < len(inserts):
+                self._resize(len(self) + max(len(inserts) - len(free), int(GROWTH_FACTOR * len(self)) + 1))
+                free = np.flatnonzero(~np.asarray(self.active))
+            row_ids[inserts] = free[:len(inserts)]
+
+        records = self._metadata_records(metadata_df, self.categories, row_ids)
+        if records.dtype['Player'].itemsize > self.metadata.dtype['Player'].itemsize:
+            self._resize(len(self), np.dtype([(name, records.dtype[name] if name == 'Player' else self.metadata.dtype[name])
+                                               for name in self.metadata.dtype.names]))
+
+        self.mu[row_ids]           = mu
+        self.logvar[row_ids]       = logvar
+        self.metadata[row_ids]     = records.astype(self.metadata.dtype)
+        self.keys[row_ids]         = keys
+        self.fingerprints[row_ids] = fingerprints
+        self.active[row_ids]       = True
+        return row_ids
+
+    def flush(self):
+        '''
+        Flushes the memory maps and store.json after in place updates.
+        '''
+        for array in (self.mu, self.logvar, self.metadata, self.keys, self.fingerprints, self.active):
+            if isinstance(array, np.memmap):
+                array.flush()
+        self._write_info()
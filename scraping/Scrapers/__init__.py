@@ -1,2 +1,4 @@
 from .fbref_scraper import FbrefPlayerScraper
-from .tm_scraper import TransfermarktPlayerScraper
\ No newline at end of file
+from .tm_scraper import TransfermarktPlayerScraper
+from .jobs import ScrapeManifest, TransfermarktJobRunner
+from .records import ColumnarRecordBuilder, cast_frame
@@ -0,0 +1,119 @@
+#------------------------------------------------------------------------------------------------------------------
+# Libraries
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+#------------------------------------------------------------------------------------------------------------------
+# Global variables
+
+DEFAULT_MAX_SIZE = 2 * 1024**3  # 2 GB of compressed bodies
+
+#------------------------------------------------------------------------------------------------------------------
+# Cache
+
+class ResponseCache:
+    '''
+    Content-addressed on-disk cache for HTTP bodies.
+    - every body is zlib-compressed and stored under cache_dir/<aa>/<sha256(url)>.z
+    - a small sqlite index keeps url, fetch time, last access time and size of each entry
+    - entries older than the ttl requested by the caller are treated as missing
+    - when the total size exceeds max_size the least recently used entries are evicted
+    The cache is safe to share among the threads of a PooledFetcher.
+    '''
+
+    def __init__(self, cache_dir, max_size=DEFAULT_MAX_SIZE):
+        self.cache_dir = cache_dir
+        self.max_size  = max_size
+        self.lock      = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.db = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite'), check_same_thread=False)
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'key TEXT PRIMARY KEY, url TEXT, fetched_at REAL, accessed_at REAL, size INTEGER)'
+        )
+        self.db.commit()
+        self.total_size = self.db.execute('SELECT COALESCE(SUM(size),0) FROM entries').fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    #------------------------------------------------------------------------------------------------------------------
+
+    @staticmethod
+    def key(url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def __path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + '.z')
+
+    def get(self, url, ttl=None):
+        '''
+        Returns the cached body of url (bytes), or None if missing or older than ttl seconds.
+        '''
+        key = self.key(url)
+        now = time.time()
+        with self.lock:
+            row = self.db.execute('SELECT fetched_at FROM entries WHERE key=?', (key,)).fetchone()
+            if row is None or (ttl is not None and now - row[0] > ttl):
+                return None
+            try:
+                with open(self.__path(key), 'rb') as f:
+                    body = zlib.decompress(f.read())
+            except (OSError, zlib.error):
+                self.__delete(key)
+                self.db.commit()
+                return None
+            self.db.execute('UPDATE entries SET accessed_at=? WHERE key=?', (now, key))
+            self.db.commit()
+        return body
+
+    def put(self, url, body):
+        '''
+        Stores body (bytes) for url, then evicts least recently used entries if needed.
+        '''
+        key  = self.key(url)
+        path = self.__path(key)
+        data = zlib.compress(body, 6)
+        now  = time.time()
+        with self.lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+            self.__delete_row(key)
+            self.db.execute('INSERT INTO entries VALUES (?,?,?,?,?)', (key, url, now, now, len(data)))
+            self.total_size += len(data)
+            self.__evict()
+            self.db.commit()
+
+    #------------------------------------------------------------------------------------------------------------------
+
+    def __delete_row(self, key):
+        row = self.db.execute('SELECT size FROM entries WHERE key=?', (key,)).fetchone()
+        if row is not None:
+            self.db.execute('DELETE FROM entries WHERE key=?', (key,))
+            self.total_size -= row[0]
+
+    def __delete(self, key):
+        self.__delete_row(key)
+        try:
+            os.remove(self.__path(key))
+        except OSError:
+            pass
+
+    def __evict(self):
+        if self.total_size <= self.max_size:
+            return
+        for (key,) in self.db.execute('SELECT key FROM entries ORDER BY accessed_at').fetchall():
+            self.__delete(key)
+            if self.total_size <= self.max_size:
+                break
@@ -8,11 +8,15 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Comment
 import pandas as pd
 from io import StringIO 
-import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
+from .cache import ResponseCache, DEFAULT_MAX_SIZE
+from .http_client import PooledFetcher, TokenBucket
 
 #------------------------------------------------------------------------------------------------------------------
 # Global variables
@@ -57,6 +61,10 @@ FBREF_LEAGUES = {
     'Campeonato Brasileiro Série A' : {'fbref_league_id' : 24, 'fbref_league_name' : 'Campeonato-Brasileiro-Serie-A'},
 }
 
+FBREF_CACHE_TTL           = 24 * 3600 # stat tables change after every matchday
+FBREF_REQUESTS_PER_SECOND = 10 / 60   # FBref allows roughly 10 requests per minute
+FBREF_MERGE_KEYS          = ['Player', 'Nation', 'Pos', 'Squad','League','Age', 'Born', '90s']
+
 #------------------------------------------------------------------------------------------------------------------
 # Scraper
 
@@ -64,21 +72,100 @@ class FbrefPlayerScraper:
     
     #------------------------------------------------------------------------------------------------------------------
     
-    def __init__(self):
+    def __init__(self,n_workers=1,static=False,requests_per_second=FBREF_REQUESTS_PER_SECOND,cache_dir=None,cache_size=DEFAULT_MAX_SIZE):
+        '''
+        - n_workers: number of (league, stat_type) tables scraped concurrently. In browser mode this is
+          the size of the pool of headless Chrome drivers (started lazily, only when needed).
+        - static: if True, tables are read from the static HTML (FBref ships them inside HTML comments)
+          with plain HTTP requests, so no browser is started at all.
+        - requests_per_second: politeness limit shared by all the workers (token bucket, no fixed sleeps).
+        - cache_dir, cache_size: if cache_dir is set, pages are cached on disk for FBREF_CACHE_TTL seconds
+          and served from there on subsequent runs (no network round trip).
+        '''
+        self.n_workers = max(1, n_workers)
+        self.static    = static
+        self.bucket    = TokenBucket(rate=requests_per_second)
+        self.cache     = None if cache_dir is None else ResponseCache(cache_dir,cache_size)
+        
         self.chrome_options = Options()
         self.chrome_options.add_argument("--headless") 
         self.chrome_options.add_argument("--disable-gpu")
         self.chrome_options.add_argument("--no-sandbox")
         self.chrome_options.add_argument("--disable-dev-shm-usage")
-        self.driver = webdriver.Chrome(options=self.chrome_options)
+        self.drivers      = []
+        self.idle_drivers = queue.Queue()
+        self.drivers_lock = threading.Lock()
+        
+        self.fetcher = PooledFetcher(
+            headers     = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/47.0.2526.106 Safari/537.36'},
+            max_workers = self.n_workers,
+        )
     
     def __enter__(self):
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.driver.quit()
+        self.__close_drivers()
+        self.fetcher.close()
+        if self.cache is not None:
+            self.cache.close()
 
 
+    #------------------------------------------------------------------------------------------------------------------
+    
+    def __acquire_driver(self):
+        '''
+        Returns an idle driver, starting a new one if the pool is not full yet.
+        '''
+        with self.drivers_lock:
+            if self.idle_drivers.empty() and len(self.drivers) < self.n_workers:
+                driver = webdriver.Chrome(options=self.chrome_options)
+                self.drivers.append(driver)
+                return driver
+        return self.idle_drivers.get()
+    
+    def __close_drivers(self):
+        '''
+        Quits every driver of the pool (pages still loading fail right away), new ones are started on demand.
+        '''
+        with self.drivers_lock:
+            drivers, self.drivers = self.drivers, []
+            self.idle_drivers = queue.Queue()
+        for driver in drivers:
+            driver.quit()
+    
+    def __get_rendered_page(self,url,fbref_table_id):
+        driver = self.__acquire_driver()
+        try:
+            driver.get(url)
+            WebDriverWait(driver, 30).until(
+                EC.presence_of_element_located((By.ID, fbref_table_id))
+            )
+            return driver.page_source
+        except TimeoutException:
+            print(f"⏳Timeout: Table with ID '{fbref_table_id}' not found.")
+            return None
+        finally:
+            with self.drivers_lock:
+                if driver in self.drivers:
+                    self.idle_drivers.put(driver)
+    
+    def __get_page_source(self,url,fbref_table_id):
+        
+        cached_page = self.cache.get(url,FBREF_CACHE_TTL) if self.cache is not None else None
+        if cached_page is not None:
+            return cached_page.decode('utf-8')
+        
+        self.bucket.acquire()
+        if self.static:
+            page_source = self.fetcher.get(url).text
+        else:
+            page_source = self.__get_rendered_page(url,fbref_table_id)
+        
+        if page_source is not None and self.cache is not None:
+            self.cache.put(url,page_source.encode('utf-8'))
+        return page_source
+    
     #------------------------------------------------------------------------------------------------------------------
               
     def __scrape_table(self,league,season,stat_type):
@@ -90,25 +177,23 @@ class FbrefPlayerScraper:
         
         url = f"https://fbref.com/en/comps/{fbref_league_id}/{season}/{fbref_stat_type}/{season}-{fbref_league_name}-Stats"
         
-        
-        self.driver.get(url)
-        
-        try:
-            WebDriverWait(self.driver, 30).until(
-                EC.presence_of_element_located((By.ID, fbref_table_id))
-            )
-        except TimeoutException:
-            print(f"⏳Timeout: Table with ID '{fbref_table_id}' not found.")
+        page_source = self.__get_page_source(url,fbref_table_id)
+        if page_source is None:
             return None
-        
-        # Extract page source
-        page_source = self.driver.page_source
 
         # Use BeautifulSoup to parse the page source
         soup = BeautifulSoup(page_source, 'html.parser')
 
-        # Locate the table by ID
+        # Locate the table by ID (in the static HTML the table is commented out)
         table = soup.find('table', {'id': fbref_table_id})
+        if table is None:
+            for comment in soup.find_all(string=lambda text: isinstance(text, Comment) and fbref_table_id in text):
+                table = BeautifulSoup(comment, 'html.parser').find('table', {'id': fbref_table_id})
+                if table is not None:
+                    break
+        if table is None:
+            print(f"❌Table with ID '{fbref_table_id}' not found in {url}.")
+            return None
 
         # Use StringIO to wrap the HTML string
         html_string = str(table)
@@ -148,16 +233,39 @@ class FbrefPlayerScraper:
             
     #------------------------------------------------------------------------------------------------------------------
     
-    def get_players_report(self,league=None,season=None):
-        df_list = []
-        for stat_type in tqdm(FBREF_STAT_TYPE.keys(),desc=f'Scraping stats for League: {league} (Season: {season})'):
-            df_list.append(self.get_players_stats(league=league,season=season,stat_type=stat_type))
-            time.sleep(5) # sleep for 5 seconds to avoid being blocked by the website
-            
-        left_df = df_list[0]
-        for right_df in df_list[1:]:
-            left_df = pd.merge(left_df,right_df,on=['Player', 'Nation', 'Pos', 'Squad','League','Age', 'Born', '90s'],how='inner')
+    def get_players_reports(self,leagues,season=None):
+        '''
+        Spreads all the (league, stat_type) jobs across the pool of workers and yields
+        (league, report) pairs as soon as all the stat tables of a league have arrived.
+        On the first failing job the pending jobs are cancelled and the drivers shut down before raising.
+        '''
+        for league in leagues:
+            if league not in FBREF_LEAGUES.keys():
+                raise ValueError(f"League {league} not found, please select one among: {list(FBREF_LEAGUES.keys())}")
         
-        return left_df
+        tables = {league : {} for league in leagues}
+        with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+            futures = {
+                executor.submit(self.get_players_stats,league=league,season=season,stat_type=stat_type) : (league,stat_type)
+                for league in leagues for stat_type in FBREF_STAT_TYPE.keys()
+            }
+            try:
+                for future in tqdm(as_completed(futures),total=len(futures),desc=f'Scraping stats (Season: {season})'):
+                    league,stat_type = futures[future]
+                    tables[league][stat_type] = future.result()
+                    if len(tables[league]) == len(FBREF_STAT_TYPE):
+                        df_list = [tables[league].pop(stat_type) for stat_type in FBREF_STAT_TYPE.keys()]
+                        left_df = df_list[0]
+                        for right_df in df_list[1:]:
+                            left_df = pd.merge(left_df,right_df,on=FBREF_MERGE_KEYS,how='inner')
+                        yield league,left_df
+            except BaseException:
+                # Also reached when the caller stops iterating (GeneratorExit)
+                executor.shutdown(wait=False,cancel_futures=True)
+                self.__close_drivers()
+                raise
+    
+    def get_players_report(self,league=None,season=None):
+        return dict(self.get_players_reports([league],season))[league]
              
     # #------------------------------------------------------------------------------------------------------------------
\ No newline at end of file
@@ -0,0 +1,125 @@
+#------------------------------------------------------------------------------------------------------------------
+# Libraries
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from tqdm import tqdm
+
+#------------------------------------------------------------------------------------------------------------------
+# Global variables
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+#------------------------------------------------------------------------------------------------------------------
+# Rate limiting
+
+class TokenBucket:
+    '''
+    Thread-safe token bucket shared by all the workers of a scraper.
+    `rate` is the number of requests per second allowed on average, `burst` the number
+    of requests that can be issued back to back after an idle period.
+    If rate is None the bucket never blocks.
+    '''
+
+    def __init__(self, rate=None, burst=1):
+        self.rate     = rate
+        self.capacity = max(1, burst)
+        self.tokens   = float(self.capacity)
+        self.last     = time.monotonic()
+        self.lock     = threading.Lock()
+
+    def acquire(self):
+        '''
+        Blocks until a token is available, then consumes it.
+        '''
+        if self.rate is None:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+#------------------------------------------------------------------------------------------------------------------
+# Fetcher
+
+class PooledFetcher:
+    '''
+    Concurrent HTTP fetcher built on a single requests.Session:
+    - connections are pooled per host (pool size = number of workers)
+    - every request goes through a global TokenBucket
+    - 429/5xx responses are retried with exponential backoff (Retry-After is honoured)
+    - if a ResponseCache is given, get_content serves fresh bodies from disk without touching the network
+    '''
+
+    def __init__(self, headers=None, max_workers=1, requests_per_second=None, max_retries=3, backoff_factor=0.5, timeout=30, cache=None):
+        self.max_workers = max(1, max_workers)
+        self.timeout     = timeout
+        self.cache       = cache
+        self.bucket      = TokenBucket(rate=requests_per_second, burst=self.max_workers)
+
+        retry = Retry(
+            total                      = max_retries,
+            backoff_factor             = backoff_factor,
+            status_forcelist           = RETRY_STATUS_CODES,
+            allowed_methods            = frozenset(['GET']),
+            respect_retry_after_header = True,
+            raise_on_status            = False,
+        )
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        if headers is not None:
+            self.session.headers.update(headers)
+
+    def close(self):
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+    #------------------------------------------------------------------------------------------------------------------
+
+    def get(self, url):
+        '''
+        Rate-limited GET through the pooled session. Raises for non-2xx answers left after retries.
+        '''
+        self.bucket.acquire()
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def get_content(self, url, ttl=None):
+        '''
+        Returns the body of url (bytes), from the cache if an entry younger than ttl seconds exists.
+        Downloaded bodies are stored in the cache.
+        '''
+        if self.cache is not None:
+            content = self.cache.get(url, ttl)
+            if content is not None:
+                return content
+        content = self.get(url).content
+        if self.cache is not None:
+            self.cache.put(url, content)
+        return content
+
+    def map(self, fn, items, desc=None, verbose=True):
+        '''
+        Applies fn to every item on a bounded thread pool and returns the results in input order.
+        With a single worker items are processed sequentially in the calling thread.
+        '''
+        items = list(items)
+        if self.max_workers == 1:
+            return [fn(item) for item in tqdm(items, desc=desc, disable=not verbose)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(tqdm(executor.map(fn, items), total=len(items), desc=desc, disable=not verbose))
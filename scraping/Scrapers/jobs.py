@@ -0,0 +1,177 @@
+#------------------------------------------------------------------------------------------------------------------
+# Libraries
+
+import csv
+import json
+import os
+import threading
+import time
+from tqdm import tqdm
+from .tm_scraper import TM_PLAYER_COLUMNS
+
+#------------------------------------------------------------------------------------------------------------------
+# Manifest
+
+class ScrapeManifest:
+    '''
+    Append-only JSONL log of the scrape units that have been completed.
+    - player units are keyed by (league, season, player_id) and remember whether all the fields were found
+    - club units are keyed by (league, season, club) and list the ids of their players
+    A truncated last line (crash while writing) is simply ignored when the manifest is reloaded.
+    '''
+
+    def __init__(self, path):
+        self.path    = path
+        self.players = {}
+        self.clubs   = {}
+        self.lock    = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self.__register(entry)
+        else:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def close(self):
+        self.file.close()
+
+    #------------------------------------------------------------------------------------------------------------------
+
+    def __register(self, entry):
+        if entry['unit'] == 'player':
+            self.players[(entry['league'], entry['season'], entry['player_id'])] = entry
+        elif entry['unit'] == 'club':
+            self.clubs[(entry['league'], entry['season'], entry['club'])] = entry
+
+    def __append(self, entry):
+        with self.lock:
+            self.__register(entry)
+            self.file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self.file.flush()
+
+    def record_player(self, league, season, club, player_id, complete):
+        self.__append({'unit': 'player', 'league': league, 'season': str(season), 'club': club,
+                       'player_id': str(player_id), 'complete': complete, 'scraped_at': time.time()})
+
+    def record_club(self, league, season, club, player_ids):
+        self.__append({'unit': 'club', 'league': league, 'season': str(season), 'club': club,
+                       'player_ids': [str(player_id) for player_id in player_ids], 'scraped_at': time.time()})
+
+    #------------------------------------------------------------------------------------------------------------------
+
+    def is_player_done(self, league, season, player_id, max_age=None, refresh_missing=False):
+        '''
+        A player is done if it has been scraped less than max_age seconds ago (any time if None)
+        and, when refresh_missing is set, if none of its fields was missing.
+        '''
+        entry = self.players.get((league, str(season), str(player_id)))
+        if entry is None:
+            return False
+        if max_age is not None and time.time() - entry['scraped_at'] > max_age:
+            return False
+        if refresh_missing and not entry['complete']:
+            return False
+        return True
+
+    def is_club_done(self, league, season, club, max_age=None, refresh_missing=False):
+        '''
+        A club is done if its squad has been listed less than max_age seconds ago and all its players are done.
+        '''
+        entry = self.clubs.get((league, str(season), club))
+        if entry is None:
+            return False
+        if max_age is not None and time.time() - entry['scraped_at'] > max_age:
+            return False
+        return all(self.is_player_done(league, season, player_id, max_age, refresh_missing) for player_id in entry['player_ids'])
+
+#------------------------------------------------------------------------------------------------------------------
+# Job runner
+
+class TransfermarktJobRunner:
+    '''
+    Resumable, streaming driver for a TransfermarktPlayerScraper.
+    Records are appended to output_dir/players_bio_tm_{league}_{season}.csv as soon as a club is scraped,
+    and the completed units are logged in the manifest, so that a restart skips them.
+    Every season has its own file, which is never mixed with the per-league datasets: those are written
+    from it once the job is complete (see scrape_Transfermarkt.py).
+    A unit is appended to the output before being marked as done: after a crash a player can be
+    written twice (keep the last occurrence of each Player_ID), but it is never lost.
+    '''
+
+    def __init__(self, scraper, output_dir, manifest_path):
+        self.scraper    = scraper
+        self.output_dir = output_dir
+        self.manifest   = ScrapeManifest(manifest_path)
+        os.makedirs(output_dir, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.manifest.close()
+        return False
+
+    #------------------------------------------------------------------------------------------------------------------
+
+    def output_path(self, league, season):
+        return os.path.join(self.output_dir, f'players_bio_tm_{league}_{season}.csv')
+
+    def __append_records(self, league, season, records):
+        path = self.output_path(league, season)
+        write_header = not os.path.exists(path) or os.path.getsize(path) == 0
+        with open(path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if write_header:
+                writer.writerow(TM_PLAYER_COLUMNS)
+            writer.writerows(records)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def __scrape_player(self, player_url, league):
+        try:
+            return self.scraper.get_player_info(player_url, league)
+        except Exception as e:
+            print(f"❌Failed to scrape {player_url}: {e}")
+            return None
+
+    #------------------------------------------------------------------------------------------------------------------
+
+    def run(self, league, season, max_age=None, refresh_missing=False, verbose=False):
+        '''
+        Scrapes all the players of a league that are not done yet (see ScrapeManifest.is_player_done):
+        - max_age: re-scrape players (and squads) older than max_age seconds
+        - refresh_missing: re-scrape players with some missing field
+        Returns the number of player records written.
+        '''
+        n_written = 0
+        club_urls = self.scraper.get_club_urls(league, season)
+        for club_url in tqdm(club_urls, desc=f'Scraping clubs of {league} (season {season})'):
+            club = club_url.split('/')[3]
+            if self.manifest.is_club_done(league, season, club, max_age, refresh_missing):
+                continue
+
+            player_urls = self.scraper.get_player_urls_from_club_page(club_url)
+            todo_urls = [
+                url for url in player_urls
+                if not self.manifest.is_player_done(league, season, url.split('/')[-1], max_age, refresh_missing)
+            ]
+            results = self.scraper.fetcher.map(lambda url : self.__scrape_player(url, league), todo_urls, verbose=False)
+            scraped = [(url, record) for url, record in zip(todo_urls, results) if record is not None]
+            records = [record for _, record in scraped]
+
+            self.__append_records(league, season, records)
+            for url, record in scraped:
+                self.manifest.record_player(league, season, club, url.split('/')[-1], complete=all(field is not None for field in record))
+            if len(records) == len(todo_urls):
+                self.manifest.record_club(league, season, club, [url.split('/')[-1] for url in player_urls])
+
+            n_written += len(records)
+            if verbose:
+                print(club.replace("-", " "), f"{len(records)} players added")
+        return n_written
@@ -0,0 +1,46 @@
+#------------------------------------------------------------------------------------------------------------------
+# Libraries
+
+import pandas as pd
+
+#------------------------------------------------------------------------------------------------------------------
+# Typing
+
+def cast_frame(df, schema):
+    '''
+    Casts the columns of df to the dtypes of schema ({column : dtype}).
+    Integer columns use pandas nullable dtypes (e.g. 'Int64'), so missing values survive the cast.
+    '''
+    for column, dtype in schema.items():
+        if str(dtype).startswith(('Int', 'UInt', 'Float')):
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype(dtype)
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+#------------------------------------------------------------------------------------------------------------------
+# Builder
+
+class ColumnarRecordBuilder:
+    '''
+    Accumulates records (lists ordered as the schema) column by column and builds the
+    typed DataFrame once, instead of growing a DataFrame row by row.
+    '''
+
+    def __init__(self, schema):
+        self.schema  = schema
+        self.columns = {column : [] for column in schema}
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), []))
+
+    def append(self, record):
+        for values, value in zip(self.columns.values(), record):
+            values.append(value)
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def to_frame(self):
+        return cast_frame(pd.DataFrame(self.columns), self.schema)
@@ -0,0 +1,145 @@
+#------------------------------------------------------------------------------------------------------------------
+# Libraries
+
+import os
+import re
+import sqlite3
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+import lxml.html
+
+#------------------------------------------------------------------------------------------------------------------
+# Global variables
+
+# Labels of the profile header / info table and the corresponding fields
+TM_BIO_LABELS = {
+    'Date of birth/Age:' : 'BirthYear',
+    'Date of birth:'     : 'BirthYear',
+    'Height:'            : 'Height',
+    'Position:'          : 'Pos',
+    'Foot:'              : 'Foot',
+}
+
+# Legacy regexes over the whole page text, used when a field is not found in the header nodes
+TM_BIO_REGEXES = {
+    'Height'    : re.compile(r"Height:.*?([0-9].*?)\n", re.DOTALL),
+    'Foot'      : re.compile(r"Foot:.*?([A-Za-z].*?)\n", re.DOTALL),
+    'Pos'       : re.compile(r"Position:.*?([A-Za-z].*?)\n", re.DOTALL),
+    'BirthYear' : re.compile(r"Date of birth.*?\n\s*([A-Za-z]{3} \d{1,2}, \d{4})", re.DOTALL),
+}
+
+YEAR_RE = re.compile(r"\b(\d{4})\b")
+
+#------------------------------------------------------------------------------------------------------------------
+# Single page
+
+def _normalize(text):
+    return ' '.join(text.split())
+
+def _parse_player_page(page):
+    '''
+    Parses a player profile (str or bytes) in a single pass over the header nodes.
+    Returns the fields and the number of them recovered through the legacy regexes.
+    '''
+    tree   = lxml.html.fromstring(page)
+    fields = {'Player' : None, 'BirthYear' : None, 'Pos' : None, 'Height' : None, 'Foot' : None}
+
+    headline = tree.find_class('data-header__headline-wrapper')
+    if headline:
+        fields['Player'] = headline[0].text_content().split('\n')[-1].strip()
+
+    # Header items: <li class="data-header__label">Height:<span class="data-header__content">1,87 m</span></li>
+    for item in tree.find_class('data-header__label'):
+        field = TM_BIO_LABELS.get(_normalize(item.text or ''))
+        content = item.find_class('data-header__content')
+        if field is not None and fields[field] is None and content:
+            fields[field] = _normalize(content[0].text_content()) or None
+
+    # Info table: <span class="info-table__content--regular">Foot:</span><span class="info-table__content--bold">right</span>
+    for label in tree.find_class('info-table__content--regular'):
+        field = TM_BIO_LABELS.get(_normalize(label.text_content()))
+        content = label.getnext()
+        if field is not None and fields[field] is None and content is not None:
+            fields[field] = _normalize(content.text_content()) or None
+
+    if fields['BirthYear'] is not None:
+        year = YEAR_RE.search(fields['BirthYear'])
+        fields['BirthYear'] = year.group(1) if year else None
+
+    n_fallbacks = 0
+    missing = [field for field in TM_BIO_REGEXES if fields[field] is None]
+    if missing:
+        text = tree.text_content()
+        for field in missing:
+            match = TM_BIO_REGEXES[field].search(text)
+            if match:
+                value = match.group(1).strip()
+                fields[field] = value.split(' ')[-1] if field == 'BirthYear' else value
+                n_fallbacks += 1
+
+    return fields, n_fallbacks
+
+def parse_player_bio(page, player_id):
+    '''
+    Returns [Player_ID, Player, BirthYear, Pos, Height, Foot] from a Transfermarkt profile page.
+    '''
+    fields, _ = _parse_player_page(page)
+    return [player_id, fields['Player'], fields['BirthYear'], fields['Pos'], fields['Height'], fields['Foot']]
+
+#------------------------------------------------------------------------------------------------------------------
+# Saved pages
+
+def list_saved_pages(directory):
+    '''
+    Lists (player_id, path) for the pages saved as <player_id>.html in directory.
+    '''
+    return [
+        (os.path.splitext(name)[0], os.path.join(directory, name))
+        for name in sorted(os.listdir(directory)) if name.endswith(('.html', '.htm'))
+    ]
+
+def list_cached_pages(cache_dir):
+    '''
+    Lists (player_id, path) for the player profiles stored in a ResponseCache directory.
+    '''
+    db = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite'))
+    try:
+        rows = db.execute("SELECT key, url FROM entries WHERE url LIKE '%/profil/spieler/%'").fetchall()
+    finally:
+        db.close()
+    return [(url.split('/')[-1], os.path.join(cache_dir, key[:2], key + '.z')) for key, url in rows]
+
+def _parse_saved_page(item):
+    player_id, path = item
+    with open(path, 'rb') as f:
+        page = f.read()
+    if path.endswith('.z'):
+        page = zlib.decompress(page)
+    fields, n_fallbacks = _parse_player_page(page)
+    return [player_id, fields['Player'], fields['BirthYear'], fields['Pos'], fields['Height'], fields['Foot']], n_fallbacks
+
+def parse_saved_pages(pages, n_workers=None, chunksize=64, verbose=True):
+    '''
+    Parses a list of (player_id, path) on a process pool (see list_saved_pages / list_cached_pages).
+    Returns the records and a small report with throughput and number of regex fallbacks.
+    '''
+    start = time.perf_counter()
+    n_workers = n_workers or os.cpu_count() or 1
+    if n_workers == 1:
+        results = [_parse_saved_page(page) for page in pages]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            results = list(executor.map(_parse_saved_page, pages, chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+
+    report = {
+        'pages'         : len(results),
+        'seconds'       : elapsed,
+        'pages_per_sec' : len(results) / elapsed if elapsed > 0 else float('inf'),
+        'fallbacks'     : sum(n_fallbacks for _, n_fallbacks in results),
+    }
+    if verbose:
+        print(f"Parsed {report['pages']} pages in {report['seconds']:.2f}s "
+              f"({report['pages_per_sec']:.1f} pages/sec, {report['fallbacks']} regex fallbacks)")
+    return [record for record, _ in results], report
@@ -2,10 +2,11 @@
 # Libraries
 
 from bs4 import BeautifulSoup
-import requests
-import pandas as pd
-import re
-from tqdm import tqdm
+import json
+from .cache import ResponseCache, DEFAULT_MAX_SIZE
+from .http_client import PooledFetcher
+from .records import ColumnarRecordBuilder
+from .tm_parser import parse_player_bio
 
 #------------------------------------------------------------------------------------------------------------------
 # Global variables
@@ -29,6 +30,26 @@ TM_LEAGUES_IDS = {
     'Campeonato Brasileiro Série A' : {'tm_league_id' : 'BRA1' , 'tm_league_name' : 'campeonato-brasileiro-serie-a'},
 }
 
+TM_PLAYER_SCHEMA = {
+    'Player_ID'   : 'Int64',
+    'Player'      : 'string',
+    'BirthYear'   : 'Int64',
+    'Pos'         : 'category',
+    'Height'      : 'string',
+    'Foot'        : 'category',
+    'MarketValue' : 'string',
+    'League'      : 'category',
+}
+TM_PLAYER_COLUMNS = list(TM_PLAYER_SCHEMA.keys())
+
+# Cache time-to-live (in seconds) for each kind of resource
+TM_CACHE_TTL = {
+    'league'       : 7  * 24 * 3600,
+    'club'         : 7  * 24 * 3600,
+    'player'       : 30 * 24 * 3600,
+    'market_value' : 1  * 24 * 3600,
+}
+
 
 #------------------------------------------------------------------------------------------------------------------
 # Scraper
@@ -37,16 +58,29 @@ class TransfermarktPlayerScraper:
     
     #------------------------------------------------------------------------------------------------------------------
     
-    def __init__(self):
+    def __init__(self,max_workers=1,requests_per_second=None,max_retries=3,backoff_factor=0.5,cache_dir=None,cache_size=DEFAULT_MAX_SIZE):
         """
         Set headers in order not to be blocked for scraping its import to request 
         pages with some settings to look more like an actual browser.
+        
+        All the requests go through a pooled session (keep-alive connections are reused):
+        - max_workers: number of pages fetched concurrently (1 = sequential)
+        - requests_per_second: global rate limit shared by all workers (None = no limit)
+        - max_retries, backoff_factor: retry policy for 429/5xx responses
+        - cache_dir, cache_size: if cache_dir is set, bodies are cached on disk (see TM_CACHE_TTL)
         """
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/47.0.2526.106 Safari/537.36'
         }
-        self.session = requests.Session()  
-        self.session.headers.update(self.headers)
+        self.fetcher = PooledFetcher(
+            headers             = self.headers,
+            max_workers         = max_workers,
+            requests_per_second = requests_per_second,
+            max_retries         = max_retries,
+            backoff_factor      = backoff_factor,
+            cache               = None if cache_dir is None else ResponseCache(cache_dir,cache_size),
+        )
+        self.session = self.fetcher.session
     def __enter__(self):
         """
         Called when the `with` block is entered.
@@ -58,20 +92,20 @@ class TransfermarktPlayerScraper:
         Called when the `with` block is exited.
         Cleans up the session or handles exceptions if necessary.
         """
-        self.session.close()  # Clean up the session
+        self.fetcher.close()  # Clean up the session
         if exc_type:
             print(f"Exception occurred: {exc_val}")
         return False  
     
     #------------------------------------------------------------------------------------------------------------------
     
-    def get_souped_page(self,page_url):
+    def get_souped_page(self,page_url,ttl=None):
         '''
         this function takes a page_url from https://www.transfermarkt.com and returns the
-        souped page
+        souped page (served from the cache if younger than ttl seconds)
         '''
-        pageTree = requests.get(page_url, headers=self.headers)
-        pageSoup = BeautifulSoup(pageTree.content, 'html.parser')
+        pageContent = self.fetcher.get_content(page_url,ttl)
+        pageSoup = BeautifulSoup(pageContent, 'html.parser')
 
         return(pageSoup)
 
@@ -87,7 +121,7 @@ class TransfermarktPlayerScraper:
         if season != None:
             league_url = league_url + "/plus/?saison_id=" + str(season)
         
-        league_base_page = self.get_souped_page(league_url)
+        league_base_page = self.get_souped_page(league_url,TM_CACHE_TTL['league'])
 
         club_urls = []
         for row in league_base_page.find_all('table', 'items')[0].select('tr'):
@@ -104,14 +138,14 @@ class TransfermarktPlayerScraper:
 
     #------------------------------------------------------------------------------------------------------------------
     
-    def __get_player_urls_from_club_page(self,club_url):
+    def get_player_urls_from_club_page(self,club_url):
         '''
         From a club page such as :
         https://www.transfermarkt.com/manchester-united/startseite/verein/985/saison_id/2019
         retrived the url links for all players
         '''
         
-        club_base_page = self.get_souped_page(club_url)
+        club_base_page = self.get_souped_page(club_url,TM_CACHE_TTL['club'])
 
         player_urls = []
         for row in club_base_page.find_all('table', 'items')[0].select('tr'):
@@ -131,15 +165,9 @@ class TransfermarktPlayerScraper:
 
     #------------------------------------------------------------------------------------------------------------------
     
-    def get_player_urls_from_league_page(self,league, season=None,verbose = False):
+    def get_club_urls(self,league,season=None):
         '''
-        From a league page such as :
-        https://www.transfermarkt.com/premier-league/startseite/wettbewerb/GB1
-        retrived the url links for all players from all clubs
-
-        if you want to check on progress chhange verbose to True
-        
-        Note: if i want a specific season, just add /plus/?saison_id=2023 (for example)
+        Retrieves the url links for all the clubs of a league (one of TM_LEAGUES_IDS)
         '''
         
         if league not in TM_LEAGUES_IDS.keys():
@@ -149,13 +177,24 @@ class TransfermarktPlayerScraper:
         tm_league_id  = TM_LEAGUES_IDS[league]['tm_league_id']
         league_url = f"https://www.transfermarkt.com/{tm_legue_name}/startseite/wettbewerb/{tm_league_id}"
         
-        if season is not None:
-            league_url = league_url + "/plus/?saison_id=" + str(season)
+        return self.__get_club_urls_from_league_page(league_url,season)
+    
+    def get_player_urls_from_league_page(self,league, season=None,verbose = False):
+        '''
+        From a league page such as :
+        https://www.transfermarkt.com/premier-league/startseite/wettbewerb/GB1
+        retrived the url links for all players from all clubs
+
+        if you want to check on progress chhange verbose to True
+        
+        Note: if i want a specific season, just add /plus/?saison_id=2023 (for example)
+        '''
         
         players_urls = []
-        clubs_urls = self.__get_club_urls_from_league_page(league_url,season)
-        for c in clubs_urls:
-            players_urls = players_urls +  self.__get_player_urls_from_club_page(c)
+        clubs_urls = self.get_club_urls(league,season)
+        clubs_players_urls = self.fetcher.map(self.get_player_urls_from_club_page,clubs_urls,desc='Scraping clubs',verbose=False)
+        for c,club_players_urls in zip(clubs_urls,clubs_players_urls):
+            players_urls = players_urls + club_players_urls
             if verbose:
                 print(c.split("/")[3].replace("-", " "), "players added")
         return(players_urls)
@@ -164,34 +203,28 @@ class TransfermarktPlayerScraper:
     
     def __get_player_bio(self,player_url):
         
-        player_page = self.get_souped_page(player_url)
+        player_page = self.fetcher.get_content(player_url,TM_CACHE_TTL['player'])
         
         player_id     = player_url.split('/')[-1]
-        player_name   = player_page.select_one('h1[class="data-header__headline-wrapper"]').text.split('\n')[-1].strip()
-        
-        player_height_re = re.search(r"Height:.*?([0-9].*?)\n", player_page.text, re.DOTALL)
-        player_foot_re = re.search(r"Foot:.*?([A-Za-z].*?)\n", player_page.text, re.DOTALL)
-        player_position_re = re.search(r"Position:.*?([A-Za-z].*?)\n", player_page.text, re.DOTALL)
-        player_birthyear_re = re.search(r"Date of birth.*?\n\s*([A-Za-z]{3} \d{1,2}, \d{4})", player_page.text, re.DOTALL)
-        
-        player_height = player_height_re.group(1).strip() if player_height_re else None
-        player_foot   = player_foot_re.group(1).strip() if player_foot_re else None
-        player_position = player_position_re.group(1).strip() if player_position_re else None
-        player_birthyear = player_birthyear_re.group(1).split(" ")[-1] if player_birthyear_re else None
+        player_id,player_name,player_birthyear,player_position,player_height,player_foot = parse_player_bio(player_page,player_id)
         
-        player_history = requests.get(
-            url=f'https://www.transfermarkt.com/ceapi/marketValueDevelopment/graph/{player_id}',
-            headers=self.headers).json()
+        player_history = json.loads(self.fetcher.get_content(
+            f'https://www.transfermarkt.com/ceapi/marketValueDevelopment/graph/{player_id}',
+            TM_CACHE_TTL['market_value']))
         
         player_current_marketvalue   = player_history['list'][-1]['mw'] if player_history['list'] else None
         
         return [player_id,player_name,player_birthyear,player_position,player_height,player_foot,player_current_marketvalue]
+    
+    def get_player_info(self,player_url,league):
+        '''
+        Returns the record of a single player, in the order of TM_PLAYER_COLUMNS
+        '''
+        return self.__get_player_bio(player_url) + [league]
         
     def get_players_info(self,league,season,verbose=False):
         players_urls = self.get_player_urls_from_league_page(league,season,verbose)
-        players_df = pd.DataFrame(columns=['Player_ID','Player','BirthYear','Pos','Height','Foot','MarketValue','League'])
-        for url in tqdm(players_urls,desc='Scraping players info'):
-            player_info = self.__get_player_bio(url) + [league]
-            players_df.loc[len(players_df)] = player_info
+        players_records = ColumnarRecordBuilder(TM_PLAYER_SCHEMA)
+        players_records.extend(self.fetcher.map(lambda url : self.get_player_info(url,league),players_urls,desc='Scraping players info'))
         
-        return players_df
\ No newline at end of file
+        return players_records.to_frame()
\ No newline at end of file
@@ -0,0 +1,29 @@
+#------------------------------------------------------------------------------------------------------------------
+# Libraries
+import pandas as pd
+from Scrapers.tm_parser import list_cached_pages, parse_saved_pages
+
+#------------------------------------------------------------------------------------------------------------------
+# Global variables
+
+CACHE_DIR = '../.cache/http/'
+DATA_PATH = '../data/Transfermarkt/'
+CSV_PATH  = DATA_PATH + 'players_bio_tm_reparsed.csv'
+N_WORKERS = None  # None = one process per core
+
+#------------------------------------------------------------------------------------------------------------------
+# Main
+if __name__ == '__main__':
+    
+    # Re-parse the player profiles already stored in the HTTP cache (no network access)
+    pages = list_cached_pages(CACHE_DIR)
+    records, report = parse_saved_pages(pages,n_workers=N_WORKERS)
+    
+    players_df = pd.DataFrame(records,columns=['Player_ID','Player','BirthYear','Pos','Height','Foot'])
+    players_df.to_csv(CSV_PATH,index=False)
+    
+    print('-'*100)
+    print(f"Total number of Pages   : {report['pages']}")
+    print(f"Pages per second        : {report['pages_per_sec']:.1f}")
+    print(f"Regex fallbacks         : {report['fallbacks']}")
+    print('-'*100)
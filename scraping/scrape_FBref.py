@@ -29,17 +29,17 @@ SEASON           = '2023-2024'
 CATEGORICAL_COLS = ['Player','Nation','League','Pos','Squad']
 DATA_PATH        = '../data/FBref/'
 CSV_PATH         = DATA_PATH + 'players_stats_FBref.csv'
+CACHE_DIR        = '../.cache/http/'
+N_WORKERS        = 4      # concurrent (league, stat type) jobs
+STATIC_HTML      = True   # read tables from static HTML instead of driving headless Chrome
 #------------------------------------------------------------------------------------------------------------------
 # Main
 if __name__ == '__main__':
     
-    with FbrefPlayerScraper() as scraper:
+    with FbrefPlayerScraper(n_workers=N_WORKERS,static=STATIC_HTML,cache_dir=CACHE_DIR) as scraper:
         
-        league_df = scraper.get_players_report(league=LEAGUES[0],season=SEASON)
-        global_df = league_df.copy()
-        for league in LEAGUES[1:]:
-            league_df = scraper.get_players_report(league=league,season=SEASON)
-            global_df = pd.concat([global_df,league_df],axis=0,ignore_index=True)
+        league_dfs = dict(scraper.get_players_reports(leagues=LEAGUES,season=SEASON))
+        global_df  = pd.concat([league_dfs[league] for league in LEAGUES],axis=0,ignore_index=True)
 
     numerical_cols = [col for col in global_df.columns if col not in CATEGORICAL_COLS]
     global_df.loc[:,numerical_cols] = global_df.loc[:,numerical_cols].apply(pd.to_numeric, errors='coerce')
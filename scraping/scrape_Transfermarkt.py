@@ -1,7 +1,8 @@
 #------------------------------------------------------------------------------------------------------------------
 # Libraries
 import pandas as pd
-from Scrapers import TransfermarktPlayerScraper
+from Scrapers import TransfermarktPlayerScraper, TransfermarktJobRunner, cast_frame
+from Scrapers.tm_scraper import TM_PLAYER_SCHEMA
 
 #------------------------------------------------------------------------------------------------------------------
 # Global variables
@@ -28,29 +29,41 @@ LEAGUES = [
 SEASON    = '2023'
 DATA_PATH = '../data/Transfermarkt/'
 CSV_PATH  = DATA_PATH + 'players_bio_tm.csv'
+PARQUET_PATH = DATA_PATH + 'players_bio_tm.parquet'
+
+MAX_WORKERS         = 8   # concurrent requests
+REQUESTS_PER_SECOND = 4   # global rate limit (None to disable)
+CACHE_DIR           = '../.cache/http/'
+MANIFEST_PATH       = '../.cache/jobs/transfermarkt_manifest.jsonl'
+MAX_AGE             = None   # re-scrape players older than MAX_AGE seconds (None = never)
+REFRESH_MISSING     = False  # re-scrape players with missing fields
 
 #------------------------------------------------------------------------------------------------------------------
 # Main
 if __name__ == '__main__':
     
-    with TransfermarktPlayerScraper() as scraper:
-        
-        print(f'Retrieving player urls for league {LEAGUES[0]} (season {SEASON})')
-        league_df = scraper.get_players_info(league=LEAGUES[0],season=SEASON,verbose=True)
-        league_df.drop_duplicates(subset=['Player_ID'],inplace=True)
-        league_df.to_csv(f'data/players_bio_tm_{LEAGUES[0]}.csv',index=False)
+    with TransfermarktPlayerScraper(max_workers=MAX_WORKERS,requests_per_second=REQUESTS_PER_SECOND,cache_dir=CACHE_DIR) as scraper, \
+         TransfermarktJobRunner(scraper,output_dir=DATA_PATH,manifest_path=MANIFEST_PATH) as runner:
         
-        global_df = league_df.copy()
+        for league in LEAGUES:
+            print(f'Retrieving players for league {league} (season {SEASON})')
+            n_written = runner.run(league=league,season=SEASON,max_age=MAX_AGE,refresh_missing=REFRESH_MISSING,verbose=True)
+            print(f'{n_written} player records written to {runner.output_path(league,SEASON)}')
         
-        for league in LEAGUES[1:]:
-            print(f'Retrieving player urls for league {league} (season {SEASON})')
-            league_df = scraper.get_players_info(league=league,season=SEASON,verbose=True)
-            league_df.drop_duplicates(subset=['Player_ID'],inplace=True)
+        # The season files are append-only (a player can appear twice after a crash): the per-league
+        # datasets are rewritten from them, keeping the last record of every player
+        league_dfs = []
+        for league in LEAGUES:
+            league_df = cast_frame(pd.read_csv(runner.output_path(league,SEASON),dtype=str),TM_PLAYER_SCHEMA)
+            league_df.drop_duplicates(subset=['Player_ID'],keep='last',inplace=True)
             league_df.to_csv(DATA_PATH+f'players_bio_tm_{league}.csv',index=False)
-            global_df = pd.concat([global_df.copy(),league_df.copy()],axis=0,ignore_index=True)
+            league_df.to_parquet(DATA_PATH+f'players_bio_tm_{league}.parquet',index=False)
+            league_dfs.append(league_df)
+        global_df = cast_frame(pd.concat(league_dfs,axis=0,ignore_index=True),TM_PLAYER_SCHEMA)
             
-    global_df.drop_duplicates(subset=['Player_ID'],inplace=True)
+    global_df.drop_duplicates(subset=['Player_ID'],keep='last',inplace=True)
     global_df.to_csv(CSV_PATH,index=False)
+    global_df.to_parquet(PARQUET_PATH,index=False)
     
     print('-'*100)
     print(f"Total number of Leagues : {len(LEAGUES)}")
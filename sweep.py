@@ -0,0 +1,127 @@
+#----------------------------------------------------------------------------------------------------------------------------------------
+# LIBRARIES
+import argparse
+import torch
+from engine.data import load_features,standardize,train_test_split
+from engine.sweep import SEARCH_SPACE,grid_trials,random_trials,load_search_space,run_sweep
+#----------------------------------------------------------------------------------------------------------------------------------------
+# GLOBAL (DEFAULT) PARAMETERS AND SETTINGS
+SEED             = 1610
+
+DATA_PATH        = 'data/training_dataset.csv'
+OUTPUT_DIR       = 'checkpoints/sweep/'
+STRATEGY         = 'grid'
+N_TRIALS         = 20
+EPOCHS           = 1200
+N_WORKERS        = None
+PRUNE_EVERY      = 100
+PRUNE_WARMUP     = 200
+PATIENCE         = 0
+MIN_DELTA        = 0.0
+EVAL_EVERY       = 1
+
+
+
+if __name__ == "__main__":
+
+    #----------------------------------------------------------------------------------------------------------------------------------------
+    # PARSE ARGUMENTS
+    parser = argparse.ArgumentParser(
+        description = "Python script to run a hyperparameter sweep of the VAE (trials in parallel on the available cores)"
+        )
+
+    # Paths
+    parser.add_argument("-DP","--DataPath",
+                        type    = str,
+                        default = DATA_PATH,
+                        help    = "Path to the training dataset"
+                       )
+    parser.add_argument("-OD","--OutputDir",
+                        type    = str,
+                        default = OUTPUT_DIR,
+                        help    = "Directory of the results table (results.csv) and of the trial checkpoints"
+                       )
+    parser.add_argument("-SS","--SearchSpace",
+                        type    = str,
+                        default = None,
+                        help    = "Path to a JSON search space (name --> list of values, or {low, high, log, int} for random search). Defaults to the latent size sweep in engine/sweep.py"
+                       )
+
+    # Settings
+    parser.add_argument("-S","--Strategy",
+                        type    = str,
+                        default = STRATEGY,
+                        choices = ['grid','random'],
+                        help    = "Search strategy"
+                       )
+    parser.add_argument("-NT","--NumTrials",
+                        type    = int,
+                        default = N_TRIALS,
+                        help    = "Number of trials (random search only)"
+                       )
+    parser.add_argument("-E","--Epochs",
+                        type    = int,
+                        default = EPOCHS,
+                        help    = "Number of epochs per trial"
+                       )
+    parser.add_argument("-NW","--NumWorkers",
+                        type    = int,
+                        default = N_WORKERS,
+                        help    = "Number of parallel trials (default: number of cores)"
+                       )
+    parser.add_argument("-PE","--PruneEvery",
+                        type    = int,
+                        default = PRUNE_EVERY,
+                        help    = "Compare the trials every k epochs and prune the ones worse than the median (0 disables pruning)"
+                       )
+    parser.add_argument("-PW","--PruneWarmup",
+                        type    = int,
+                        default = PRUNE_WARMUP,
+                        help    = "Number of epochs before a trial can be pruned"
+                       )
+    parser.add_argument("-P","--Patience",
+                        type    = int,
+                        default = PATIENCE,
+                        help    = "Stop a trial when its test loss has not improved for this many epochs (0: run all the epochs)"
+                       )
+    parser.add_argument("-MD","--MinDelta",
+                        type    = float,
+                        default = MIN_DELTA,
+                        help    = "Minimum decrease of the test loss counted as an improvement by --Patience"
+                       )
+    parser.add_argument("-SL","--StopAtMinLR",
+                        action  = "store_true",
+                        help    = "Add this flag to stop a trial as soon as its learning rate reaches the scheduler floor (min_lr)"
+                       )
+    parser.add_argument("-EE","--EvalEvery",
+                        type    = int,
+                        default = EVAL_EVERY,
+                        help    = "Evaluate the test set every k epochs"
+                       )
+
+    args = parser.parse_args()
+
+    #----------------------------------------------------------------------------------------------------------------------------------------
+    # DATA IMPORT AND PREPROCESSING (once for all the trials)
+
+    torch.manual_seed(SEED)
+    data, X = load_features(args.DataPath)
+    X,_,_ = standardize(X)
+    X_train, X_test = train_test_split(X)
+
+    #----------------------------------------------------------------------------------------------------------------------------------------
+    # SWEEP
+
+    space  = load_search_space(args.SearchSpace) if args.SearchSpace else SEARCH_SPACE
+    trials = grid_trials(space) if args.Strategy == 'grid' else random_trials(space, args.NumTrials, seed=SEED)
+    print(f"{len(trials)} trials ({args.Strategy} search)")
+
+    results = run_sweep(X_train, X_test, trials, args.Epochs, args.OutputDir,
+                        n_workers    = args.NumWorkers,
+                        seed         = SEED,
+                        prune_every  = args.PruneEvery,
+                        prune_warmup = args.PruneWarmup,
+                        stopping     = {'patience' : args.Patience, 'min_delta' : args.MinDelta, 'eval_every' : args.EvalEvery, 'stop_at_min_lr' : args.StopAtMinLR})
+    print(results.head(10).to_string(index=False))
+
+    #----------------------------------------------------------------------------------------------------------------------------------------
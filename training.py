@@ -1,9 +1,13 @@
 #----------------------------------------------------------------------------------------------------------------------------------------
 # LIBRARIES
 import argparse
+import os
+import sys
 import torch
-import pandas as pd
-from models import VAE,vae_loss,kaiming_weights_init
+from models import VAE,VAEEnsemble,ModelBundle,kaiming_weights_init
+from engine import ENGINES,EnsembleTrainer,StreamingTrainer,Throughput,Telemetry,EarlyStopping,CheckpointManager,ensemble_path,bundle_path,build_optimizer,build_scheduler,beta_schedule,full_beta_epoch,setup_distributed,cleanup_distributed
+from engine.data import NON_FEATURE_COLUMNS,feature_columns,load_features,standardize,train_test_split
+from engine.streaming import SHUFFLE_BUFFER,list_shards,streaming_feature_columns,scan_shards,streaming_loaders
 from tqdm import trange
 #----------------------------------------------------------------------------------------------------------------------------------------
 # GLOBAL (DEFAULT) PARAMETERS AND SETTINGS
@@ -19,6 +23,13 @@ BATCH_SIZE       = 512
 EPOCHS           = 1200
 DEVICE           = 'cuda' if torch.cuda.is_available() else 'mps' if torch.backends.mps.is_available() else 'cpu'
 WARMUP           = False
+ENGINE           = 'dataloader'
+CHECKPOINT_EVERY = 50
+N_MODELS         = 1
+N_WORKERS        = 0
+PATIENCE         = 0
+MIN_DELTA        = 0.0
+EVAL_EVERY       = 1
 
 
 
@@ -34,12 +45,12 @@ if __name__ == "__main__":
     parser.add_argument("-DP","--DataPath",
                         type    = str,
                         default = DATA_PATH,
-                        help    = "Path to the training dataset"
+                        help    = "Path to the training dataset (with --Streaming also a directory or a glob pattern of .csv / .parquet shards)"
                        )
     parser.add_argument("-CP","--CheckpointsPath",
                         type    = str,
                         default = CHECKPOINTS_PATH,
-                        help    = "Path to the model checkpoints"
+                        help    = "Path to the model checkpoints (weights of the best model; the full training state is saved as <name>_state.pth)"
                        )
     
     # Hyperparameters
@@ -79,104 +90,253 @@ if __name__ == "__main__":
                         action  = "store_true",
                         help    = "Add this flag to enable warmup settings for the beta parameter"
                        )
+    parser.add_argument("-EN","--Engine",
+                        type    = str,
+                        default = None,
+                        choices = list(ENGINES),
+                        help    = f"Training engine (default '{ENGINE}'): 'dataloader' (torch DataLoader, original loop), 'resident' (data kept on the device, one sync per epoch) or 'distributed' (data-parallel on CPU cores, launch with: torchrun --standalone --nproc_per_node N training.py --Engine distributed)"
+                       )
+    parser.add_argument("-NM","--NumModels",
+                        type    = int,
+                        default = N_MODELS,
+                        help    = "Number of VAEs (different seeds) trained at once as a vectorized ensemble (own engine, no --Engine); the ensemble is saved as <name>_ensemble.pth, its members as <name>_member<i>.pth and the best member as <name>.pth"
+                       )
+    parser.add_argument("-CE","--CheckpointEvery",
+                        type    = int,
+                        default = CHECKPOINT_EVERY,
+                        help    = "Save the full training state every k epochs"
+                       )
+    parser.add_argument("-R","--Resume",
+                        action  = "store_true",
+                        help    = "Add this flag to resume an interrupted run from the saved training state"
+                       )
+    parser.add_argument("-P","--Patience",
+                        type    = int,
+                        default = PATIENCE,
+                        help    = "Stop when the test loss has not improved for this many epochs (0: run all the epochs)"
+                       )
+    parser.add_argument("-MD","--MinDelta",
+                        type    = float,
+                        default = MIN_DELTA,
+                        help    = "Minimum decrease of the test loss counted as an improvement by --Patience"
+                       )
+    parser.add_argument("-SL","--StopAtMinLR",
+                        action  = "store_true",
+                        help    = "Add this flag to stop as soon as the learning rate scheduler reaches its floor (min_lr)"
+                       )
+    parser.add_argument("-EE","--EvalEvery",
+                        type    = int,
+                        default = EVAL_EVERY,
+                        help    = "Evaluate the test set (scheduler step, best model selection) every k epochs"
+                       )
+    parser.add_argument("-ST","--Streaming",
+                        action  = "store_true",
+                        help    = "Add this flag to stream the dataset from disk in chunks (one pass for mean/std, train-test split by player hash) instead of loading it in memory"
+                       )
+    parser.add_argument("-SB","--ShuffleBuffer",
+                        type    = int,
+                        default = SHUFFLE_BUFFER,
+                        help    = "Rows kept in the shuffling buffer with --Streaming"
+                       )
+    parser.add_argument("-NW","--NumWorkers",
+                        type    = int,
+                        default = N_WORKERS,
+                        help    = "DataLoader worker processes reading the shards with --Streaming (0: main process)"
+                       )
+    parser.add_argument("-MP","--MetricsPath",
+                        type    = str,
+                        default = None,
+                        help    = "Path to a JSONL file where per-epoch metrics are appended (losses, lr, beta, samples/sec, seconds per phase, memory); disabled if not given"
+                       )
+    parser.add_argument("-PE","--ProfileEpochs",
+                        type    = int,
+                        nargs   = "*",
+                        default = [],
+                        help    = "Epochs (1-based) run under torch.profiler, traces are saved in a 'profile' folder next to --MetricsPath"
+                       )
     
 
     args = parser.parse_args()
+    if args.Streaming and args.NumModels > 1:
+        parser.error("--Streaming trains a single model, --NumModels must be 1")
+    if args.Engine is not None and args.NumModels > 1:
+        parser.error("--NumModels > 1 trains the ensemble with its own engine, --Engine cannot be given")
+    if args.Engine == 'distributed' and args.Streaming:
+        parser.error("--Engine distributed trains a single in-memory model (no --Streaming)")
+    args.Engine = args.Engine or ENGINE
+
+    # Data-parallel training: one process per core (gloo backend), only rank 0 logs and saves checkpoints
+    rank, world_size = setup_distributed() if args.Engine == 'distributed' else (0, 1)
+    main_process = rank == 0
+    if args.Engine == 'distributed':
+        DEVICE = 'cpu'
     
     #----------------------------------------------------------------------------------------------------------------------------------------
     # DATA IMPORT AND PREPROCESSING
     
-    data = pd.read_csv(args.DataPath)
-    # Drop non-numeric columns and normalize data
-    X = data.drop(['Player', 'Nation', 'Pos_fbref','Pos_tm', 'Squad','League', 'Born','90s','MarketValue'], axis=1).to_numpy(dtype='float32')
-    X = torch.tensor(X, dtype=torch.float32)
-    X = (X -X.mean(dim=0)) / X.std(dim=0)
-
-    # Train-test split
-    #train_idx = torch.randperm(X.shape[0])[:int(0.8*X.shape[0])]
-    #X_train   = X[train_idx]
-    #X_test    = X[~train_idx]
-    permuted_idx = torch.randperm(X.shape[0])
-    X_train   = X[permuted_idx[:int(0.8*X.shape[0])]]
-    X_test    = X[permuted_idx[int(0.8*X.shape[0]):]]
-    train_loader = torch.utils.data.DataLoader(X_train, batch_size = args.BatchSize, shuffle = True)
-    test_loader  = torch.utils.data.DataLoader(X_test , batch_size = args.BatchSize, shuffle = False)
+    if args.Streaming:
+        # One pass over the shards for mean/std, batches are then read and normalized on the fly
+        shards  = list_shards(args.DataPath)
+        columns = streaming_feature_columns(shards)
+        mean,std,n_train,n_test = scan_shards(shards, columns, n_workers=max(args.NumWorkers,1))
+        train_loader, test_loader = streaming_loaders(shards, columns, mean, std, args.BatchSize, shuffle_buffer=args.ShuffleBuffer, n_workers=args.NumWorkers)
+        print(f"Streaming {len(shards)} shard(s): {n_train} train and {n_test} test rows")
+    else:
+        # Drop non-numeric columns and normalize data
+        data, X = load_features(args.DataPath)
+        X,mean,std = standardize(X)
+        columns = feature_columns(data)
+
+        # Train-test split
+        X_train, X_test = train_test_split(X)
+        n_train, n_test = len(X_train), len(X_test)
 
     #----------------------------------------------------------------------------------------------------------------------------------------
     # MODEL TRAINING
 
-    vae = VAE(
-        input_dim   = X.shape[1],
-        latent_dim  = args.LatentDim,
-        hidden_dim1 = args.HiddenDim1,
-        hidden_dim2 = args.HiddenDim2).to(DEVICE)
-
-    vae.apply(kaiming_weights_init)
+    members = []
+    for _ in range(args.NumModels):
+        member = VAE(
+            input_dim   = len(columns),
+            latent_dim  = args.LatentDim,
+            hidden_dim1 = args.HiddenDim1,
+            hidden_dim2 = args.HiddenDim2)
+        member.apply(kaiming_weights_init)
+        members.append(member)
+    vae = (members[0] if args.NumModels == 1 else VAEEnsemble.from_models(members)).to(DEVICE)
 
-    optimizer = torch.optim.AdamW(vae.parameters(), lr=args.LearningRate,weight_decay=0.001,betas=(0.9, 0.99))
-    scheduler = torch.optim.lr_scheduler.ReduceLROnPlateau(optimizer, 'min', factor=0.75, patience=50,min_lr = 1e-6)
+    optimizer = build_optimizer(vae, args.LearningRate)
+    scheduler = build_scheduler(optimizer, eval_every=args.EvalEvery)
+    betas     = beta_schedule(args.Epochs, args.Warmup, DEVICE)
 
-    if args.Warmup:
-        warmup_epochs =  args.Epochs // 10
-        betas = torch.linspace(0, 1, warmup_epochs)
-        betas = torch.cat((betas,torch.ones(args.Epochs - warmup_epochs))).to(DEVICE)
+    if args.Streaming:
+        trainer = StreamingTrainer(vae, optimizer, train_loader, test_loader, DEVICE)
+    elif args.NumModels == 1:
+        trainer = ENGINES[args.Engine](vae, optimizer, X_train, X_test, args.BatchSize, DEVICE)
     else:
-        betas = torch.full((args.Epochs,),1.0).to(DEVICE)
-        
+        # The ensemble is always trained on the device; losses are averaged over the members
+        trainer = EnsembleTrainer(vae, optimizer, X_train, X_test, args.BatchSize, DEVICE)
+    throughput = Throughput(n_train * args.NumModels)
+
+    # With --Warmup the best model is only selected among the epochs trained with beta = 1
+    # The ensemble has its own weights file, args.CheckpointsPath stays a plain VAE state dict (its best member)
+    best_path   = args.CheckpointsPath if args.NumModels == 1 else ensemble_path(args.CheckpointsPath)
+    checkpoints = CheckpointManager(best_path, every=args.CheckpointEvery, track_from=full_beta_epoch(args.Epochs, args.Warmup))
+
+    telemetry = Telemetry(args.MetricsPath if main_process else None, DEVICE, profile_epochs=args.ProfileEpochs)
+    telemetry.attach(trainer)
+
+    stopping = EarlyStopping(args.Epochs,
+                             patience   = args.Patience,
+                             min_delta  = args.MinDelta,
+                             eval_every = args.EvalEvery,
+                             min_lr     = scheduler.min_lrs[0] if args.StopAtMinLR else None,
+                             track_from = full_beta_epoch(args.Epochs, args.Warmup))
 
-    losses = []
-    r_losses = []
-    kl_losses = []
-    test_losses = []
+    history = {'losses' : [], 'r_losses' : [], 'kl_losses' : [], 'test_losses' : []}
+    start_epoch = 0
+    if args.Resume:
+        start_epoch, history = checkpoints.resume(vae, optimizer, scheduler, map_location=DEVICE)
+        stopping.best_loss, stopping.best_epoch = checkpoints.best_loss, checkpoints.best_epoch
+        if main_process:
+            # With --Warmup the state can be saved before any best model (beta < 1 until full_beta_epoch)
+            best = f"best test loss {checkpoints.best_loss:.4f} at epoch {checkpoints.best_epoch + 1}" if checkpoints.best_epoch is not None else "no best model yet"
+            print(f"Resuming from epoch {start_epoch + 1} ({best})")
+    losses = history['losses']
+    r_losses = history['r_losses']
+    kl_losses = history['kl_losses']
+    test_losses = history['test_losses']
 
-    tqdm_bar = trange(args.Epochs,desc='Training')
+    telemetry.start({**vars(args), 'device' : DEVICE, 'n_train' : n_train, 'n_test' : n_test, 'start_epoch' : start_epoch})
+
+    last_test_loss = float('nan')
+    tqdm_bar = trange(start_epoch,args.Epochs,desc='Training',disable=not main_process)
 
     for epoch in tqdm_bar:
-        # Training
-        vae.train()
-        total_loss = 0
-        total_kl_loss = 0
-        total_r_loss = 0
-        for batch in train_loader:  
-            batch = batch.to(DEVICE)
-            optimizer.zero_grad()
-            
-            reconstructed, mu, logvar = vae(batch)
-            loss,r_loss,kl_loss = vae_loss(reconstructed, batch, mu, logvar, betas[epoch])
-            loss.backward()
-            #torch.nn.utils.clip_grad_norm_(vae.parameters(),2)
-            optimizer.step()
-            
-            total_loss += loss.item()
-            total_kl_loss += kl_loss.item()
-            total_r_loss += r_loss.item()
-            
-            
-        losses += [total_loss / len(train_loader)]
-        r_losses += [total_r_loss / len(train_loader)]
-        kl_losses += [total_kl_loss / len(train_loader)]
-        
-        # Evaluation
-        vae.eval()
-        total_test_loss = 0
-        for test_batch in test_loader:  
-            test_batch = test_batch.to(DEVICE)
-            
-            test_reconstructed, test_mu, test_logvar = vae(test_batch)
-            test_loss,_,_ = vae_loss(test_reconstructed, test_batch, test_mu, test_logvar, betas[epoch])
-            
-            total_test_loss += test_loss.item()
-        test_losses += [total_test_loss / len(test_loader)]
-        
-        scheduler.step(test_losses[-1])
-        
+        # Training and (every --EvalEvery epochs) evaluation; the test loss is NaN on the other epochs
+        evaluate = stopping.should_evaluate(epoch)
+        telemetry.begin_epoch(epoch)
+        with throughput:
+            train_loss,r_loss,kl_loss,test_loss = trainer.epoch(betas[epoch], evaluate=evaluate)
+        telemetry.end_epoch(epoch)
+
+        losses += [train_loss]
+        r_losses += [r_loss]
+        kl_losses += [kl_loss]
+        test_losses += [test_loss]
+
+        if evaluate:
+            scheduler.step(test_losses[-1])
+            last_test_loss = test_loss
+        stop = stopping.step(epoch, test_loss, optimizer.param_groups[0]['lr'])
+
         tqdm_bar.set_description(
         f"Epoch {epoch + 1} | "
-        f"Train Loss: {total_loss / len(train_loader):.4f} | "
-        f"Test Loss: {total_test_loss / len(test_loader):.4f} | "
-        f"LR: {optimizer.param_groups[0]['lr']:.4f}"
+        f"Train Loss: {train_loss:.4f} | "
+        f"Test Loss: {last_test_loss:.4f} | "
+        f"LR: {optimizer.param_groups[0]['lr']:.4f} | "
+        f"Samples/s: {throughput.last:.0f}"
         )
-        
-        torch.save(vae.state_dict(), args.CheckpointsPath)
+
+        with telemetry.timer('checkpoint'):
+            is_best = main_process and checkpoints.step(epoch, vae, optimizer, scheduler, history, test_loss, last = stop or epoch == args.Epochs - 1)
+
+        if telemetry.enabled:
+            telemetry.log(epoch,
+                          train_loss      = train_loss,
+                          r_loss          = r_loss,
+                          kl_loss         = kl_loss,
+                          test_loss       = test_loss,
+                          member_losses   = getattr(trainer, 'member_losses', None),
+                          lr              = optimizer.param_groups[0]['lr'],
+                          beta            = betas[epoch].item(),
+                          seconds         = throughput.elapsed,
+                          samples_per_sec = throughput.last,
+                          checkpoint_save_seconds = checkpoints.save_seconds,
+                          evaluated       = evaluate,
+                          is_best         = is_best)
+
+        if stop:
+            break
+
+    checkpoints.close()
+    cleanup_distributed()
+    if not main_process:
+        sys.exit(0)
+    telemetry.close(epochs          = throughput.epochs,
+                    seconds         = throughput.seconds,
+                    samples_per_sec = throughput.samples_per_sec,
+                    best_epoch      = checkpoints.best_epoch + 1 if checkpoints.best_epoch is not None else None,
+                    best_test_loss  = checkpoints.best_loss,
+                    stop_reason     = stopping.stop_reason,
+                    checkpoint_save_seconds = checkpoints.save_seconds)
+
+    engine_name = 'streaming' if args.Streaming else f"distributed on {world_size} processes" if world_size > 1 else args.Engine if args.NumModels == 1 else f"ensemble of {args.NumModels}"
+    print(f"Engine '{engine_name}': {throughput.samples_per_sec:.0f} training samples/sec ({throughput.seconds:.1f}s over {throughput.epochs} epochs)")
+    if stopping.stop_reason is not None:
+        print(f"Stopped at epoch {epoch + 1}/{args.Epochs}: {stopping.stop_reason}")
+    if checkpoints.best_epoch is None:
+        # Every test loss at beta = 1 was NaN (diverged run): best_path was never written by this run
+        sys.exit(f"No best model was saved (no finite test loss from epoch {checkpoints.track_from + 1} on), the model bundles are not written")
+    print(f"Best test loss {checkpoints.best_loss:.4f} at epoch {checkpoints.best_epoch + 1} --> {best_path}")
+
+    # Best weights as self-describing bundles (architecture, feature order and normalization statistics)
+    vae.load_state_dict(torch.load(best_path, map_location=DEVICE))
+    bundles = [(vae, args.CheckpointsPath)]
+    if args.NumModels > 1:
+        # Export every member of the best ensemble as a standalone VAE state dict, the best one (test loss at beta = 1) also as args.CheckpointsPath
+        member_losses = trainer.evaluate(1.0).tolist()
+        best_member = min(range(args.NumModels), key=lambda i: member_losses[i])
+        root, ext = os.path.splitext(args.CheckpointsPath)
+        members = [(vae.member(i), f"{root}_member{i}{ext}") for i in range(args.NumModels)]
+        bundles = [(members[best_member][0], args.CheckpointsPath)] + members
+        for member, path in bundles:
+            torch.save(member.state_dict(), path)
+        print(f"Ensemble members --> {root}_member*{ext}")
+        print("Best epoch test loss per member: " + ", ".join(f"{loss:.4f}" for loss in member_losses) + f" (best member {best_member} --> {args.CheckpointsPath})")
+    for model, path in bundles:
+        ModelBundle(model, columns, mean, std, dropped_columns=NON_FEATURE_COLUMNS,
+                    training={**vars(args), 'best_epoch' : checkpoints.best_epoch + 1, 'epochs_run' : len(losses), 'stop_reason' : stopping.stop_reason}).save(bundle_path(path))
+    print(f"Model bundle --> {bundle_path(bundles[0][1])}" + (" (and one per member)" if args.NumModels > 1 else ""))
 
     #----------------------------------------------------------------------------------------------------------------------------------------
\ No newline at end of file